@@ -70,6 +70,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "reports.fragment_cache.context",
             ],
         },
     },
@@ -85,6 +86,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # a file rather than SQLite's in-memory default, so the processes of
+        # the worker pools (reports.pools) see the test data too
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -143,4 +147,71 @@ LOGIN_REDIRECT_URL = '/relatorios/'
 
 DATE_FORMAT = 'd/m/Y'
 DATETIME_FORMAT = 'd/m/Y H:i:s'
-USE_L10N = False
\ No newline at end of file
+USE_L10N = False
+
+# The REST API is served under /relatorios/api/. Its views set their own
+# permission classes; anything added without them is closed by default
+REST_FRAMEWORK = {
+    "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
+}
+
+# The tables of the reports list and entries pages are cached for
+# REPORTS_FRAGMENT_CACHE_TIMEOUT seconds under versioned keys that every write
+# invalidates. Invalidations only reach all the workers with a shared cache
+# backend (memcached, redis, database) set in CACHES; with the default local
+# memory cache each process has its own copy, and a worker may show stale
+# data until the timeout.
+REPORTS_FRAGMENT_CACHE_TIMEOUT = 60
+
+# Generated report PDFs are cached on disk, keyed by a hash of their content
+REPORTS_PDF_CACHE_DIR = BASE_DIR / "pdf_cache"
+REPORTS_PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Reports with more entries than this are rendered in chunks of
+# REPORTS_PDF_CHUNK_ROWS rows into a temporary file that is spooled to disk
+# past REPORTS_PDF_SPOOL_MAX_BYTES, keeping memory use flat
+REPORTS_PDF_LARGE_REPORT_ENTRIES = 300
+REPORTS_PDF_CHUNK_ROWS = 40
+REPORTS_PDF_SPOOL_MAX_BYTES = 1024 * 1024
+
+# When enabled, PDFView renders PDFs in a process pool and the browser polls
+# for the result. Once REPORTS_PDF_QUEUE_LIMIT jobs are in flight new requests
+# are either rejected with a 503 ("reject") or rendered in the request ("inline").
+# Job state lives in the PdfJob table, so the limit counts the jobs of every
+# web worker and any of them can answer the polls.
+REPORTS_PDF_ASYNC = False
+REPORTS_PDF_POOL_SIZE = 2
+REPORTS_PDF_QUEUE_LIMIT = 8
+REPORTS_PDF_BACKPRESSURE = "reject"
+
+# E-mails are written to the OutboxEmail table and delivered by the
+# send_queued_emails command; failures are retried after
+# EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempt - 1) seconds. E-mails being sent
+# are leased for EMAIL_OUTBOX_LEASE seconds; one whose worker died before
+# marking it is sent again once the lease expires
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_LEASE = 300
+
+# Period of CustomUser.ch, the workload a bolsista must log: "week" (hours
+# per week, prorated over the weekdays of the checked period) or "month"
+REPORTS_COMPLIANCE_CH_PERIOD = "week"
+
+# Uploads are streamed to disk and hashed on the way, so submitted PDFs can be
+# stored by content; files over REPORTS_UPLOAD_MAX_BYTES are refused as soon
+# as that shows. Files no submission points at anymore are deleted by the
+# gc_pdf_blobs command once REPORTS_BLOB_GC_GRACE_HOURS have passed.
+FILE_UPLOAD_HANDLERS = ["reports.blob_storage.HashingFileUploadHandler"]
+# Uploaded files, unset it would be the working directory of the process
+MEDIA_ROOT = BASE_DIR / "media"
+REPORTS_UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+REPORTS_BLOB_GC_GRACE_HOURS = 24
+
+# How submitted PDFs are sent: None streams them from Django (with Range
+# support), "x-accel-redirect" (nginx) or "x-sendfile" (Apache, lighttpd)
+# hand the transfer to the front-end server once access is checked. For
+# nginx, REPORTS_SENDFILE_PREFIX is an internal location aliased to MEDIA_ROOT.
+# With either one the front-end server answers Range and If-Range requests
+# (nginx and mod_xsendfile do), Django only advertises "Accept-Ranges: bytes".
+REPORTS_SENDFILE = None
+REPORTS_SENDFILE_PREFIX = "/protected-media/"
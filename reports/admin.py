@@ -10,12 +10,28 @@ from .models import (
     CustomUser,
     ReportSubmission,
     PendingReportSubmission,
+    OutboxEmail,
+    MonthlyHours,
+    SubmissionStatusEvent,
     Scholarship,
     Eixo,
     Role,
 )
 
+from datetime import date, timedelta
+
+from django.conf import settings
 from django.contrib.admin import AdminSite
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, F, Q, Sum
+from django.template.response import TemplateResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils import timezone
+from . import compliance, pdf_jobs, review
+from .pdf_export import iter_report_pdfs, stream_zip
 
 class CustomAdminSite(AdminSite):
     site_title = 'Bolsitas PROCINT'  # Replace with your desired title
@@ -25,16 +41,34 @@ custom_admin_site = CustomAdminSite(name='customadmin')
 admin.site = custom_admin_site
 
 
+# How long the year/month filter choices are cached: they only change when
+# the first report of a new month is created
+REF_MONTH_LOOKUPS_TIMEOUT = 60 * 10
+
+
+def ref_month_dates(model):
+    """
+    Distinct (year, month) pairs of ref_month in the model's table, cached so
+    the filters below don't scan the table on every changelist page view.
+    """
+    key = f"reports:admin:ref_months:{model._meta.label_lower}"
+    months = cache.get(key)
+    if months is None:
+        months = [
+            (month.year, month.month)
+            for month in model.objects.dates("ref_month", "month")
+        ]
+        cache.set(key, months, REF_MONTH_LOOKUPS_TIMEOUT)
+    return months
+
+
 class RefMonthYearFilter(admin.SimpleListFilter):
     title = "Ano"
     parameter_name = "year"
 
     def lookups(self, request, model_admin):
-        # Retrieve a list of distinct years from the database
-        return (
-            (str(year.year), str(year.year))
-            for year in model_admin.model.objects.dates("ref_month", "year")
-        )
+        years = sorted({year for year, _ in ref_month_dates(model_admin.model)})
+        return ((str(year), str(year)) for year in years)
 
     def queryset(self, request, queryset):
         if self.value():
@@ -46,10 +80,9 @@ class RefMonthFilter(admin.SimpleListFilter):
     parameter_name = "month"
 
     def lookups(self, request, model_admin):
-        # Retrieve a list of distinct months from the database
+        months = sorted({month for _, month in ref_month_dates(model_admin.model)})
         return (
-            (str(month.month), month.strftime("%B"))
-            for month in model_admin.model.objects.dates("ref_month", "month")
+            (str(month), date(2000, month, 1).strftime("%B")) for month in months
         )
 
     def queryset(self, request, queryset):
@@ -57,24 +90,122 @@ class RefMonthFilter(admin.SimpleListFilter):
             return queryset.filter(ref_month__month=self.value())
 
 
+class InputFilter(admin.SimpleListFilter):
+    """
+    Filter rendered as a search box instead of a list of links, for fields
+    with too many values to list them all (users, reports, ...).
+    """
+
+    template = "reports/admin/input_filter.html"
+    placeholder = ""
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            "parameter_name": self.parameter_name,
+            "value": self.value(),
+            "placeholder": self.placeholder,
+            "query_parts": [
+                (name, value)
+                for name, value in changelist.get_filters_params().items()
+                if name != self.parameter_name
+            ],
+        }
+
+
+class UserFilter(InputFilter):
+    title = "Bolsista"
+    parameter_name = "bolsista"
+    placeholder = "Nome ou e-mail"
+    # path from the filtered model to CustomUser
+    user_path = "user"
+
+    def queryset(self, request, queryset):
+        if self.value():
+            term = self.value().strip()
+            return queryset.filter(
+                Q(**{f"{self.user_path}__email__istartswith": term})
+                | Q(**{f"{self.user_path}__name__istartswith": term})
+            )
+
+
+class ReportUserFilter(UserFilter):
+    user_path = "report__user"
+
+
 class ReportAdmin(admin.ModelAdmin):
     list_display = ("user", "ref_month", "total_hours")
-    list_filter = ("user", RefMonthYearFilter, RefMonthFilter)
+    list_filter = (UserFilter, RefMonthYearFilter, RefMonthFilter)
+    list_select_related = ("user",)
+    actions = ["exportar_pdfs"]
+
+    def exportar_pdfs(self, request, queryset):
+        reports = queryset.select_related("user__role").order_by("ref_month", "user__name", "pk")
+        # the shared, bounded pool of the PDF jobs: never a new pool per click
+        pdfs = iter_report_pdfs(
+            reports.iterator(),
+            workers=getattr(settings, "REPORTS_PDF_POOL_SIZE", 2),
+            pool=pdf_jobs.get_executor(),
+        )
+        response = StreamingHttpResponse(
+            stream_zip(pdfs),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = 'attachment; filename="relatorios.zip"'
+        return response
+
+    exportar_pdfs.short_description = "Exportar PDFs selecionados (ZIP)"
 
 
 class ReportEntryAdmin(admin.ModelAdmin):
     list_display = ("report", "description", "date", "init_hour", "end_hour", "hours")
-    list_filter = ("report", "date")
+    list_filter = (ReportUserFilter, "date")
+    list_select_related = ("report__user",)
+    # the unfiltered COUNT(*) over every entry is not worth a query per page
+    show_full_result_count = False
 
 
-class ReportSubmissionAdmin(admin.ModelAdmin):
+class SubmissionStatusEventInline(admin.TabularInline):
+    model = SubmissionStatusEvent
+    fields = ("changed_at", "old_status", "new_status", "changed_by")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("changed_by")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class StatusChangeAdminMixin:
+    """Records the admin user as the author of the status changes they save."""
+
+    def save_model(self, request, obj, form, change):
+        obj._changed_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+class ReportSubmissionAdmin(StatusChangeAdminMixin, admin.ModelAdmin):
     list_display = ("report", "submitted_at", "status", "reviewer")
-    list_filter = ("status",)
+    list_filter = ("status", ReportUserFilter)
+    list_select_related = ("report__user", "reviewer")
+    inlines = [SubmissionStatusEventInline]
 
 
 class CustomUserAdmin(admin.ModelAdmin):
     list_display = ("name", "email", "scholarship", "role", "eixo", "ch")
     list_filter = ("is_active",)
+    list_select_related = ("scholarship", "role", "eixo")
 
     actions = ["ativar", "desativar"]
 
@@ -85,18 +216,20 @@ class CustomUserAdmin(admin.ModelAdmin):
         queryset.update(is_active=False)
 
 
-class PendingReportSubmissionAdmin(admin.ModelAdmin):
+class PendingReportSubmissionAdmin(StatusChangeAdminMixin, admin.ModelAdmin):
     list_display = (
         "report_user",
         "report_ref_month",
         "submitted_at",
         "status",
         "reviewer",
-        "pdf_file",
+        "pdf_link",
     )
-    list_filter = ("status",)
+    list_filter = ("status", ReportUserFilter)
+    list_select_related = ("report__user", "reviewer")
     actions = ["aprovar", "rejeitar"]
     fields = ("status", "reason")
+    inlines = [SubmissionStatusEventInline]
     # change_list_template = "reports/admin/custom_change_list.html"
     
     class CustomActionForm(admin.helpers.ActionForm):
@@ -110,11 +243,10 @@ class PendingReportSubmissionAdmin(admin.ModelAdmin):
         return False
 
     def _change_status(self, request, queryset, status):
-        for submission in queryset:
-            submission.reason = request.POST["reason"]
-            submission.reviewer = request.user
-            submission.status = status
-            submission.save()
+        changed = review.change_status(
+            queryset, status, request.user, request.POST.get("reason", "")
+        )
+        self.message_user(request, f"{changed} relatório(s) marcados como {status.lower()}.")
 
     def aprovar(self, request, queryset):
         self._change_status(request, queryset, ReportSubmission.ReportStatus.APPROVED)
@@ -129,9 +261,146 @@ class PendingReportSubmissionAdmin(admin.ModelAdmin):
     def report_user(self, obj):
         return obj.report.user.name
 
+    def pdf_link(self, obj):
+        url = reverse("report_submission_pdf", args=[obj.report_id, obj.pk])
+        return format_html('<a href="{}" target="_blank">PDF</a>', url)
+
     report_ref_month.short_description = "Mês de referência"
+    pdf_link.short_description = "Arquivo"
+    report_ref_month.admin_order_field = "report__ref_month"
     report_user.short_description = "Bolsista"
+    report_user.admin_order_field = "report__user__name"
+
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "created_at", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    readonly_fields = ("attempts", "last_error", "created_at", "sent_at")
+    actions = ["reenviar"]
+
+    def reenviar(self, request, queryset):
+        queryset.exclude(status=OutboxEmail.DeliveryStatus.SENT).update(
+            status=OutboxEmail.DeliveryStatus.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
 
+    reenviar.short_description = "Reenviar e-mails selecionados"
+
+
+class MonthlyHoursAdmin(admin.ModelAdmin):
+    """
+    Dashboard of the hours logged per month by eixo, scholarship or role,
+    read from the MonthlyHours rollup: a year is at most one row per user
+    and month, whatever the size of the history.
+    """
+
+    dimensions = (("eixo", "Eixo"), ("scholarship", "Tipo de Bolsa"), ("role", "Função"))
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        dimension = request.GET.get("por")
+        if dimension not in dict(self.dimensions):
+            dimension = "eixo"
+        years = sorted(
+            {year for year, _ in ref_month_dates(MonthlyHours)}, reverse=True
+        ) or [date.today().year]
+        try:
+            year = int(request.GET.get("ano", years[0]))
+        except ValueError:
+            year = years[0]
+
+        rows = list(
+            MonthlyHours.objects.filter(
+                ref_month__gte=date(year, 1, 1), ref_month__lt=date(year + 1, 1, 1)
+            )
+            .values("ref_month", name=F(f"{dimension}__name"))
+            .annotate(
+                seconds=Sum("total_seconds"),
+                entries=Sum("entry_count"),
+                reports=Count("id"),
+                pending=Count("id", filter=Q(state=ReportSubmission.ReportStatus.PENDING)),
+            )
+            .order_by("ref_month", "name")
+        )
+        for row in rows:
+            row["hours"] = row["seconds"] / 3600
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Horas por mês",
+            "dimensions": self.dimensions,
+            "dimension": dimension,
+            "dimension_label": dict(self.dimensions)[dimension],
+            "years": years,
+            "year": year,
+            "rows": rows,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, "reports/admin/monthly_hours.html", context)
+
+    def get_urls(self):
+        return [
+            path(
+                "conformidade/",
+                self.admin_site.admin_view(self.compliance_view),
+                name="reports_monthlyhours_compliance",
+            ),
+        ] + super().get_urls()
+
+    def compliance_view(self, request):
+        """
+        Hours logged by every bolsista in a month, or a whole year, against
+        their required workload (CustomUser.ch), as a page or as CSV.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        today = date.today()
+        try:
+            year = int(request.GET.get("ano") or today.year)
+            month = int(request.GET["mes"]) if request.GET.get("mes") else None
+            start, end = compliance.period_bounds(year, month)
+        except ValueError:
+            year, month = today.year, None
+            start, end = compliance.period_bounds(year)
+        results = compliance.compute_compliance(start, end)
+
+        if request.GET.get("formato") == "csv":
+            response = HttpResponse(content_type="text/csv; charset=utf-8")
+            period = f"{year}-{month:02}" if month else str(year)
+            response["Content-Disposition"] = f'attachment; filename="conformidade-{period}.csv"'
+            compliance.write_csv(response, results)
+            return response
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Conformidade com a carga horária",
+            "year": year,
+            "month": month,
+            "months": [(m, date(2000, m, 1).strftime("%B")) for m in range(1, 13)],
+            "start": start,
+            "last_day": end - timedelta(days=1),
+            "weekdays": compliance.WEEKDAYS,
+            "results": results,
+            "below": sum(1 for row in results if row["shortfall_seconds"]),
+            "outliers": sum(1 for row in results if row["outlier"]),
+        }
+        return TemplateResponse(request, "reports/admin/compliance.html", context)
 
 
 admin.site.register(Scholarship)
@@ -143,4 +412,6 @@ admin.site.register(Report, ReportAdmin)
 admin.site.register(ReportEntry, ReportEntryAdmin)
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(ReportSubmission, ReportSubmissionAdmin)
-admin.site.register(PendingReportSubmission, PendingReportSubmissionAdmin)
\ No newline at end of file
+admin.site.register(PendingReportSubmission, PendingReportSubmissionAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
+admin.site.register(MonthlyHours, MonthlyHoursAdmin)
\ No newline at end of file
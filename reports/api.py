@@ -1,13 +1,172 @@
 # myapp/views.py
-from rest_framework import generics, permissions
-from .models import Report
-from .serializers import ReportSerializer
+from django.db import transaction
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions, status
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import fragment_cache
+from .intervals import IntervalIndex
+from .models import Report, ReportEntry, ReportSubmission
+from .serializers import ReportEntryBulkSerializer, ReportEntrySerializer, ReportSerializer
+
+# Largest number of entries accepted by a single bulk request
+MAX_BULK_ENTRIES = 1000
+
+
+def _query_list(request, name):
+    """Comma separated values of a query parameter, as a set."""
+    value = request.query_params.get(name, "")
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class ReportCursorPagination(CursorPagination):
+    # a user has at most one report per month, so ref_month alone is a
+    # stable cursor and pages never skip or repeat reports that are added
+    # while a client is paging through them
+    ordering = "-ref_month"
+    page_size = 12
+    page_size_query_param = "page_size"
+    max_page_size = 120
 
 
 class ReportListView(generics.ListAPIView):
+    """
+    Reports of the authenticated user, newest first, one cursor page at a
+    time. ?fields=id,ref_month,total_seconds restricts the fields of each
+    report and ?expand=entries,submissions adds the nested lists, which are
+    left out by default.
+    """
+
     serializer_class = ReportSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ReportCursorPagination
+
+    def get_expand(self):
+        return _query_list(self.request, "expand") & set(ReportSerializer.EXPANDABLE)
 
     def get_queryset(self):
         user = self.request.user
-        return Report.objects.filter(user=user)
+        queryset = Report.objects.filter(user=user)
+        expand = self.get_expand()
+        if "entries" in expand:
+            queryset = queryset.prefetch_related(
+                Prefetch("entries", queryset=ReportEntry.objects.order_by("date", "init_hour", "id"))
+            )
+        if "submissions" in expand:
+            queryset = queryset.prefetch_related("submissions")
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = _query_list(self.request, "fields")
+        context["expand"] = self.get_expand()
+        return context
+
+
+class ReportEntryBulkView(APIView):
+    """
+    Creates and updates many entries of one report of the authenticated user
+    in one request. The body is a list of entries; the ones with an "id" are
+    updated, the others created. Every item is validated before anything is
+    written and, if any of them is invalid, nothing is saved and the answer
+    is a 400 with one error dict per item, in the order they were sent.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, report_id):
+        report = get_object_or_404(Report, id=report_id, user=request.user)
+        if report.current_state in (
+            ReportSubmission.ReportStatus.PENDING,
+            ReportSubmission.ReportStatus.APPROVED,
+        ):
+            return Response(
+                {"detail": "Não é possível alterar relatório enviado para análise."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"detail": "Envie uma lista de atividades."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > MAX_BULK_ENTRIES:
+            return Response(
+                {"detail": f"No máximo {MAX_BULK_ENTRIES} atividades por envio."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        errors = []
+        valid = []
+        for item in items:
+            serializer = ReportEntryBulkSerializer(data=item, context={"report": report})
+            if serializer.is_valid():
+                errors.append({})
+                valid.append(serializer.validated_data)
+            else:
+                errors.append(serializer.errors)
+                valid.append(None)
+
+        # the entries to update are checked against the report with one query
+        existing = report.entries.in_bulk(
+            [data["id"] for data in valid if data and "id" in data]
+        )
+        seen_ids = set()
+        for index, data in enumerate(valid):
+            if not data or "id" not in data:
+                continue
+            if data["id"] not in existing:
+                errors[index] = {"id": ["Atividade não encontrada neste relatório."]}
+            elif data["id"] in seen_ids:
+                errors[index] = {"id": ["Atividade repetida nesta lista."]}
+            seen_ids.add(data["id"])
+        # the entries of the batch may overlap neither the rest of the report
+        # nor each other
+        index = IntervalIndex.for_report(report.id, exclude=existing.keys())
+        for position, data in enumerate(valid):
+            if not data or errors[position]:
+                continue
+            if index.overlaps(data["date"], data["init_hour"], data["end_hour"]):
+                errors[position] = {
+                    "init_hour": ["A atividade se sobrepõe a outra atividade do mesmo dia."]
+                }
+            else:
+                index.add(data["date"], data["init_hour"], data["end_hour"])
+        if any(errors):
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = []
+        to_create = []
+        to_update = []
+        for data in valid:
+            entry = existing[data["id"]] if "id" in data else ReportEntry(report=report)
+            for field in ("description", "date", "init_hour", "end_hour"):
+                setattr(entry, field, data[field])
+            # bulk_create/bulk_update skip save(), which keeps it in sync
+            entry.duration = ReportEntry.duration_between(entry.init_hour, entry.end_hour)
+            entries.append(entry)
+            (to_update if entry.pk else to_create).append(entry)
+
+        with transaction.atomic():
+            ReportEntry.objects.bulk_create(to_create)
+            ReportEntry.objects.bulk_update(
+                to_update,
+                ["description", "date", "init_hour", "end_hour", "duration"],
+                batch_size=500,
+            )
+            # and no signals fire, so the report totals are refreshed once here
+            report.update_aggregates()
+            fragment_cache.invalidate([report.user_id], [report.id])
+
+        return Response(
+            {
+                "created": len(to_create),
+                "updated": len(to_update),
+                "total_seconds": report.total_seconds,
+                "entry_count": report.entry_count,
+                "entries": ReportEntrySerializer(entries, many=True).data,
+            }
+        )
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+# Directory of the media root holding the content-addressed files
+BLOB_DIR = "pdfs"
+
+# Room left in a request for the fields sent along with the file
+FIELDS_SLACK_BYTES = 64 * 1024
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f"{BLOB_DIR}/")
+
+
+def content_hash(content):
+    """
+    SHA-256 of a File, taken from the upload handler when it already hashed
+    it, otherwise read in chunks.
+    """
+    digest = getattr(content, "content_hash", None)
+    if digest:
+        return digest
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming files after the SHA-256 of their content, so
+    the same file uploaded again is stored once. Files are shared between the
+    rows pointing at them, the PdfBlob table counts those references and the
+    gc_pdf_blobs command deletes the files nothing points at anymore.
+    """
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        extension = os.path.splitext(name or "")[1].lower()
+        digest = content_hash(content)
+        name = f"{BLOB_DIR}/{digest[:2]}/{digest}{extension}"
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # an existing file with this name has the very same content
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        try:
+            # the same content is stored already: touching it tells
+            # gc_pdf_blobs it is in use again (see delete_unless_touched)
+            os.utime(full_path)
+        except FileNotFoundError:
+            pass
+        else:
+            from .models import PdfBlob
+
+            PdfBlob.objects.filter(name=name).update(updated_at=timezone.now())
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, "temporary_file_path"):
+            # the upload is on disk already, move it instead of copying it
+            file_move_safe(content.temporary_file_path(), full_path, allow_overwrite=True)
+        else:
+            # write next to the final path first so a concurrent upload of
+            # the same content never sees a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp_file:
+                    for chunk in content.chunks():
+                        tmp_file.write(chunk)
+                os.replace(tmp_path, full_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def delete_unless_touched(self, name, cutoff):
+        """
+        Deletes the file unless it was modified after cutoff, returning
+        whether it did. The file is moved aside before its time is checked,
+        so an upload of the same content racing with this either touched it
+        in time and keeps it, or finds it gone and writes it again.
+        """
+        full_path = self.path(name)
+        aside = f"{full_path}.{uuid.uuid4().hex}.deleted"
+        try:
+            os.replace(full_path, aside)
+        except FileNotFoundError:
+            return False
+        modified = datetime.fromtimestamp(os.stat(aside).st_mtime, tz=dt_timezone.utc)
+        if modified >= cutoff:
+            os.replace(aside, full_path)
+            return False
+        os.remove(aside)
+        return True
+
+
+blob_storage = ContentAddressedStorage()
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploads to a temporary file in chunks, hashing them on the way
+    so ContentAddressedStorage never reads them again. Files larger than
+    REPORTS_UPLOAD_MAX_BYTES are skipped as soon as that shows: before any
+    byte is read when the request itself is too large, otherwise at the
+    chunk that goes over. A skipped file is reported with
+    request.upload_too_large and is missing from request.FILES.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_length = content_length
+
+    def new_file(self, *args, **kwargs):
+        # a skipped file gets closed, never let that be the previous upload
+        self.__dict__.pop("file", None)
+        self.max_bytes = settings.REPORTS_UPLOAD_MAX_BYTES
+        if getattr(self, "request_length", 0) > self.max_bytes + FIELDS_SLACK_BYTES:
+            self.reject()
+        super().new_file(*args, **kwargs)
+        self.sha = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self.reject()
+        self.sha.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.sha.hexdigest()
+        return file
+
+    def reject(self):
+        if self.request is not None:
+            self.request.upload_too_large = True
+        raise SkipFile()
@@ -0,0 +1,140 @@
+import csv
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from .models import CustomUser, ReportEntry
+
+WEEKDAYS = ("Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom")
+
+# Users whose logged/required ratio is further than this many (robust)
+# standard deviations from the median are flagged as outliers
+OUTLIER_Z = 3.5
+
+
+def period_bounds(year, month=None):
+    """[start, end) of a month, or of the whole year when month is None."""
+    if month is None:
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    start = date(year, month, 1)
+    return start, date(year + month // 12, month % 12 + 1, 1)
+
+
+def required_factor(start, end):
+    """How many times ch has to be logged between start and end."""
+    if getattr(settings, "REPORTS_COMPLIANCE_CH_PERIOD", "week") == "month":
+        return (end.year - start.year) * 12 + end.month - start.month
+    # weekly hours, prorated over the weekdays of the period
+    return np.busday_count(start, end) / 5
+
+
+def load_entries(start, end):
+    """
+    Entries of every user between start and end as three columns: user ids,
+    days since the epoch and durations in seconds. A single query.
+    """
+    rows = ReportEntry.objects.filter(
+        report__ref_month__gte=start, report__ref_month__lt=end
+    ).values_list("report__user_id", "date", "duration")
+    user_ids, dates, durations = zip(*rows) if rows else ((), (), ())
+    return (
+        np.array(user_ids, dtype=np.int64),
+        np.array(dates, dtype="datetime64[D]").astype(np.int64),
+        np.array(durations, dtype=np.int64),
+    )
+
+
+def compute_compliance(start, end):
+    """
+    Checks the hours logged between start and end by every active bolsista,
+    and by anyone else who logged hours, against their CustomUser.ch.
+    Returns one dict per user, sorted by name, with the logged and required
+    seconds, the shortfall, the logged/required ratio, the seconds logged on
+    each weekday (Monday first) and whether the ratio is an outlier.
+    """
+    entry_users, days, durations = load_entries(start, end)
+
+    users = list(
+        CustomUser.objects.filter(
+            Q(is_staff=False, is_active=True)
+            | Q(reports__ref_month__gte=start, reports__ref_month__lt=end)
+        )
+        .distinct()
+        .order_by("id")
+        .values_list("id", "name", "email", "ch")
+    )
+    ids = np.array([user[0] for user in users], dtype=np.int64)
+    ch = np.array([user[3] for user in users], dtype=np.int64)
+    count = len(users)
+
+    # position of each entry's user in ids, ids is sorted
+    index = np.searchsorted(ids, entry_users)
+    # 1970-01-01 was a Thursday
+    weekdays = (days + 3) % 7
+
+    logged = np.bincount(index, weights=durations, minlength=count)
+    entry_counts = np.bincount(index, minlength=count)
+    per_weekday = np.bincount(
+        index * 7 + weekdays, weights=durations, minlength=count * 7
+    ).reshape(count, 7)
+
+    required = ch * 3600 * required_factor(start, end)
+    shortfall = np.maximum(required - logged, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(required > 0, logged / required, np.nan)
+
+    # robust z-score (median and median absolute deviation), so a few
+    # extreme users don't hide each other the way they would with mean/std
+    outliers = np.zeros(count, dtype=bool)
+    valid = ~np.isnan(ratio)
+    if valid.sum() >= 3:
+        median = np.median(ratio[valid])
+        mad = np.median(np.abs(ratio[valid] - median))
+        if mad > 0:
+            z = 0.6745 * (ratio - median) / mad
+            outliers = valid & (np.abs(np.nan_to_num(z)) > OUTLIER_Z)
+
+    results = [
+        {
+            "user_id": int(ids[i]),
+            "name": users[i][1],
+            "email": users[i][2],
+            "ch": int(ch[i]),
+            "entries": int(entry_counts[i]),
+            "logged_seconds": int(logged[i]),
+            "required_seconds": int(round(required[i])),
+            "shortfall_seconds": int(round(shortfall[i])),
+            "ratio": None if np.isnan(ratio[i]) else float(ratio[i]),
+            "weekday_seconds": per_weekday[i].astype(int).tolist(),
+            "outlier": bool(outliers[i]),
+        }
+        for i in range(count)
+    ]
+    results.sort(key=lambda row: row["name"])
+    return results
+
+
+def write_csv(fileobj, results):
+    writer = csv.writer(fileobj)
+    writer.writerow(
+        ["Bolsista", "E-mail", "CH", "Atividades", "Horas", "Horas exigidas", "Déficit", "%"]
+        + list(WEEKDAYS)
+        + ["Fora do padrão"]
+    )
+    for row in results:
+        writer.writerow(
+            [
+                row["name"],
+                row["email"],
+                row["ch"],
+                row["entries"],
+                round(row["logged_seconds"] / 3600, 2),
+                round(row["required_seconds"] / 3600, 2),
+                round(row["shortfall_seconds"] / 3600, 2),
+                "" if row["ratio"] is None else round(row["ratio"] * 100, 1),
+            ]
+            + [round(seconds / 3600, 2) for seconds in row["weekday_seconds"]]
+            + ["sim" if row["outlier"] else ""]
+        )
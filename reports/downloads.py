@@ -0,0 +1,111 @@
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header
+
+from .blob_storage import is_blob
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(storage, name):
+    # content-addressed files are named after the hash of their content
+    if is_blob(name):
+        return '"%s"' % os.path.splitext(os.path.basename(name))[0]
+    modified = storage.get_modified_time(name)
+    return f'"{storage.size(name):x}-{int(modified.timestamp()):x}"'
+
+
+def parse_range(header, size):
+    """
+    Inclusive (start, end) of a single "bytes=" range, or None when the
+    whole file should be sent: no header, several ranges or an invalid one.
+    Raises ValueError when the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header or "")
+    if not match or match.groups() == ("", "") or size == 0:
+        return None
+    first, last = match.groups()
+    if not first:
+        # suffix range, the last bytes of the file
+        if int(last) == 0:
+            raise ValueError(header)
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(fileobj, start, length):
+    with fileobj:
+        fileobj.seek(start)
+        while length > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, storage, name, filename, content_type="application/pdf"):
+    """
+    Response sending a stored file. With REPORTS_SENDFILE set the transfer is
+    handed to the front-end server, which then handles Range and If-Range,
+    otherwise the file is streamed from here in chunks, honouring them. Both answer If-None-Match with
+    a 304 without opening the file.
+    """
+    etag = file_etag(storage, name)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = _file_response(request, storage, name, etag, content_type)
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+    response["ETag"] = etag
+    # the browser may keep it, but checks the ETag before every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _file_response(request, storage, name, etag, content_type):
+    if settings.REPORTS_SENDFILE:
+        # the front-end server sends the file and answers Range and If-Range
+        # itself, the request's headers are not looked at here
+        response = HttpResponse(content_type=content_type)
+        if settings.REPORTS_SENDFILE == "x-accel-redirect":
+            response["X-Accel-Redirect"] = settings.REPORTS_SENDFILE_PREFIX + quote(name)
+        else:
+            response["X-Sendfile"] = storage.path(name)
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    size = storage.size(name)
+    byte_range = None
+    # a stale If-Range asks for the whole, current file
+    if request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(storage.open(name), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(storage.open(name), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    return response
@@ -1,5 +1,12 @@
-from django.core.mail import send_mass_mail, EmailMessage
+from datetime import timedelta
+
+from django.core.mail import send_mass_mail, EmailMessage, get_connection
 from django.conf import settings
+from django.db import connection as db_connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
 
 
 def send_mail(subject, message, recipients, bcc=None):
@@ -11,3 +18,122 @@ def send_mail(subject, message, recipients, bcc=None):
         bcc=bcc,
     )
     message.send()
+
+
+def queue_mail(subject, message, recipients, bcc=None, from_email=""):
+    """
+    Same arguments as send_mail, but only writes the message to the outbox.
+    Call it inside the transaction that produced the e-mail so both commit
+    (or roll back) together.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        to=list(recipients),
+        bcc=list(bcc or []),
+    )
+
+
+def queue_mass_mail(datatuple, from_email=""):
+    """
+    Like queue_mail for many messages at once, with a single INSERT.
+    datatuple is a sequence of (subject, message, recipients) tuples, as in
+    Django's send_mass_mail (without the sender).
+    """
+    return OutboxEmail.objects.bulk_create(
+        OutboxEmail(
+            subject=subject, body=message, from_email=from_email, to=list(recipients)
+        )
+        for subject, message, recipients in datatuple
+    )
+
+
+def _retry_delay(attempts):
+    # exponential backoff: base, 2 * base, 4 * base, ...
+    base = getattr(settings, "EMAIL_OUTBOX_RETRY_DELAY", 60)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _claim_batch(batch_size):
+    """
+    Leases up to batch_size due e-mails to the caller: their next attempt is
+    pushed EMAIL_OUTBOX_LEASE seconds away, so other workers skip them while
+    they are being sent, and a worker that dies mid-batch only delays them.
+    The attempt is counted here, before anything is sent.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=getattr(settings, "EMAIL_OUTBOX_LEASE", 300))
+    due = OutboxEmail.objects.filter(
+        status=OutboxEmail.DeliveryStatus.PENDING, next_attempt_at__lte=now
+    )
+    with transaction.atomic():
+        # concurrent workers skip the rows another one is claiming
+        ids = list(
+            due.select_for_update(
+                skip_locked=db_connection.features.has_select_for_update_skip_locked
+            )
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        # still due, unless a worker without row locks claimed it first
+        due.filter(id__in=ids).update(
+            attempts=F("attempts") + 1, next_attempt_at=lease_until
+        )
+    return list(
+        OutboxEmail.objects.filter(id__in=ids, next_attempt_at=lease_until).order_by("id")
+    )
+
+
+def deliver_outbox(batch_size=50):
+    """
+    Sends up to batch_size due outbox e-mails over a single SMTP connection.
+    The e-mails are claimed in a short transaction and sent outside of it,
+    each one is then marked sent or failed on its own. Failed messages are
+    retried with exponential backoff and marked as dead after
+    EMAIL_OUTBOX_MAX_ATTEMPTS attempts. Returns (sent, failed).
+    """
+    max_attempts = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+    sent = failed = 0
+
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return sent, failed
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        connection = None
+        open_error = e
+
+    for email in batch:
+        try:
+            if connection is None:
+                raise open_error
+            EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email or getattr(settings, "EMAIL_HOST_USER", None),
+                to=email.to,
+                bcc=email.bcc,
+                connection=connection,
+            ).send()
+        except Exception as e:
+            failed += 1
+            if email.attempts >= max_attempts:
+                changes = {"status": OutboxEmail.DeliveryStatus.DEAD}
+            else:
+                changes = {"next_attempt_at": timezone.now() + _retry_delay(email.attempts)}
+            OutboxEmail.objects.filter(pk=email.pk).update(last_error=repr(e), **changes)
+        else:
+            sent += 1
+            OutboxEmail.objects.filter(pk=email.pk).update(
+                status=OutboxEmail.DeliveryStatus.SENT,
+                sent_at=timezone.now(),
+                last_error="",
+            )
+
+    if connection is not None:
+        connection.close()
+    return sent, failed
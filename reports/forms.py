@@ -1,5 +1,6 @@
 # forms.py
 from django import forms
+from django.conf import settings
 from .models import ReportEntry, ReportSubmission, CustomUser
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.forms import UserCreationForm
@@ -21,11 +22,26 @@ class ReportEntryForm(forms.ModelForm):
         model = ReportEntry
         fields = ['description', 'date', 'init_hour', 'end_hour']
 
+def pdf_too_large_error():
+    return forms.ValidationError(
+        "O arquivo excede o tamanho máximo de %(mb)d MB.",
+        code="too_large",
+        params={"mb": settings.REPORTS_UPLOAD_MAX_BYTES // (1024 * 1024)},
+    )
+
+
 class ReportSubmissionForm(forms.ModelForm):
     class Meta:
         model = ReportSubmission
         fields = ['pdf_file']
 
+    def clean_pdf_file(self):
+        # HashingFileUploadHandler already skips them, other handlers do not
+        pdf_file = self.cleaned_data["pdf_file"]
+        if pdf_file and pdf_file.size > settings.REPORTS_UPLOAD_MAX_BYTES:
+            raise pdf_too_large_error()
+        return pdf_file
+
 
 class CustomUserCreationForm(UserCreationForm):
     class Meta:
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Rendered fragments are cached under a key that includes the version of the
+# data they show (see the {% cache %} blocks in user_reports.html and
+# report_entries.html): writing the data changes its version and the next page
+# view renders and caches a new fragment. Versions only reach every worker
+# through a shared cache backend, so fragments still expire after
+# REPORTS_FRAGMENT_CACHE_TIMEOUT seconds, which bounds how stale a page can be
+# with a per-process cache such as the default local memory one.
+
+
+def context(request):
+    """Context processor giving the templates the timeout of the fragments."""
+    return {"fragment_timeout": settings.REPORTS_FRAGMENT_CACHE_TIMEOUT}
+
+
+def _user_key(user_id):
+    return f"reports:version:user:{user_id}"
+
+
+def _report_key(report_id):
+    return f"reports:version:report:{report_id}"
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # from the clock rather than from 1, so a version that was evicted or
+        # invalidated never comes back to a value cached fragments still use
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def user_version(user_id):
+    """Version of the reports list of a user."""
+    return _version(_user_key(user_id))
+
+
+def report_version(report_id):
+    """Version of the entries of a report."""
+    return _version(_report_key(report_id))
+
+
+def invalidate(user_ids=(), report_ids=()):
+    """
+    Gives the users and reports a new version. Call it from every path that
+    writes entries, submissions or reports, inside or outside a transaction.
+    """
+    keys = [_user_key(pk) for pk in set(user_ids)]
+    keys += [_report_key(pk) for pk in set(report_ids)]
+    cache.delete_many(keys)
+    # and again once committed: a page rendered before the commit may have
+    # cached the old data under the version taken after the first delete
+    transaction.on_commit(lambda: cache.delete_many(keys))
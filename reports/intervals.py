@@ -0,0 +1,135 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from django.db.models import F
+
+from .models import ReportEntry
+
+OVERLAP = "overlap"
+INVERTED = "inverted"
+OUT_OF_MONTH = "out of month"
+
+
+def is_valid_interval(init_hour, end_hour):
+    """
+    The rule every path that writes or audits entries applies: an entry must
+    start before it ends, so an empty one (init_hour == end_hour) is invalid.
+    """
+    return init_hour < end_hour
+
+
+def overlaps_saved_entry(report_id, day, init_hour, end_hour, exclude=None):
+    """
+    Whether a valid entry of the report on day overlaps [init_hour, end_hour),
+    leaving out the entry with the pk exclude (the one being edited). A single
+    EXISTS query on the (report, date) index.
+    """
+    entries = ReportEntry.objects.filter(
+        report_id=report_id, date=day, init_hour__lt=end_hour, end_hour__gt=init_hour
+    ).filter(init_hour__lt=F("end_hour"))
+    if exclude is not None:
+        entries = entries.exclude(pk=exclude)
+    return entries.exists()
+
+
+def seconds_of(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class DayIntervals:
+    """
+    The time covered by the entries of one day, kept as a sorted list of
+    disjoint [start, end) intervals (the union of the entries, so it stays
+    correct even if overlapping entries were saved in the past). Checking
+    or adding an interval is a couple of binary searches.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def overlaps(self, start, end):
+        i = bisect_right(self.starts, start)
+        if i and self.ends[i - 1] > start:
+            return True
+        return i < len(self.starts) and self.starts[i] < end
+
+    def add(self, start, end):
+        # merge with every interval it touches or overlaps
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+
+class IntervalIndex:
+    """Per-day DayIntervals of the entries of one report."""
+
+    def __init__(self):
+        self.days = defaultdict(DayIntervals)
+
+    @classmethod
+    def for_report(cls, report_id, day=None, exclude=()):
+        """
+        Index of the entries of a report, or only of one of its days, leaving
+        out the entries whose ids are in exclude (the ones being edited).
+        """
+        entries = ReportEntry.objects.filter(report_id=report_id)
+        if day is not None:
+            entries = entries.filter(date=day)
+        index = cls()
+        for pk, date, init_hour, end_hour in entries.values_list(
+            "pk", "date", "init_hour", "end_hour"
+        ):
+            if pk not in exclude and is_valid_interval(init_hour, end_hour):
+                index.add(date, init_hour, end_hour)
+        return index
+
+    def overlaps(self, day, init_hour, end_hour):
+        return day in self.days and self.days[day].overlaps(
+            seconds_of(init_hour), seconds_of(end_hour)
+        )
+
+    def add(self, day, init_hour, end_hour):
+        self.days[day].add(seconds_of(init_hour), seconds_of(end_hour))
+
+
+def audit_reports(first_id, last_id):
+    """
+    Problems in the entries of the reports with first_id <= id <= last_id:
+    a list of (problem, entry_id, report_id, date, init_hour, end_hour,
+    other_entry_id) tuples, other_entry_id being the entry an OVERLAP
+    overlaps (None for the other problems). Runs in a worker process of the
+    audit_entries command.
+    """
+    rows = (
+        ReportEntry.objects.filter(report_id__gte=first_id, report_id__lte=last_id)
+        .order_by("report_id", "date", "init_hour", "id")
+        .values_list(
+            "id", "report_id", "date", "init_hour", "end_hour", "report__ref_month"
+        )
+    )
+    problems = []
+    # sweep line over each day: the entry that ends last so far
+    current_day = None
+    last_end = last_id_seen = None
+    for pk, report_id, day, init_hour, end_hour, ref_month in rows.iterator(
+        chunk_size=5000
+    ):
+        if (day.year, day.month) != (ref_month.year, ref_month.month):
+            problems.append((OUT_OF_MONTH, pk, report_id, day, init_hour, end_hour, None))
+        if not is_valid_interval(init_hour, end_hour):
+            problems.append((INVERTED, pk, report_id, day, init_hour, end_hour, None))
+            continue
+        if current_day != (report_id, day):
+            current_day = (report_id, day)
+            last_end, last_id_seen = end_hour, pk
+            continue
+        if init_hour < last_end:
+            problems.append((OVERLAP, pk, report_id, day, init_hour, end_hour, last_id_seen))
+        if end_hour > last_end:
+            last_end, last_id_seen = end_hour, pk
+    return problems
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from reports.intervals import OVERLAP, audit_reports
+from reports.models import Report
+from reports.pools import new_pool
+
+
+class Command(BaseCommand):
+    help = "Report overlapping, inverted and out-of-month entries of every report"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk_size',
+            type=int,
+            default=2000,
+            help='Number of report ids audited by each task',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of auditing processes (default: one per CPU, 0 audits in this process)',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        bounds = Report.objects.aggregate(first=Min("id"), last=Max("id"))
+        if bounds["first"] is None:
+            self.stdout.write(self.style.SUCCESS("No entries to audit."))
+            return
+        ranges = (
+            (first, min(first + chunk_size - 1, bounds["last"]))
+            for first in range(bounds["first"], bounds["last"] + 1, chunk_size)
+        )
+
+        counts = {}
+        for problems in self.audit(ranges, workers):
+            for problem, pk, report_id, day, init_hour, end_hour, other in problems:
+                counts[problem] = counts.get(problem, 0) + 1
+                line = (
+                    f"{problem}: entry {pk} of report {report_id}, "
+                    f"{day} {init_hour:%H:%M}-{end_hour:%H:%M}"
+                )
+                if problem == OVERLAP:
+                    line += f" (overlaps entry {other})"
+                self.stdout.write(line)
+
+        summary = ", ".join(f"{count} {problem}" for problem, count in sorted(counts.items()))
+        self.stdout.write(self.style.SUCCESS(f"Audit done: {summary or 'no problems'}."))
+
+    def audit(self, ranges, workers):
+        """
+        Yields the problems of each range of report ids as soon as they are
+        found, keeping at most two ranges per worker in flight.
+        """
+        if not workers:
+            for first, last in ranges:
+                yield audit_reports(first, last)
+            return
+
+        with new_pool(workers) as pool:
+            in_flight = set()
+            for first, last in ranges:
+                in_flight.add(pool.submit(audit_reports, first, last))
+                while len(in_flight) >= workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in in_flight:
+                yield future.result()
@@ -0,0 +1,84 @@
+import datetime
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from reports.pdf import generate_pdf
+
+
+def _sample_rows(count):
+    rows = []
+    for i in range(count):
+        rows.append(
+            {
+                "dia": i % 28 + 1,
+                "atividade": f"Atividade de exemplo número {i} com uma descrição "
+                "longa o bastante para quebrar em mais de uma linha na tabela",
+                "inicio": datetime.time(8, 0),
+                "fim": datetime.time(12, 30),
+                "ch": datetime.timedelta(hours=4, minutes=30),
+            }
+        )
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Benchmark generate_pdf: renders per second and allocations per render"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000],
+            help='Number of entries of the benchmarked reports',
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=3.0,
+            help='Minimum time spent rendering each size',
+        )
+
+    def handle(self, *args, **options):
+        header_data = {
+            "bolsista": "Bolsista de Exemplo",
+            "funcao": "Desenvolvedor",
+            "periodo": "09-2026",
+            "telefone": "+55 69 99999-9999",
+            "email": "bolsista@example.com",
+        }
+        # warm up module level state (fonts, the shared layout, ...)
+        generate_pdf(header_data, _sample_rows(1))
+
+        self.stdout.write(
+            f"{'entries':>8} {'renders/s':>10} {'ms/render':>10} "
+            f"{'new blocks':>11} {'retained KiB':>13} {'peak KiB':>10}"
+        )
+        for size in options['sizes']:
+            row_data = _sample_rows(size)
+
+            renders = 0
+            start = time.perf_counter()
+            elapsed = 0.0
+            while renders == 0 or elapsed < options['seconds']:
+                generate_pdf(header_data, row_data)
+                renders += 1
+                elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            generate_pdf(header_data, row_data)
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # allocations made by the render that were still alive at its end,
+            # plus the peak traced memory while it ran
+            stats = after.compare_to(before, "filename")
+            blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+            allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+
+            self.stdout.write(
+                f"{size:>8} {renders / elapsed:>10.2f} {elapsed / renders * 1000:>10.1f} "
+                f"{blocks:>11} {allocated / 1024:>13.1f} {peak / 1024:>10.1f}"
+            )
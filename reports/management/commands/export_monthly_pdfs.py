@@ -0,0 +1,60 @@
+import os
+import tempfile
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from reports.models import Report
+from reports.pdf_export import iter_report_pdfs, write_zip
+
+
+class Command(BaseCommand):
+    help = "Export the PDF of every report of a month into a ZIP archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            required=True,
+            help='Reference month in the YYYY-MM format',
+        )
+        parser.add_argument(
+            '--output',
+            help='Path of the ZIP archive (default: relatorios-YYYY-MM.zip)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of rendering processes (default: one per CPU)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            month = datetime.strptime(options['month'], "%Y-%m").date()
+        except ValueError:
+            raise CommandError("--month must be in the YYYY-MM format")
+
+        next_month = month.replace(
+            year=month.year + month.month // 12, month=month.month % 12 + 1
+        )
+        reports = (
+            Report.objects.filter(ref_month__gte=month, ref_month__lt=next_month)
+            .select_related("user__role")
+            .order_by("user__name")
+        )
+        output = options['output'] or f"relatorios-{options['month']}.zip"
+
+        # written next to the output and renamed over it once complete, so a
+        # failed export never leaves a truncated archive behind
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(output)), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as zip_file:
+                count = write_zip(
+                    zip_file, iter_report_pdfs(reports.iterator(), options['workers'])
+                )
+            os.replace(tmp_path, output)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.stdout.write(self.style.SUCCESS(f"{count} PDFs exported to {output}."))
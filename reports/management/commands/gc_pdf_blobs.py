@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from reports.blob_storage import BLOB_DIR, blob_storage
+from reports.models import PdfBlob, ReportSubmission
+
+
+class Command(BaseCommand):
+    help = "Delete the submitted PDF files no submission points at anymore"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace_hours',
+            type=float,
+            default=settings.REPORTS_BLOB_GC_GRACE_HOURS,
+            help='Only delete files unreferenced for at least this long',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute the reference counts from the submissions first',
+        )
+        parser.add_argument(
+            '--dry_run',
+            action='store_true',
+            help='List the files that would be deleted without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        if options['recount'] and not dry_run:
+            self.stdout.write(f"{PdfBlob.objects.recount()} reference counts recomputed.")
+
+        # the count is only trusted when no submission says otherwise
+        referenced = ReportSubmission.objects.values("pdf_file")
+        candidates = []
+        unreferenced = (
+            PdfBlob.objects.filter(ref_count=0, updated_at__lt=cutoff)
+            .exclude(name__in=referenced)
+            .values_list("pk", "name")
+        )
+        for pk, name in list(unreferenced):
+            # the row goes first, a file is only deleted if nothing took it back
+            still_unreferenced = PdfBlob.objects.filter(
+                pk=pk, ref_count=0, updated_at__lt=cutoff
+            )
+            if dry_run or still_unreferenced.delete()[0]:
+                candidates.append(name)
+
+        # files written by uploads whose submission was never saved have no row
+        known = set(PdfBlob.objects.values_list("name", flat=True))
+        known.update(
+            referenced.filter(pdf_file__startswith=f"{BLOB_DIR}/").values_list(
+                "pdf_file", flat=True
+            )
+        )
+        known.update(candidates)
+        if blob_storage.exists(BLOB_DIR):
+            for directory in blob_storage.listdir(BLOB_DIR)[0]:
+                for filename in blob_storage.listdir(f"{BLOB_DIR}/{directory}")[1]:
+                    name = f"{BLOB_DIR}/{directory}/{filename}"
+                    if name not in known and blob_storage.get_modified_time(name) < cutoff:
+                        candidates.append(name)
+
+        deleted = freed = 0
+        for name in candidates:
+            exists = blob_storage.exists(name)
+            size = blob_storage.size(name) if exists else 0
+            if dry_run:
+                self.stdout.write(name)
+            elif exists and not blob_storage.delete_unless_touched(name, cutoff):
+                # uploaded again since the cutoff, the upload's row will count it
+                continue
+            deleted += 1
+            freed += size
+
+        if dry_run:
+            self.stdout.write(
+                f"[DRY_RUN] {deleted} files ({freed} bytes) would be deleted."
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"{deleted} files ({freed} bytes) deleted.")
+            )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reports.models import MonthlyHours, Report
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly hours rollup behind the admin dashboard from the reports"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=2000,
+            help='Number of reports read and written at a time',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            MonthlyHours.objects.all().delete()
+            MonthlyHours.objects.refresh(
+                Report.objects.all(), batch_size=options['batch_size']
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{MonthlyHours.objects.count()} rollup rows rebuilt.")
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from reports.models import Report
+
+
+class Command(BaseCommand):
+    help = "Backfill or repair the denormalized aggregate columns of every report"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry_run',
+            action='store_true',
+            help='Only report which reports are out of sync (nothing is written)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if not dry_run:
+            updated = Report.objects.all().refresh_aggregates()
+            self.stdout.write(self.style.SUCCESS(f"{updated} reports rebuilt."))
+            return
+
+        fields = ["total_seconds", "entry_count", "current_state", "latest_submission"]
+        checked = 0
+        out_of_sync = 0
+        reports = Report.objects.select_related("latest_submission").order_by("pk")
+        for report in reports.iterator(chunk_size=500):
+            checked += 1
+            aggregates = report.compute_aggregates()
+            if any(getattr(report, field) != aggregates[field] for field in fields):
+                out_of_sync += 1
+                self.stdout.write(f"Out of sync: report {report.pk} ({report})")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[DRY_RUN] {out_of_sync} of {checked} reports out of sync."
+            )
+        )
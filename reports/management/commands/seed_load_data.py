@@ -0,0 +1,295 @@
+import calendar
+import random
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from reports.models import (
+    CustomUser,
+    Eixo,
+    PdfBlob,
+    Report,
+    ReportEntry,
+    ReportSubmission,
+    Role,
+    Scholarship,
+    SubmissionStatusEvent,
+)
+
+SCHOLARSHIPS = ["Iniciação Científica", "Extensão", "Pesquisa", "Inovação"]
+ROLES = ["Bolsista", "Desenvolvedor", "Designer", "Pesquisador"]
+EIXOS = ["Ensino", "Pesquisa", "Extensão", "Inovação"]
+DESCRIPTIONS = [
+    "Reunião com a equipe do projeto",
+    "Desenvolvimento de funcionalidades do sistema",
+    "Revisão bibliográfica",
+    "Elaboração de relatório técnico",
+    "Atendimento à comunidade",
+    "Testes e correção de erros",
+    "Preparação de material didático",
+    "Participação em evento científico",
+]
+
+# Smallest file every PDF reader accepts, shared by all the seeded submissions
+DUMMY_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+def _months_back(today, count):
+    """First day of the last count months, the current one included, oldest first."""
+    index = today.year * 12 + today.month - 1
+    return [date(i // 12, i % 12 + 1, 1) for i in range(index - count + 1, index + 1)]
+
+
+def _ensure(model, names):
+    if not model.objects.exists():
+        model.objects.bulk_create(model(name=name) for name in names)
+    return list(model.objects.order_by("pk"))
+
+
+class Command(BaseCommand):
+    help = "Populate the database with synthetic users, reports, entries and submissions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100,
+            help='Number of bolsistas to create',
+        )
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=12,
+            help='Number of monthly reports per user, ending at the current month',
+        )
+        parser.add_argument(
+            '--entries_per_report',
+            type=int,
+            default=20,
+            help='Average number of entries per report',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the random generator, the same seed generates the same data',
+        )
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=5000,
+            help='Number of rows per INSERT',
+        )
+        parser.add_argument(
+            '--domain',
+            default='carga.example.com',
+            help='E-mail domain of the generated users',
+        )
+
+    def handle(self, *args, **options):
+        domain = options['domain']
+        batch_size = options['batch_size']
+        entries_per_report = options['entries_per_report']
+        if CustomUser.objects.filter(email__endswith=f"@{domain}").exists():
+            raise CommandError(
+                f"There are already users @{domain}, choose another --domain"
+            )
+
+        rng = random.Random(options['seed'])
+        months = _months_back(date.today(), options['months'])
+        start = perf_counter()
+
+        with transaction.atomic():
+            scholarships = _ensure(Scholarship, SCHOLARSHIPS)
+            roles = _ensure(Role, ROLES)
+            eixos = _ensure(Eixo, EIXOS)
+            reviewer = CustomUser.objects.create_user(
+                f"coordenador@{domain}", None, name="Coordenador", is_staff=True
+            )
+            # stored like an upload, bulk_create skips the signals counting it
+            storage = ReportSubmission._meta.get_field("pdf_file").storage
+            pdf_name = storage.save("carga.pdf", ContentFile(DUMMY_PDF))
+            # hashing is deliberately slow, so every user shares one password
+            password = make_password("senha")
+
+            users = CustomUser.objects.bulk_create(
+                (
+                    CustomUser(
+                        email=f"bolsista{n}@{domain}",
+                        name=f"Bolsista {n}",
+                        password=password,
+                        scholarship=rng.choice(scholarships),
+                        role=rng.choice(roles),
+                        eixo=rng.choice(eixos),
+                        ch=rng.choice([20, 30, 40]),
+                    )
+                    for n in range(options['users'])
+                ),
+                batch_size=batch_size,
+            )
+
+            entries = []
+            entry_count = 0
+            report_count = 0
+            submission_count = 0
+            # reports are inserted one slice of users at a time so their
+            # primary keys are known before the entries pointing at them
+            users_per_batch = max(1, batch_size // max(1, len(months)))
+            for first in range(0, len(users), users_per_batch):
+                reports = Report.objects.bulk_create(
+                    Report(user=user, ref_month=month)
+                    for user in users[first:first + users_per_batch]
+                    for month in months
+                )
+                report_count += len(reports)
+
+                submissions = []
+                for report in reports:
+                    days = calendar.monthrange(report.ref_month.year, report.ref_month.month)[1]
+                    count = rng.randint(entries_per_report // 2, entries_per_report * 3 // 2)
+                    # end of the last entry of each day, so entries of the
+                    # same day never overlap
+                    day_ends = {}
+                    for _ in range(count):
+                        day = rng.randint(1, days)
+                        init = max(rng.randint(14, 34) * 30, day_ends.get(day, 0))
+                        end = init + rng.randint(2, 8) * 30
+                        if end > 23 * 60:
+                            continue
+                        day_ends[day] = end
+                        init_hour = time(init // 60, init % 60)
+                        end_hour = time(end // 60, end % 60)
+                        entries.append(
+                            ReportEntry(
+                                report=report,
+                                description=rng.choice(DESCRIPTIONS),
+                                date=report.ref_month.replace(day=day),
+                                init_hour=init_hour,
+                                end_hour=end_hour,
+                                # bulk_create bypasses save(), which fills it in
+                                duration=ReportEntry.duration_between(init_hour, end_hour),
+                            )
+                        )
+                    if len(entries) >= batch_size:
+                        ReportEntry.objects.bulk_create(entries, batch_size=batch_size)
+                        entry_count += len(entries)
+                        entries = []
+
+                    submissions.extend(self.submissions_for(report, months, rng, reviewer, pdf_name))
+                self.create_submissions(submissions, reviewer, batch_size)
+                submission_count += len(submissions)
+                self.stdout.write(
+                    f"{min(first + users_per_batch, len(users))}/{len(users)} users, "
+                    f"{entry_count + len(entries)} entries "
+                    f"({perf_counter() - start:.1f}s)"
+                )
+
+            ReportEntry.objects.bulk_create(entries, batch_size=batch_size)
+            entry_count += len(entries)
+
+            if submission_count:
+                PdfBlob.objects.acquire(pdf_name, len(DUMMY_PDF), count=submission_count)
+            # bulk_create skips the signals that keep the aggregates in sync
+            Report.objects.filter(user__email__endswith=f"@{domain}").refresh_aggregates()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(users)} users, {report_count} reports, {entry_count} entries and "
+                f"{submission_count} submissions created in "
+                f"{perf_counter() - start:.1f}s."
+            )
+        )
+
+    def submissions_for(self, report, months, rng, reviewer, pdf_name):
+        """
+        A mix of submission histories: the current month stays open, older
+        months are mostly approved, some after a rejection, and a few are
+        still waiting for review or were never submitted. Returns
+        (submission, submitted_at, reviewed_at) tuples, reviewed_at is None
+        for the pending ones.
+        """
+        Status = ReportSubmission.ReportStatus
+        if report.ref_month == months[-1]:
+            return []
+        outcome = rng.random()
+        if outcome < 0.05:
+            history = []
+        elif outcome < 0.15:
+            history = [Status.PENDING]
+        elif outcome < 0.25:
+            history = [Status.REJECTED]
+        elif outcome < 0.35:
+            history = [Status.REJECTED, Status.APPROVED]
+        else:
+            history = [Status.APPROVED]
+
+        # submitted in the first days of the next month, reviewed a few days
+        # later and, after a rejection, submitted again a few days after that
+        next_month = (report.ref_month + timedelta(days=31)).replace(day=1)
+        moment = timezone.make_aware(datetime.combine(next_month, time(8)))
+        now = timezone.now()
+        submissions = []
+        for status in history:
+            moment += timedelta(days=rng.randint(0, 4), minutes=rng.randint(0, 600))
+            submitted_at = min(moment, now)
+            reviewed_at = None
+            if status != Status.PENDING:
+                moment += timedelta(days=rng.randint(1, 6), minutes=rng.randint(0, 600))
+                reviewed_at = min(moment, now)
+            submission = ReportSubmission(
+                report=report,
+                status=status,
+                reviewer=None if status == Status.PENDING else reviewer,
+                reason="Horas inconsistentes" if status == Status.REJECTED else "",
+                pdf_file=pdf_name,
+            )
+            submissions.append((submission, submitted_at, reviewed_at))
+        return submissions
+
+    def create_submissions(self, submissions, reviewer, batch_size):
+        """
+        Inserts the submissions of submissions_for with their timestamps and
+        the status events the signals would have recorded: created pending,
+        then changed by the reviewer.
+        """
+        Status = ReportSubmission.ReportStatus
+        ReportSubmission.objects.bulk_create(
+            [submission for submission, _, _ in submissions], batch_size=batch_size
+        )
+        events = []
+        for submission, submitted_at, reviewed_at in submissions:
+            # bulk_create set both to now, bulk_update leaves them alone
+            submission.submitted_at = submitted_at
+            submission.last_status_change = reviewed_at or submitted_at
+            events.append(
+                SubmissionStatusEvent(
+                    submission=submission,
+                    new_status=Status.PENDING,
+                    changed_at=submitted_at,
+                )
+            )
+            if reviewed_at:
+                events.append(
+                    SubmissionStatusEvent(
+                        submission=submission,
+                        old_status=Status.PENDING,
+                        new_status=submission.status,
+                        changed_by=reviewer,
+                        changed_at=reviewed_at,
+                    )
+                )
+        ReportSubmission.objects.bulk_update(
+            [submission for submission, _, _ in submissions],
+            ["submitted_at", "last_status_change"],
+            batch_size=batch_size,
+        )
+        SubmissionStatusEvent.objects.bulk_create(events, batch_size=batch_size)
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
+from django.db import transaction
 from datetime import datetime, timedelta
-from reports.models import Report, ReportSubmission
+from reports.email import deliver_outbox, queue_mail
+from reports.models import MonthlyReminder, Report, ReportSubmission
 
 
 class Command(BaseCommand):
@@ -13,9 +14,27 @@ class Command(BaseCommand):
             action='store_true',
             help='Run in dry run mode (no actual emails sent)',
         )
+        parser.add_argument(
+            '--chunk_size',
+            type=int,
+            default=50,
+            help='Maximum number of BCC recipients per e-mail',
+        )
+        parser.add_argument(
+            '--personalised',
+            action='store_true',
+            help='Send one e-mail per user instead of BCC chunks',
+        )
+        parser.add_argument(
+            '--send_now',
+            action='store_true',
+            help='Deliver the queued e-mails right away instead of leaving them '
+            'to send_queued_emails',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
 
         # Check if it's the last day of the month
         today = datetime.now()
@@ -25,31 +44,80 @@ class Command(BaseCommand):
             report_day = today
         else:
             report_day = today + timedelta(days=-today.day)
+        month_start = report_day.date().replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
 
-        # get all reports from the current month that doens't have a submission in the state of 'pending' or 'approved'
-        reports = Report.objects.filter(ref_month__month=report_day.month).exclude(
-            submissions__status__in=[
-                ReportSubmission.ReportStatus.APPROVED,
-                ReportSubmission.ReportStatus.PENDING,
-            ]
+        # e-mails of the users with a report of the month that doesn't have a
+        # submission in the state of 'pending' or 'approved' and that were not
+        # reminded yet. Range lookups on ref_month so the year is taken into
+        # account and the index on (user, ref_month) can be used.
+        pending = (
+            Report.objects.filter(ref_month__gte=month_start, ref_month__lt=next_month)
+            .exclude(
+                submissions__status__in=[
+                    ReportSubmission.ReportStatus.APPROVED,
+                    ReportSubmission.ReportStatus.PENDING,
+                ]
+            )
+            .exclude(user__monthly_reminders__ref_month=month_start)
+            .values_list("user_id", "user__email")
+            .distinct()
+            .order_by("user_id")
         )
 
         template = "Olá, bolsita PROCINT!\nEste é um lembrete automático de que você tem até o dia 5 enviar o relatório mensal do mês de {}."
         subject = "[PROCINT] Lembrete Mensal"
         sender = "julianofischer@gmail.com"
         recipients = ["julianofischer@gmail.com"]
-        bcc = [report.user.email for report in reports]
         template = template.format(report_day.strftime("%B"))
-        if not dry_run:
-            send_mail(
-                subject,
-                template,
-                sender,
-                recipients,
-                fail_silently=False,
-                bcc=bcc,
-            )
-            self.stdout.write(self.style.SUCCESS("Emails sent successfully."))
-        else:
-            print(f"Subject: {subject}, Template: {template}, Recipients: {recipients}")
-            self.stdout.write(self.style.SUCCESS("[DRY_RUN] Emails sent successfully."))
\ No newline at end of file
+
+        reminded = 0
+        last_user_id = 0
+        while True:
+            # keyset pagination: one small query per chunk, never the whole list
+            chunk = list(pending.filter(user_id__gt=last_user_id)[:chunk_size])
+            if not chunk:
+                break
+            last_user_id = chunk[-1][0]
+            reminded += len(chunk)
+
+            if dry_run:
+                print(f"Subject: {subject}, Template: {template}, Recipients: {recipients}, BCC: {[email for _, email in chunk]}")
+                continue
+
+            # the outbox rows and the delivery records commit together, so a
+            # crashed or repeated run picks up exactly where it stopped
+            with transaction.atomic():
+                if options['personalised']:
+                    reminders = [
+                        MonthlyReminder(
+                            user_id=user_id,
+                            ref_month=month_start,
+                            email=queue_mail(subject, template, [email], from_email=sender),
+                        )
+                        for user_id, email in chunk
+                    ]
+                else:
+                    email = queue_mail(
+                        subject,
+                        template,
+                        recipients,
+                        bcc=[email for _, email in chunk],
+                        from_email=sender,
+                    )
+                    reminders = [
+                        MonthlyReminder(user_id=user_id, ref_month=month_start, email=email)
+                        for user_id, _ in chunk
+                    ]
+                MonthlyReminder.objects.bulk_create(reminders)
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"[DRY_RUN] {reminded} users would be reminded."))
+            return
+
+        if options['send_now']:
+            while True:
+                sent, failed = deliver_outbox()
+                if not sent and not failed:
+                    break
+        self.stdout.write(self.style.SUCCESS(f"Emails queued successfully for {reminded} users."))
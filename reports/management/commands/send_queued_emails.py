@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from reports.email import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver the e-mails waiting in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=50,
+            help='Number of e-mails sent over each SMTP connection',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling the outbox every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Seconds to wait between polls in --loop mode',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = deliver_outbox(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent + failed < options['batch_size']:
+                    break
+
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(f"{total_sent} e-mails sent, {total_failed} failed.")
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
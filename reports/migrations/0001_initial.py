@@ -0,0 +1,159 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.manager
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('name', models.CharField(max_length=30, verbose_name='Nome')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('is_staff', models.BooleanField(default=False)),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ch', models.IntegerField(default=0)),
+                ('phone_number', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=128, null=True, region='BR')),
+            ],
+            options={
+                'verbose_name': 'Usuário',
+                'verbose_name_plural': 'Usuários',
+            },
+        ),
+        migrations.CreateModel(
+            name='Eixo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+            ],
+            options={
+                'verbose_name': 'Eixo',
+                'verbose_name_plural': 'Eixos',
+            },
+        ),
+        migrations.CreateModel(
+            name='Report',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ref_month', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Relatório',
+                'verbose_name_plural': 'Relatórios',
+            },
+        ),
+        migrations.CreateModel(
+            name='Role',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256)),
+            ],
+            options={
+                'verbose_name': 'Função',
+                'verbose_name_plural': 'Funções',
+            },
+        ),
+        migrations.CreateModel(
+            name='Scholarship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256)),
+            ],
+            options={
+                'verbose_name': 'Tipo de Bolsa',
+                'verbose_name_plural': 'Tipos de Bolsas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('Em análise', 'Pending'), ('Aprovado', 'Approved'), ('Rejeitado', 'Rejected')], default='Em análise', max_length=10)),
+                ('last_status_change', models.DateTimeField(auto_now=True)),
+                ('pdf_file', models.FileField(upload_to='reports')),
+                ('reason', models.CharField(blank=True, max_length=1024)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='reports.report')),
+                ('reviewer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Relatório entregue',
+                'verbose_name_plural': 'Relatórios entregues',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=1024)),
+                ('date', models.DateField()),
+                ('init_hour', models.TimeField()),
+                ('end_hour', models.TimeField()),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='reports.report')),
+            ],
+            options={
+                'verbose_name': 'Atividade',
+                'verbose_name_plural': 'Atividades',
+            },
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='eixo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='reports.eixo'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='groups',
+            field=models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='role',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='reports.role'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='scholarship',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='reports.scholarship'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='user_permissions',
+            field=models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions'),
+        ),
+        migrations.CreateModel(
+            name='PendingReportSubmission',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Relatório pendente de análise',
+                'verbose_name_plural': 'Relatórios pendentes de análise',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('reports.reportsubmission',),
+            managers=[
+                ('manager', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
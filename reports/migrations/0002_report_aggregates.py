@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:40
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_report_aggregates(apps, schema_editor):
+    Report = apps.get_model("reports", "Report")
+    for report in Report.objects.iterator(chunk_size=500):
+        total = datetime.timedelta(0)
+        count = 0
+        for init_hour, end_hour in report.entries.values_list("init_hour", "end_hour"):
+            total += datetime.timedelta(
+                hours=end_hour.hour - init_hour.hour,
+                minutes=end_hour.minute - init_hour.minute,
+                seconds=end_hour.second - init_hour.second,
+            )
+            count += 1
+        latest_submission = report.submissions.order_by("-id").first()
+        Report.objects.filter(pk=report.pk).update(
+            total_duration=total,
+            entry_count=count,
+            current_state=latest_submission.status if latest_submission else "Aberto",
+            latest_submission=latest_submission,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='current_state',
+            field=models.CharField(default='Aberto', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='entry_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='latest_submission',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reports.reportsubmission'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='total_duration',
+            field=models.DurationField(default=datetime.timedelta(0), editable=False),
+        ),
+        migrations.RunPython(backfill_report_aggregates, migrations.RunPython.noop),
+    ]
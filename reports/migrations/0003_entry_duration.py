@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_durations(apps, schema_editor):
+    ReportEntry = apps.get_model("reports", "ReportEntry")
+    Report = apps.get_model("reports", "Report")
+
+    batch = []
+    for entry in ReportEntry.objects.only("init_hour", "end_hour").iterator(
+        chunk_size=2000
+    ):
+        entry.duration = (
+            (entry.end_hour.hour - entry.init_hour.hour) * 3600
+            + (entry.end_hour.minute - entry.init_hour.minute) * 60
+            + (entry.end_hour.second - entry.init_hour.second)
+        )
+        batch.append(entry)
+        if len(batch) == 2000:
+            ReportEntry.objects.bulk_update(batch, ["duration"])
+            batch = []
+    ReportEntry.objects.bulk_update(batch, ["duration"])
+
+    entries = (
+        ReportEntry.objects.filter(report=OuterRef("pk")).order_by().values("report")
+    )
+    Report.objects.update(
+        total_seconds=Coalesce(
+            Subquery(entries.annotate(total=Sum("duration")).values("total")), 0
+        ),
+        entry_count=Coalesce(
+            Subquery(entries.annotate(count=Count("id")).values("count")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report_aggregates'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='report',
+            name='total_duration',
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='total_seconds',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reportentry',
+            name='duration',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_durations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_outbox_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ref_month', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reports.outboxemail')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_reminders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lembrete mensal',
+                'verbose_name_plural': 'Lembretes mensais',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyreminder',
+            constraint=models.UniqueConstraint(fields=('user', 'ref_month'), name='unique_monthly_reminder'),
+        ),
+    ]
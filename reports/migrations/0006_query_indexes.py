@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_monthly_reminder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reportentry',
+            index=models.Index(fields=['report', 'date'], name='entry_report_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportsubmission',
+            index=models.Index(fields=['report', 'status'], name='submission_report_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportsubmission',
+            index=models.Index(fields=['report', 'submitted_at'], name='submission_report_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='report',
+            constraint=models.UniqueConstraint(fields=('user', 'ref_month'), name='unique_report_user_ref_month'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_status_events(apps, schema_editor):
+    # the earlier history is unknown, start it with the current status
+    ReportSubmission = apps.get_model("reports", "ReportSubmission")
+    SubmissionStatusEvent = apps.get_model("reports", "SubmissionStatusEvent")
+    events = (
+        SubmissionStatusEvent(
+            submission_id=submission.pk,
+            new_status=submission.status,
+            changed_by_id=submission.reviewer_id,
+            changed_at=submission.last_status_change,
+        )
+        for submission in ReportSubmission.objects.iterator(chunk_size=500)
+    )
+    SubmissionStatusEvent.objects.bulk_create(events, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.CharField(blank=True, choices=[('Em análise', 'Pending'), ('Aprovado', 'Approved'), ('Rejeitado', 'Rejected')], max_length=10)),
+                ('new_status', models.CharField(choices=[('Em análise', 'Pending'), ('Aprovado', 'Approved'), ('Rejeitado', 'Rejected')], max_length=10)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='reports.reportsubmission')),
+            ],
+            options={
+                'verbose_name': 'Mudança de situação',
+                'verbose_name_plural': 'Histórico de situações',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(backfill_status_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_monthly_hours(apps, schema_editor):
+    Report = apps.get_model("reports", "Report")
+    MonthlyHours = apps.get_model("reports", "MonthlyHours")
+    rows = Report.objects.values_list(
+        "ref_month",
+        "user_id",
+        "user__eixo_id",
+        "user__scholarship_id",
+        "user__role_id",
+        "total_seconds",
+        "entry_count",
+        "current_state",
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(
+            MonthlyHours(
+                ref_month=row[0],
+                user_id=row[1],
+                eixo_id=row[2],
+                scholarship_id=row[3],
+                role_id=row[4],
+                total_seconds=row[5],
+                entry_count=row[6],
+                state=row[7],
+            )
+        )
+        if len(batch) == 2000:
+            MonthlyHours.objects.bulk_create(batch)
+            batch = []
+    MonthlyHours.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_submission_status_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ref_month', models.DateField()),
+                ('total_seconds', models.IntegerField(default=0)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('state', models.CharField(default='Aberto', max_length=10)),
+                ('eixo', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reports.eixo')),
+                ('role', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reports.role')),
+                ('scholarship', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reports.scholarship')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Horas por mês',
+                'verbose_name_plural': 'Horas por mês',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyhours',
+            constraint=models.UniqueConstraint(fields=('ref_month', 'user'), name='unique_monthly_hours'),
+        ),
+        migrations.RunPython(backfill_monthly_hours, migrations.RunPython.noop),
+    ]
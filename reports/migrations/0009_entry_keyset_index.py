@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_monthly_hours'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reportentry',
+            name='entry_report_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reportentry',
+            index=models.Index(fields=['report', 'date', 'id'], name='entry_report_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:35
+
+from django.db import migrations, models
+import django.utils.timezone
+import reports.blob_storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_entry_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Arquivo PDF',
+                'verbose_name_plural': 'Arquivos PDF',
+            },
+        ),
+        migrations.AlterField(
+            model_name='reportsubmission',
+            name='pdf_file',
+            field=models.FileField(storage=reports.blob_storage.ContentAddressedStorage(), upload_to='pdfs'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+OPEN_STATE = "Aberto"
+
+
+def normalize_ref_months(apps, schema_editor):
+    """
+    Moves every report to the first day of its month. A report landing on a
+    month the user already has a report for is merged into that one: its
+    entries and submissions are moved over and it is deleted.
+    """
+    Report = apps.get_model("reports", "Report")
+    ReportEntry = apps.get_model("reports", "ReportEntry")
+    ReportSubmission = apps.get_model("reports", "ReportSubmission")
+    MonthlyHours = apps.get_model("reports", "MonthlyHours")
+
+    misplaced = Report.objects.exclude(ref_month__day=1).order_by("id")
+    for report in list(misplaced.select_related("user")):
+        month = report.ref_month.replace(day=1)
+        MonthlyHours.objects.filter(user=report.user, ref_month=report.ref_month).delete()
+        kept = Report.objects.filter(user=report.user, ref_month=month).first()
+        if kept is None:
+            report.ref_month = month
+            report.save(update_fields=["ref_month"])
+            kept = report
+        else:
+            ReportEntry.objects.filter(report=report).update(report=kept)
+            ReportSubmission.objects.filter(report=report).update(report=kept)
+            report.delete()
+            totals = ReportEntry.objects.filter(report=kept).aggregate(
+                total=Sum("duration"), count=Count("id")
+            )
+            latest = ReportSubmission.objects.filter(report=kept).order_by("-id").first()
+            kept.total_seconds = totals["total"] or 0
+            kept.entry_count = totals["count"]
+            kept.latest_submission = latest
+            kept.current_state = latest.status if latest else OPEN_STATE
+            kept.save(
+                update_fields=[
+                    "total_seconds", "entry_count", "latest_submission", "current_state"
+                ]
+            )
+
+        user = report.user
+        MonthlyHours.objects.update_or_create(
+            user=user,
+            ref_month=month,
+            defaults={
+                "eixo_id": user.eixo_id,
+                "scholarship_id": user.scholarship_id,
+                "role_id": user.role_id,
+                "total_seconds": kept.total_seconds,
+                "entry_count": kept.entry_count,
+                "state": kept.current_state,
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0011_pdf_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_ref_months, migrations.RunPython.noop),
+    ]
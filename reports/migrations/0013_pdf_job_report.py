@@ -0,0 +1,23 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def forget_jobs(apps, schema_editor):
+    # jobs only matter for JOB_TIMEOUT and none of them knows its report
+    apps.get_model("reports", "PdfJob").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0012_report_ref_month_first_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(forget_jobs, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='pdfjob',
+            name='report',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='reports.report'),
+        ),
+    ]
@@ -4,11 +4,15 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 from django.db import models
+from django.db.models import Avg, Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
-from datetime import datetime, timedelta
+from datetime import timedelta
 from phonenumber_field.modelfields import PhoneNumberField
+from . import fragment_cache
+from .blob_storage import blob_storage
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -92,12 +96,65 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = "Usuários"
 
 
+OPEN_STATE = "Aberto"
+
+
+class ReportQuerySet(models.QuerySet):
+    def with_total_hours(self):
+        """
+        Annotates each report with ``entries_seconds``, the sum of its entry
+        durations computed by the database.
+        """
+        return self.annotate(
+            entries_seconds=Coalesce(Sum("entries__duration"), 0)
+        )
+
+    def refresh_aggregates(self):
+        """
+        Recomputes the denormalized aggregate columns of every report in the
+        queryset with a single UPDATE, and invalidates the cached pages
+        showing them.
+        """
+        ids = list(self.order_by().values_list("pk", "user_id"))
+        entries = (
+            ReportEntry.objects.filter(report=OuterRef("pk"))
+            .order_by()
+            .values("report")
+        )
+        latest_submission = ReportSubmission.objects.filter(
+            report=OuterRef("pk")
+        ).order_by("-id")
+        updated = self.update(
+            total_seconds=Coalesce(
+                Subquery(entries.annotate(total=Sum("duration")).values("total")), 0
+            ),
+            entry_count=Coalesce(
+                Subquery(entries.annotate(count=Count("id")).values("count")), 0
+            ),
+            current_state=Coalesce(
+                Subquery(latest_submission.values("status")[:1]),
+                Value(OPEN_STATE),
+            ),
+            latest_submission=Subquery(latest_submission.values("id")[:1]),
+        )
+        MonthlyHours.objects.refresh(self)
+        fragment_cache.invalidate(
+            user_ids=[user_id for _, user_id in ids], report_ids=[pk for pk, _ in ids]
+        )
+        return updated
+
+
 # Create your models here.
 class Report(models.Model):
     
     class Meta:
         verbose_name = "Relatório"
         verbose_name_plural = "Relatórios"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ref_month"], name="unique_report_user_ref_month"
+            )
+        ]
 
     created_at = models.DateTimeField(auto_now_add=True)
     ref_month = models.DateField()
@@ -105,21 +162,62 @@ class Report(models.Model):
         "reports.CustomUser", related_name="reports", on_delete=models.CASCADE
     )
 
+    # Denormalized aggregates, kept in sync by the signals in reports.signals
+    # (see update_aggregates) and repairable with the
+    # rebuild_report_aggregates management command.
+    total_seconds = models.IntegerField(default=0, editable=False)
+    entry_count = models.PositiveIntegerField(default=0, editable=False)
+    current_state = models.CharField(
+        max_length=10, default=OPEN_STATE, editable=False
+    )
+    latest_submission = models.ForeignKey(
+        "reports.ReportSubmission",
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    objects = ReportQuerySet.as_manager()
+
     @property
     def total_hours(self):
-        return sum([entry.hours for entry in self.entries.all()], timedelta(0))
-    
+        return timedelta(seconds=self.total_seconds)
+
     @property
     def state(self):
-        if self.submissions.exists():
-            return self.submissions.last().status
-        return "Aberto"
-    
+        return self.current_state
+
     @property
     def last_submission(self):
-        if self.submissions.exists():
-            return self.submissions.last()
-        return None
+        return self.latest_submission
+
+    def compute_aggregates(self):
+        """
+        Recomputes the denormalized columns from the entries and submissions
+        tables and returns them as a dict, without saving.
+        """
+        totals = self.entries.aggregate(
+            total_seconds=Coalesce(Sum("duration"), 0), entry_count=Count("id")
+        )
+        latest_submission = self.submissions.order_by("-id").first()
+        return {
+            **totals,
+            "current_state": (
+                latest_submission.status if latest_submission else OPEN_STATE
+            ),
+            "latest_submission": latest_submission,
+        }
+
+    def update_aggregates(self):
+        aggregates = self.compute_aggregates()
+        for field, value in aggregates.items():
+            setattr(self, field, value)
+        # update() instead of save() so a concurrent edit of the report itself
+        # is never overwritten and no signals are fired
+        Report.objects.filter(pk=self.pk).update(**aggregates)
+        MonthlyHours.objects.refresh(Report.objects.filter(pk=self.pk))
 
     def formatted_ref_month(self):
         return self.ref_month.strftime('%m-%Y')
@@ -128,10 +226,36 @@ class Report(models.Model):
         return f"{self.user} - {self.formatted_ref_month()} ({self.total_hours})"
 
 
+class ReportEntryQuerySet(models.QuerySet):
+    def total_duration(self):
+        seconds = self.aggregate(total=Coalesce(Sum("duration"), 0))["total"]
+        return timedelta(seconds=seconds)
+
+    def average_duration(self):
+        seconds = self.aggregate(average=Avg("duration"))["average"]
+        return timedelta(seconds=seconds or 0)
+
+    def per_day(self):
+        """
+        Returns one row per date with the summed ``total_seconds`` and the
+        number of entries of that day.
+        """
+        return (
+            self.order_by()
+            .values("date")
+            .annotate(total_seconds=Sum("duration"), entry_count=Count("id"))
+            .order_by("date")
+        )
+
+
 class ReportEntry(models.Model):
     class Meta:
         verbose_name = "Atividade"
         verbose_name_plural = "Atividades"
+        indexes = [
+            # also covers the (date, id) keyset pagination of the entries page
+            models.Index(fields=["report", "date", "id"], name="entry_report_date_id_idx"),
+        ]
 
     report = models.ForeignKey(
         Report, on_delete=models.CASCADE, related_name="entries"
@@ -140,20 +264,31 @@ class ReportEntry(models.Model):
     date = models.DateField()
     init_hour = models.TimeField()
     end_hour = models.TimeField()
+    # end_hour - init_hour in seconds, maintained by save()
+    duration = models.IntegerField(default=0, editable=False)
+
+    objects = ReportEntryQuerySet.as_manager()
+
+    @staticmethod
+    def duration_between(init_hour, end_hour):
+        return (
+            (end_hour.hour - init_hour.hour) * 3600
+            + (end_hour.minute - init_hour.minute) * 60
+            + (end_hour.second - init_hour.second)
+        )
+
+    def save(self, *args, **kwargs):
+        self.duration = self.duration_between(self.init_hour, self.end_hour)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and (
+            "init_hour" in update_fields or "end_hour" in update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, "duration"}
+        super().save(*args, **kwargs)
 
     @property
     def hours(self):
-        # Convert TimeField values to datetime.time objects
-        init_time = datetime.strptime(str(self.init_hour), '%H:%M:%S').time()
-        end_time = datetime.strptime(str(self.end_hour), '%H:%M:%S').time()
-
-        # Calculate the time difference as a timedelta object
-        time_difference = timedelta(
-            hours=end_time.hour - init_time.hour,
-            minutes=end_time.minute - init_time.minute,
-            seconds=end_time.second - init_time.second
-        )
-        return time_difference
+        return timedelta(seconds=self.duration)
     
     def __str__(self) -> str:
         return f"{self.report.user} - {self.date} ({self.hours})"
@@ -163,6 +298,12 @@ class ReportSubmission(models.Model):
     class Meta:
         verbose_name = "Relatório entregue"
         verbose_name_plural = "Relatórios entregues"
+        indexes = [
+            models.Index(fields=["report", "status"], name="submission_report_status_idx"),
+            models.Index(
+                fields=["report", "submitted_at"], name="submission_report_date_idx"
+            ),
+        ]
     class ReportStatus(models.TextChoices):
         PENDING = "Em análise"
         APPROVED = "Aprovado"
@@ -181,19 +322,62 @@ class ReportSubmission(models.Model):
     reviewer = models.ForeignKey(
         CustomUser, related_name="submissions", on_delete=models.SET_NULL, null=True
     )
-    pdf_file = models.FileField(upload_to="reports")
+    # named after the hash of the content, resubmitting a file stores nothing
+    pdf_file = models.FileField(upload_to="pdfs", storage=blob_storage)
     reason = models.CharField(max_length=1024, blank=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the status as loaded, so a change can be detected without querying
+        # the row again (None when the field was deferred)
+        instance._loaded_status = instance.__dict__.get("status")
+        instance._loaded_pdf_file = instance.__dict__.get("pdf_file")
+        return instance
+
+    @property
+    def status_changed(self):
+        return self._state.adding or self.status != getattr(self, "_loaded_status", None)
+
     def __str__(self) -> str:
         return f"{self.report.user} - {self.submitted_at} ({self.status})"
 
 
 @receiver(pre_save, sender=ReportSubmission)
+@receiver(pre_save, sender="reports.PendingReportSubmission")
 def update_last_status_change(sender, instance, **kwargs):
-    if instance.pk:
-        original_submission = ReportSubmission.objects.get(pk=instance.pk)
-        if original_submission.status != instance.status:
-            instance.last_status_change = timezone.now()
+    if instance.pk and instance.status_changed:
+        instance.last_status_change = timezone.now()
+
+
+class SubmissionStatusEvent(models.Model):
+    """
+    Append-only history of the status of a submission: one row when it is
+    created and one per status change after that, written by
+    reports.signals.record_status_change.
+    """
+
+    class Meta:
+        verbose_name = "Mudança de situação"
+        verbose_name_plural = "Histórico de situações"
+        ordering = ["id"]
+
+    submission = models.ForeignKey(
+        ReportSubmission, related_name="status_events", on_delete=models.CASCADE
+    )
+    old_status = models.CharField(
+        choices=ReportSubmission.ReportStatus.choices, max_length=10, blank=True
+    )
+    new_status = models.CharField(
+        choices=ReportSubmission.ReportStatus.choices, max_length=10
+    )
+    changed_by = models.ForeignKey(
+        CustomUser, related_name="+", on_delete=models.SET_NULL, null=True
+    )
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.old_status or '-'} -> {self.new_status} ({self.changed_at})"
 
 
 
@@ -208,4 +392,244 @@ class PendingReportSubmission(ReportSubmission):
         verbose_name = "Relatório pendente de análise"
         verbose_name_plural = "Relatórios pendentes de análise"
 
-    
\ No newline at end of file
+    
+
+class OutboxEmail(models.Model):
+    """
+    E-mail waiting to be delivered. Rows are written in the same transaction
+    as whatever triggered them and delivered later by
+    reports.email.deliver_outbox (see the send_queued_emails command).
+    """
+
+    class Meta:
+        verbose_name = "E-mail na fila"
+        verbose_name_plural = "Fila de e-mails"
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    class DeliveryStatus(models.TextChoices):
+        PENDING = "Pendente"
+        SENT = "Enviado"
+        DEAD = "Falhou"
+
+    subject = models.CharField(max_length=256)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    bcc = models.JSONField(default=list, blank=True)
+    status = models.CharField(
+        choices=DeliveryStatus.choices,
+        max_length=10,
+        default=DeliveryStatus.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.subject} ({self.status})"
+
+
+class MonthlyReminder(models.Model):
+    """
+    Records that a user was reminded about the report of ref_month, so the
+    send_monthly_emails command never reminds anyone twice.
+    """
+
+    class Meta:
+        verbose_name = "Lembrete mensal"
+        verbose_name_plural = "Lembretes mensais"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ref_month"], name="unique_monthly_reminder"
+            )
+        ]
+
+    user = models.ForeignKey(
+        CustomUser, related_name="monthly_reminders", on_delete=models.CASCADE
+    )
+    ref_month = models.DateField()
+    email = models.ForeignKey(
+        OutboxEmail, related_name="+", on_delete=models.SET_NULL, null=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.user} - {self.ref_month.strftime('%m-%Y')}"
+
+
+class MonthlyHoursQuerySet(models.QuerySet):
+    def refresh(self, reports, batch_size=1000):
+        """
+        Inserts or updates the rows of the given Report queryset from its
+        stored aggregates and the current eixo, scholarship and role of its
+        user. Reads and writes batch_size reports at a time.
+        """
+        rows = reports.order_by().values_list(
+            "ref_month",
+            "user_id",
+            "user__eixo_id",
+            "user__scholarship_id",
+            "user__role_id",
+            "total_seconds",
+            "entry_count",
+            "current_state",
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(
+                MonthlyHours(
+                    ref_month=row[0],
+                    user_id=row[1],
+                    eixo_id=row[2],
+                    scholarship_id=row[3],
+                    role_id=row[4],
+                    total_seconds=row[5],
+                    entry_count=row[6],
+                    state=row[7],
+                )
+            )
+            if len(batch) == batch_size:
+                self._upsert(batch)
+                batch = []
+        self._upsert(batch)
+
+    def _upsert(self, batch):
+        self.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["ref_month", "user"],
+            update_fields=[
+                "eixo",
+                "scholarship",
+                "role",
+                "total_seconds",
+                "entry_count",
+                "state",
+            ],
+        )
+
+
+class MonthlyHours(models.Model):
+    """
+    Rollup of the reports by month and by the eixo, scholarship and role of
+    their users, kept up to date by Report.update_aggregates and
+    ReportQuerySet.refresh_aggregates and rebuilt by the
+    rebuild_monthly_hours command. Feeds the admin dashboard.
+    """
+
+    class Meta:
+        verbose_name = "Horas por mês"
+        verbose_name_plural = "Horas por mês"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ref_month", "user"], name="unique_monthly_hours"
+            )
+        ]
+
+    ref_month = models.DateField()
+    user = models.ForeignKey(
+        CustomUser, related_name="+", on_delete=models.CASCADE
+    )
+    eixo = models.ForeignKey(
+        Eixo, related_name="+", on_delete=models.SET_NULL, null=True
+    )
+    scholarship = models.ForeignKey(
+        Scholarship, related_name="+", on_delete=models.SET_NULL, null=True
+    )
+    role = models.ForeignKey(
+        Role, related_name="+", on_delete=models.SET_NULL, null=True
+    )
+    total_seconds = models.IntegerField(default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    state = models.CharField(max_length=10, default=OPEN_STATE)
+
+    objects = MonthlyHoursQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"{self.user} - {self.ref_month.strftime('%m-%Y')}"
+
+
+class PdfBlobQuerySet(models.QuerySet):
+    def acquire(self, name, size, count=1):
+        # insert-or-ignore first, so the increment needs neither a savepoint
+        # nor a lock when two uploads of the same file race
+        self.bulk_create([PdfBlob(name=name, size=size)], ignore_conflicts=True)
+        self.filter(name=name).update(
+            ref_count=F("ref_count") + count, updated_at=timezone.now()
+        )
+
+    def release(self, name):
+        self.filter(name=name, ref_count__gt=0).update(
+            ref_count=F("ref_count") - 1, updated_at=timezone.now()
+        )
+
+    def recount(self):
+        """
+        Recomputes every ref_count from the submissions, for rows written
+        without signals (bulk_create, raw SQL). Returns the number of rows.
+        """
+        references = (
+            ReportSubmission.objects.filter(pdf_file=OuterRef("name"))
+            .order_by()
+            .values("pdf_file")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return self.update(ref_count=Coalesce(Subquery(references), 0))
+
+
+class PdfBlob(models.Model):
+    """
+    One file of the content-addressed storage of the submitted PDFs and the
+    number of submissions pointing at it. The signals keep ref_count up to
+    date and the gc_pdf_blobs command deletes the files left at zero.
+    """
+
+    class Meta:
+        verbose_name = "Arquivo PDF"
+        verbose_name_plural = "Arquivos PDF"
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = PdfBlobQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.ref_count})"
+
+
+class PdfJob(models.Model):
+    """
+    State of a PDF rendered in the process pool (see reports.pdf_jobs), kept
+    in the database so any web worker can answer the status polls. job_id is
+    the PDF cache key of the rendered report.
+    """
+
+    class Meta:
+        verbose_name = "Geração de PDF"
+        verbose_name_plural = "Gerações de PDF"
+        indexes = [
+            models.Index(fields=["status", "updated_at"], name="pdf_job_status_idx"),
+        ]
+
+    class JobStatus(models.TextChoices):
+        PENDING = "pending"
+        READY = "ready"
+        FAILED = "failed"
+
+    report = models.ForeignKey(
+        Report, on_delete=models.CASCADE, related_name="pdf_jobs"
+    )
+    job_id = models.CharField(max_length=64, unique=True)
+    status = models.CharField(
+        choices=JobStatus.choices, max_length=10, default=JobStatus.PENDING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.job_id} ({self.status})"
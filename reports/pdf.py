@@ -1,188 +1,360 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Image, Spacer, Paragraph
+from reportlab.platypus import SimpleDocTemplate, Flowable, Spacer, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
 from reportlab.platypus.tables import Table, TableStyle
 from reportlab.lib import colors
+from reportlab import rl_config
+from reportlab.pdfbase.pdfdoc import (
+    PDFArray, PDFBase85Encode, PDFDictionary, PDFName, PDFStream, PDFZCompress,
+)
+from reportlab.pdfgen.canvas import Canvas
 from io import BytesIO
-import datetime, os
+import datetime, itertools, os, tempfile
 from django.conf import settings
 from .templatetags.reports_custom_tags import timedelta_hours
 
-def __process_row_data(row_data):
+TITLE = "PROJETO CIDADES INTELIGENTES: UMA PROPOSTA DE IMPLANTAÇÃO PARA ARIQUEMES/RO"
+SUBTITLE = "RELATÓRIO MENSAL DE ATIVIDADES DO COLABORADOR"
+COORDINATOR = "Vagner Schoaba"
+
+
+class _Logo(Flowable):
     """
-    Receives a dict with the row data and returns a list of lists with the data
+    Draws an already decoded ImageReader, which the stock Image flowable
+    does not accept.
     """
-    styles = getSampleStyleSheet()
-    header_style = ParagraphStyle(
-        "centered", parent=styles["Normal"], alignment=1, fontName="Times-Bold", fontSize=10,
-    ) 
 
-    activity_style = ParagraphStyle(
-        "left", parent=styles["Normal"], alignment=0, fontName="Times-Roman", fontSize=10,
-    )
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = "CENTER"
 
-    data = []
-    
-    # add header
-    data.append([Paragraph("Dia", header_style), Paragraph("Atividades desenvolvidas", header_style), Paragraph("Inicio", header_style), Paragraph("Fim", header_style), Paragraph("CH", header_style)])
+    def wrap(self, *args):
+        return self.width, self.height
 
-    for row in row_data:
-        data.append([row["dia"], Paragraph(row["atividade"], activity_style), row["inicio"], row["fim"], row["ch"]])
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height)
 
-    return data
 
+class ReportLayout:
+    """
+    Everything generate_pdf needs that does not depend on the report being
+    rendered: paragraph and table styles, column widths and the decoded logo.
+    It is built once per process (see get_report_layout) and only the
+    per-report data is bound at render time.
+    """
 
-# Function to create the PDF
-def generate_pdf(header_data, row_data):
-    bolsista = header_data.get("bolsista", "bolsista")	
-    funcao = header_data.get("funcao", "funcao")
-    periodo = header_data.get("periodo", "periodo")
-    telefone = header_data.get("telefone", "telefone")
-    email = header_data.get("email", "email")
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.centered_style = ParagraphStyle(
+            "centered", parent=styles["Normal"], alignment=1, fontName="Times-Bold", fontSize=8,
+        )  # Center-aligned style with Times Roman font
+        self.column_header_style = ParagraphStyle(
+            "centered", parent=styles["Normal"], alignment=1, fontName="Times-Bold", fontSize=10,
+        )
+        self.activity_style = ParagraphStyle(
+            "left", parent=styles["Normal"], alignment=0, fontName="Times-Roman", fontSize=10,
+        )
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5 * inch)
-
-    # Define the styles for the document
-    styles = getSampleStyleSheet()
-    title_style = styles["Title"]
-    centered_style = ParagraphStyle(
-        "centered", parent=styles["Normal"], alignment=1, fontName="Times-Bold", fontSize=8,
-    )  # Center-aligned style with Times Roman font
-
-    # Create the content elements
-    elements = []
-
-    # Add an image at the top (replace 'image.jpg' with your image file)
-    image_path = os.path.join(settings.BASE_DIR, "reports", "ifro.png")
-    image = Image(image_path, width=7 * inch, height=.6 * inch)
-    elements.append(image)
-    elements.append(Spacer(1, 12))  # Add some space below the image
-
-    # Add a centered title with Times Roman font
-    title = "PROJETO CIDADES INTELIGENTES: UMA PROPOSTA DE IMPLANTAÇÃO PARA ARIQUEMES/RO"
-    elements.append(Paragraph(title, centered_style))
-
-    subtitle = "RELATÓRIO MENSAL DE ATIVIDADES DO COLABORADOR"
-    elements.append(Paragraph(subtitle, centered_style))
-    elements.append(Spacer(1, 12))  # Add some space below the image
-
-    # Create the header table
-    header_data = [
-        ["Nome:", bolsista],
-        ["Função:", funcao],
-        ["Período:", periodo],
-        ["Telefone:", telefone],
-        ["E-mail:", email],
-    ]
-    
-    total_width = 7 * inch  # Total available width
-    column_widths = [total_width*.2, total_width*.8]  # Divide available width equally between the two columns
-    header_table = Table(header_data, colWidths=column_widths)
-    
-    # Define table styles for signatures
-    header_table_style = TableStyle(
-        [
-            ("ALIGN", (0, 0), (0, -1), "RIGHT"),  # Align first column (Name) to the right
-            ("ALIGN", (1, 0), (-1, -1), "LEFT"),   # Align second column (Function) to the left
-            ("FONTNAME", (0, 0), (0, -1), "Times-Bold"),  
-            ("FONTNAME", (1, 0), (-1, -1), "Times-Roman"),
-            ("FONTSIZE", (0, 0), (-1, -1), 10),  # Font size 10 for signatures
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
-        ]
-    )
-    
-    header_table.setStyle(header_table_style)
-    elements.append(header_table)  # Add the signature table to the document
-
-    
-    data = __process_row_data(row_data)
-
-    # Calculate column widths
-    total_width = 7 * inch  # Total available width
-    activity_width = total_width * 0.7  # 80% of total width for "atividade desenvolvida"
-    remaining_width = (total_width - activity_width) / 4  # Remaining width divided equally among other columns
-
-    col_widths = [remaining_width] * 4  # List of column widths
-    col_widths.insert(1, activity_width)  # Insert the activity column width at the second position
-
-    # Define table styles with Times Roman font
-    table_style = TableStyle(
-        [
-            ("BACKGROUND", (0, 0), (-1, 0), colors.darkgrey),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-            ("FONTNAME", (0, 0), (-1, 0), "Times-Roman"),  # Times Roman font for headers
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 0),
-            ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ("FONTNAME", (0, 1), (-1, -1), "Times-Roman"),  # Times Roman font for table content
-            ("FONTSIZE", (0, 0), (-1, -1), 8),  # Font size 10 for table content
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"), # vertical alignment
-        ]
-    )
+        # ImageReader instances share their decoded data, so the logo is read
+        # and decoded once instead of on every render
+        self.logo = ImageReader(os.path.join(settings.BASE_DIR, "reports", "ifro.png"))
 
-    # alternate row colors
-    for each in range(1, len(data)):
-        if each % 2 == 0:
-            bg_color = colors.HexColor("#FFFFFF")
-        else:
-            bg_color = colors.HexColor("#ECECEC")
-        table_style.add("BACKGROUND", (0, each), (-1, each), bg_color)
-
-    # Create the table with the specified column widths and apply the styles
-    table = Table(data, colWidths=col_widths)
-    table.setStyle(table_style)
-
-    # Add the table to the document
-    elements.append(Spacer(1, 12))  # Add some space before the table
-    elements.append(table)
-    
-    total_horas = sum([row["ch"] for row in row_data], datetime.timedelta())
-    total_horas = timedelta_hours(total_horas)
-
-    footer_table = Table([[f"Total de horas: {total_horas}"]], colWidths=[total_width])
-    footer_table_style = TableStyle(
-        [
-            ("BACKGROUND", (0, 0), (-1, 0), colors.darkgrey),
-            ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
-            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-            ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ("FONTNAME", (0, 0), (-1, -1), "Times-Bold"),  # Times Roman font for table content
-            ("FONTSIZE", (0, 0), (-1, -1), 10),  # Font size 10 for table content
-        ]
-    )
-    footer_table.setStyle(footer_table_style)
-    elements.append(footer_table)  # Add some space before the table
-
-    # Add space for signatures
-    elements.append(Spacer(1, 48))  # Add space for signatures (adjust as needed)
-    
-    # Create a table for signatures
-    signature_data = [
-        ["_" * 30, "_" * 30],
-        [bolsista, "Vagner Schoaba"],
-        ["Bolsista", "Coordenador"], 
-    ]
-    
-    column_widths = [total_width / 2] * 2  # Divide available width equally between the two columns
-    signature_table = Table(signature_data, colWidths=column_widths)
-    
-    # Define table styles for signatures
-    signature_table_style = TableStyle(
-        [
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTNAME", (0, 0), (-1, -1), "Times-Roman"),  # Times Roman font for signatures
-            ("FONTSIZE", (0, 0), (-1, -1), 10),  # Font size 10 for signatures
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+        self.total_width = 7 * inch  # Total available width
+        self.header_col_widths = [self.total_width * .2, self.total_width * .8]
+        activity_width = self.total_width * 0.7  # 70% of total width for "atividade desenvolvida"
+        remaining_width = (self.total_width - activity_width) / 4  # Remaining width divided equally among other columns
+        self.col_widths = [remaining_width] * 4  # List of column widths
+        self.col_widths.insert(1, activity_width)  # Insert the activity column width at the second position
+        self.signature_col_widths = [self.total_width / 2] * 2
+
+        self.header_table_style = TableStyle(
+            [
+                ("ALIGN", (0, 0), (0, -1), "RIGHT"),  # Align first column (Name) to the right
+                ("ALIGN", (1, 0), (-1, -1), "LEFT"),   # Align second column (Function) to the left
+                ("FONTNAME", (0, 0), (0, -1), "Times-Bold"),
+                ("FONTNAME", (1, 0), (-1, -1), "Times-Roman"),
+                ("FONTSIZE", (0, 0), (-1, -1), 10),  # Font size 10 for signatures
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+            ]
+        )
+
+        self.table_style = TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), colors.darkgrey),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+                ("FONTNAME", (0, 0), (-1, 0), "Times-Roman"),  # Times Roman font for headers
+                ("BOTTOMPADDING", (0, 0), (-1, 0), 0),
+                ("GRID", (0, 0), (-1, -1), 1, colors.black),
+                ("FONTNAME", (0, 1), (-1, -1), "Times-Roman"),  # Times Roman font for table content
+                ("FONTSIZE", (0, 0), (-1, -1), 8),  # Font size 10 for table content
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"), # vertical alignment
+                # alternate row colors, one command instead of one per row
+                (
+                    "ROWBACKGROUNDS",
+                    (0, 1),
+                    (-1, -1),
+                    [colors.HexColor("#ECECEC"), colors.HexColor("#FFFFFF")],
+                ),
+            ]
+        )
+
+        self.footer_table_style = TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), colors.darkgrey),
+                ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+                ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+                ("GRID", (0, 0), (-1, -1), 1, colors.black),
+                ("FONTNAME", (0, 0), (-1, -1), "Times-Bold"),  # Times Roman font for table content
+                ("FONTSIZE", (0, 0), (-1, -1), 10),  # Font size 10 for table content
+            ]
+        )
+
+        self.signature_table_style = TableStyle(
+            [
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("FONTNAME", (0, 0), (-1, -1), "Times-Roman"),  # Times Roman font for signatures
+                ("FONTSIZE", (0, 0), (-1, -1), 10),  # Font size 10 for signatures
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+            ]
+        )
+
+    def column_header_row(self):
+        # flowables keep layout state, so they are created per render
+        return [
+            Paragraph(text, self.column_header_style)
+            for text in ("Dia", "Atividades desenvolvidas", "Inicio", "Fim", "CH")
         ]
+
+    def activity_rows(self, row_data):
+        """
+        Receives a list of dicts with the row data and returns a list of lists
+        with the table cells
+        """
+        data = [self.column_header_row()]
+        for row in row_data:
+            data.append([row["dia"], Paragraph(row["atividade"], self.activity_style), row["inicio"], row["fim"], row["ch"]])
+        return data
+
+    def iter_elements(self, header_data, row_data, chunk_rows=None):
+        """
+        Yields the flowables of the document. row_data may be any iterable;
+        with chunk_rows set the activity table is emitted as a series of
+        tables of at most chunk_rows rows, each with its own (repeated)
+        header row, and rows are consumed only as the tables are laid out.
+        """
+        bolsista = header_data.get("bolsista", "bolsista")
+        funcao = header_data.get("funcao", "funcao")
+        periodo = header_data.get("periodo", "periodo")
+        telefone = header_data.get("telefone", "telefone")
+        email = header_data.get("email", "email")
+        # callers that already know the total (e.g. Report.total_hours) pass it in
+        total_horas = header_data.get("total_horas")
+
+        yield _Logo(self.logo, width=7 * inch, height=.6 * inch)
+        yield Spacer(1, 12)  # Add some space below the image
+        yield Paragraph(TITLE, self.centered_style)
+        yield Paragraph(SUBTITLE, self.centered_style)
+        yield Spacer(1, 12)
+
+        header_table = Table(
+            [
+                ["Nome:", bolsista],
+                ["Função:", funcao],
+                ["Período:", periodo],
+                ["Telefone:", telefone],
+                ["E-mail:", email],
+            ],
+            colWidths=self.header_col_widths,
+        )
+        header_table.setStyle(self.header_table_style)
+        yield header_table
+        yield Spacer(1, 12)  # Add some space before the table
+
+        summed = datetime.timedelta()
+        rows = iter(row_data)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows)) if chunk_rows else list(rows)
+            summed += sum([row["ch"] for row in chunk], datetime.timedelta())
+            if chunk or not chunk_rows:
+                table = Table(
+                    self.activity_rows(chunk),
+                    colWidths=self.col_widths,
+                    repeatRows=1 if chunk_rows else 0,
+                )
+                table.setStyle(self.table_style)
+                yield table
+            if not chunk_rows or len(chunk) < chunk_rows:
+                break
+
+        if total_horas is None:
+            total_horas = summed
+        footer_table = Table(
+            [[f"Total de horas: {timedelta_hours(total_horas)}"]],
+            colWidths=[self.total_width],
+        )
+        footer_table.setStyle(self.footer_table_style)
+        yield footer_table
+
+        # Add space for signatures
+        yield Spacer(1, 48)
+        signature_table = Table(
+            [
+                ["_" * 30, "_" * 30],
+                [bolsista, COORDINATOR],
+                ["Bolsista", "Coordenador"],
+            ],
+            colWidths=self.signature_col_widths,
+        )
+        signature_table.setStyle(self.signature_table_style)
+        yield signature_table
+
+
+class _StreamedFlowables(list):
+    """
+    Flowable list for doc.build() that pulls from an iterator as the document
+    is laid out, so only a few flowables exist at any time. ReportLab consumes
+    the list from the front and checks len() before every flowable, which is
+    where it gets topped up.
+    """
+
+    def __init__(self, flowables, lookahead=4):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def __len__(self):
+        while list.__len__(self) < self._lookahead:
+            flowable = next(self._source, None)
+            if flowable is None:
+                break
+            self.append(flowable)
+        return list.__len__(self)
+
+
+class _CompactCanvas(Canvas):
+    """
+    Canvas that compresses the content stream of each page as soon as the
+    page is finished. ReportLab keeps every page in memory until the document
+    is saved, and uncompressed streams take about 15 KiB a page, compressed
+    ones a tenth of that. The output is the same: these are the filters
+    ReportLab applies at save time.
+    """
+
+    def showPage(self):
+        super().showPage()
+        page = self._doc.Pages.pages[-1]
+        if not page.compression or not page.stream:
+            return
+        filters = [PDFBase85Encode, PDFZCompress] if rl_config.useA85 else [PDFZCompress]
+        content = page.stream
+        for stream_filter in reversed(filters):
+            content = stream_filter.encode(content)
+        dictionary = PDFDictionary()
+        dictionary["Filter"] = PDFArray([PDFName(f.pdfname) for f in filters])
+        page.Contents = PDFStream(dictionary, content)
+        page.Contents.__Comment__ = "page stream"
+        page.stream = None
+
+
+_layout = None
+
+
+def get_report_layout():
+    global _layout
+    if _layout is None:
+        _layout = ReportLayout()
+    return _layout
+
+
+def build_report_header(report):
+    user = report.user
+    return {
+        "bolsista": user.name,
+        "funcao": str(user.role) if user.role else "",
+        "periodo": report.formatted_ref_month(),
+        "telefone": str(user.phone_number or ""),
+        "email": user.email,
+        "total_horas": report.total_hours,
+    }
+
+
+def iter_report_rows(report):
+    """
+    Yields the row dicts generate_pdf expects, streaming them from the
+    database instead of loading every entry at once
+    """
+    entries = report.entries.order_by("id").values_list(
+        "date", "description", "init_hour", "end_hour", "duration"
     )
-    
-    signature_table.setStyle(signature_table_style)
-    elements.append(signature_table)  # Add the signature table to the document
+    for date, description, init_hour, end_hour, duration in entries.iterator(
+        chunk_size=500
+    ):
+        yield {
+            "dia": date.day,
+            "atividade": description,
+            "inicio": init_hour,
+            "fim": end_hour,
+            "ch": datetime.timedelta(seconds=duration),
+        }
+
+
+def build_report_data(report):
+    """
+    Returns the (header_data, row_data) pair generate_pdf expects for a report
+    """
+    return build_report_header(report), list(iter_report_rows(report))
 
-    # Build the PDF document
-    doc.build(elements)
+
+def report_pdf_filename(report):
+    return f"{report.user.name} - {report.ref_month.strftime('%B')} - {report.ref_month.year}.pdf"
+
+
+def write_pdf(fileobj, header_data, row_data, chunk_rows=None):
+    """
+    Renders the report into fileobj. With chunk_rows set the rows are
+    streamed through the layout (see ReportLayout.iter_elements), so row_data
+    can be a lazy iterator over any number of entries. Only a few flowables
+    exist at any time then, but memory still grows with the page count, by
+    about 10 KiB a page: ReportLab keeps every page until the document is
+    saved (see _CompactCanvas) and formats the whole file in memory then.
+    """
+    doc = SimpleDocTemplate(fileobj, pagesize=A4, topMargin=0.5 * inch)
+    elements = get_report_layout().iter_elements(header_data, row_data, chunk_rows)
+    if chunk_rows:
+        doc.build(_StreamedFlowables(elements), canvasmaker=_CompactCanvas)
+    else:
+        doc.build(list(elements))
+
+
+# Function to create the PDF
+def generate_pdf(header_data, row_data):
+    buffer = BytesIO()
+    write_pdf(buffer, header_data, row_data)
     pdf_file = buffer.getvalue()
     buffer.close()
-    return pdf_file
\ No newline at end of file
+    return pdf_file
+
+
+def generate_large_pdf(header_data, row_data):
+    """
+    Large-report variant of generate_pdf: the activity table is laid out in
+    page-sized chunks and the result is written to a spooled temporary file,
+    returned rewound. The caller is responsible for closing it.
+    """
+    spool = tempfile.SpooledTemporaryFile(
+        max_size=getattr(settings, "REPORTS_PDF_SPOOL_MAX_BYTES", 1024 * 1024)
+    )
+    write_pdf(
+        spool,
+        header_data,
+        row_data,
+        chunk_rows=getattr(settings, "REPORTS_PDF_CHUNK_ROWS", 40),
+    )
+    spool.seek(0)
+    return spool
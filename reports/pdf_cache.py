@@ -0,0 +1,166 @@
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .pdf import (
+    build_report_header,
+    generate_large_pdf,
+    generate_pdf,
+    iter_report_rows,
+)
+
+# Bump whenever generate_pdf changes its output, so old files stop matching
+LAYOUT_VERSION = 2
+
+HITS_KEY = "reports:pdf_cache:hits"
+MISSES_KEY = "reports:pdf_cache:misses"
+
+
+class PDFCache:
+    """
+    Content-addressed store of generated report PDFs on local disk.
+
+    Files are named after a hash of everything generate_pdf reads, so any
+    change to a report's header or entries simply produces a new key. The
+    modification time of a file is refreshed on every hit and the least
+    recently used files are evicted once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key_for(header_data, row_data):
+        # rows are hashed one at a time so row_data can be a lazy iterator
+        digest = hashlib.sha256()
+        for item in itertools.chain([LAYOUT_VERSION, header_data], row_data):
+            digest.update(json.dumps(item, sort_keys=True, default=str).encode())
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    def open(self, key):
+        """
+        Returns the cached file opened for reading, or None on a miss.
+        """
+        path = self.path_for(key)
+        try:
+            pdf_file = open(path, "rb")
+        except FileNotFoundError:
+            _incr(MISSES_KEY)
+            return None
+        # mark as recently used for the LRU eviction
+        os.utime(path)
+        _incr(HITS_KEY)
+        return pdf_file
+
+    def put(self, key, pdf_data):
+        return self.put_file(key, BytesIO(pdf_data))
+
+    def put_file(self, key, fileobj):
+        """
+        Stores the contents of fileobj, read from its current position in
+        chunks, under key.
+        """
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so readers never see a partial PDF
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            shutil.copyfileobj(fileobj, tmp_file)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def _files(self):
+        if not self.directory.exists():
+            return []
+        files = []
+        for path in self.directory.glob("*/*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict(self):
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        files = self._files()
+        return {
+            "hits": cache.get(HITS_KEY, 0),
+            "misses": cache.get(MISSES_KEY, 0),
+            "entries": len(files),
+            "bytes": sum(size for _, size, _ in files),
+            "max_bytes": self.max_bytes,
+        }
+
+
+def _incr(key):
+    # incr() raises on a missing key, add() is a no-op on an existing one
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def open_report_pdf(report):
+    """
+    Returns the PDF of a report opened for reading, rendering and caching it
+    first if needed.
+
+    Reports with more than REPORTS_PDF_LARGE_REPORT_ENTRIES entries are
+    rendered with generate_large_pdf: their rows are streamed from the
+    database twice (once for the cache key, once for the layout) instead of
+    being held in memory, and the PDF never exists as a single bytes object.
+    """
+    pdf_cache = get_pdf_cache()
+    header_data = build_report_header(report)
+    large_report_entries = getattr(settings, "REPORTS_PDF_LARGE_REPORT_ENTRIES", 300)
+    if report.entry_count > large_report_entries:
+        key = pdf_cache.key_for(header_data, iter_report_rows(report))
+        pdf_file = pdf_cache.open(key)
+        if pdf_file is None:
+            pdf_file = generate_large_pdf(header_data, iter_report_rows(report))
+            pdf_cache.put_file(key, pdf_file)
+            pdf_file.seek(0)
+        return pdf_file
+
+    row_data = list(iter_report_rows(report))
+    key = pdf_cache.key_for(header_data, row_data)
+    pdf_file = pdf_cache.open(key)
+    if pdf_file is None:
+        pdf_data = generate_pdf(header_data, row_data)
+        pdf_cache.put(key, pdf_data)
+        pdf_file = BytesIO(pdf_data)
+    return pdf_file
+
+
+def get_pdf_cache():
+    return PDFCache(
+        getattr(settings, "REPORTS_PDF_CACHE_DIR", settings.BASE_DIR / "pdf_cache"),
+        getattr(settings, "REPORTS_PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+    )
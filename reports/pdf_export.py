@@ -0,0 +1,117 @@
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .pdf import build_report_data, generate_pdf, report_pdf_filename
+from .pdf_cache import get_pdf_cache
+from .pools import new_pool
+
+
+def _render(header_data, row_data):
+    return generate_pdf(header_data, row_data)
+
+
+def iter_report_pdfs(reports, workers=None, pool=None):
+    """
+    Renders the PDF of every report in parallel and yields (filename, pdf_data)
+    pairs in completion order.
+
+    At most two renders per worker are in flight at any time, so only a
+    handful of PDFs are ever held in memory regardless of how many reports
+    are exported. PDFs already in the PDF cache are not rendered again.
+    Without a pool, one of workers processes is started and shut down here.
+    """
+    workers = workers or os.cpu_count() or 1
+    if pool is None:
+        with new_pool(workers) as pool:
+            yield from _iter_report_pdfs(reports, workers, pool)
+    else:
+        yield from _iter_report_pdfs(reports, workers, pool)
+
+
+def _iter_report_pdfs(reports, workers, pool):
+    pdf_cache = get_pdf_cache()
+    names = set()
+    in_flight = {}
+
+    def unique_name(report):
+        name = report_pdf_filename(report)
+        if name in names:
+            name = f"{report.pk} - {name}"
+        names.add(name)
+        return name
+
+    for report in reports:
+        header_data, row_data = build_report_data(report)
+        key = pdf_cache.key_for(header_data, row_data)
+        cached = pdf_cache.open(key)
+        if cached is not None:
+            with cached:
+                yield unique_name(report), cached.read()
+            continue
+
+        future = pool.submit(_render, header_data, row_data)
+        in_flight[future] = (unique_name(report), key)
+        while len(in_flight) >= workers * 2:
+            yield from _collect(in_flight, pdf_cache)
+
+    while in_flight:
+        yield from _collect(in_flight, pdf_cache)
+
+
+def _collect(in_flight, pdf_cache):
+    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+    for future in done:
+        name, key = in_flight.pop(future)
+        pdf_data = future.result()
+        pdf_cache.put(key, pdf_data)
+        yield name, pdf_data
+
+
+class _ZipStream:
+    """
+    Write-only file object that hands out whatever zipfile wrote to it since
+    the last pop(). It has no seek()/tell(), so zipfile writes data
+    descriptors instead of going back to patch the local headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(pdfs):
+    """
+    Generator yielding a ZIP archive of the given (filename, pdf_data) pairs
+    chunk by chunk, suitable for a StreamingHttpResponse.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, pdf_data in pdfs:
+            archive.writestr(name, pdf_data)
+            yield stream.pop()
+    yield stream.pop()
+
+
+def write_zip(fileobj, pdfs):
+    """
+    Writes a ZIP archive of the given (filename, pdf_data) pairs to fileobj,
+    one file at a time. Returns the number of files written.
+    """
+    count = 0
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, pdf_data in pdfs:
+            archive.writestr(name, pdf_data)
+            count += 1
+    return count
@@ -0,0 +1,124 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import PdfJob, Report
+from .pdf import build_report_data, build_report_header, generate_pdf, iter_report_rows
+from .pdf_cache import get_pdf_cache, open_report_pdf
+from .pools import new_pool
+
+PENDING = PdfJob.JobStatus.PENDING
+READY = PdfJob.JobStatus.READY
+FAILED = PdfJob.JobStatus.FAILED
+UNKNOWN = "unknown"
+
+# A job still pending after this long was lost with the worker that ran it.
+# Finished jobs are forgotten after the same delay.
+JOB_TIMEOUT = timedelta(minutes=10)
+
+_executor = None
+
+
+class QueueFull(Exception):
+    """Raised by submit() when REPORTS_PDF_QUEUE_LIMIT jobs are in flight."""
+
+
+def _render(pdf_cache, job_id, header_data, row_data):
+    pdf_cache.put(job_id, generate_pdf(header_data, row_data))
+    return job_id
+
+
+def _render_large(report_id):
+    # rows are streamed from the database in the worker, see open_report_pdf
+    report = Report.objects.select_related("user__role").get(pk=report_id)
+    open_report_pdf(report).close()
+    return report_id
+
+
+def get_executor():
+    # the one pool of the web process, shared by the PDF jobs and the admin
+    # exports so concurrent requests never start more rendering processes
+    global _executor
+    if _executor is None:
+        _executor = new_pool(getattr(settings, "REPORTS_PDF_POOL_SIZE", 2))
+    return _executor
+
+
+def _job_done(job_id, future, submitter):
+    status = FAILED if future.exception() is not None else READY
+    # usually run by the executor's thread, whose connection nothing else closes
+    own_thread = threading.get_ident() != submitter
+    if own_thread:
+        close_old_connections()
+    try:
+        PdfJob.objects.filter(job_id=job_id).update(status=status, updated_at=timezone.now())
+    finally:
+        if own_thread:
+            connection.close()
+
+
+def _in_flight():
+    return PdfJob.objects.filter(
+        status=PENDING, updated_at__gte=timezone.now() - JOB_TIMEOUT
+    )
+
+
+def submit(report):
+    """
+    Queues the rendering of a report PDF in the process pool and returns a
+    (job_id, status) pair. The job id is the PDF cache key, so a report whose
+    PDF is already cached comes back READY straight away and two requests for
+    the same content share one job. Reports over
+    REPORTS_PDF_LARGE_REPORT_ENTRIES are rendered by generate_large_pdf.
+    """
+    pdf_cache = get_pdf_cache()
+    large = report.entry_count > getattr(settings, "REPORTS_PDF_LARGE_REPORT_ENTRIES", 300)
+    if large:
+        header_data, row_data = build_report_header(report), None
+        job_id = pdf_cache.key_for(header_data, iter_report_rows(report))
+    else:
+        header_data, row_data = build_report_data(report)
+        job_id = pdf_cache.key_for(header_data, row_data)
+    if pdf_cache.path_for(job_id).exists():
+        return job_id, READY
+
+    if _in_flight().filter(job_id=job_id).exists():
+        return job_id, PENDING
+    if _in_flight().count() >= getattr(settings, "REPORTS_PDF_QUEUE_LIMIT", 8):
+        raise QueueFull()
+    PdfJob.objects.filter(updated_at__lt=timezone.now() - JOB_TIMEOUT).delete()
+    PdfJob.objects.update_or_create(
+        job_id=job_id, defaults={"status": PENDING, "report": report}
+    )
+
+    if large:
+        future = get_executor().submit(_render_large, report.pk)
+    else:
+        future = get_executor().submit(_render, pdf_cache, job_id, header_data, row_data)
+    submitter = threading.get_ident()
+    future.add_done_callback(lambda future: _job_done(job_id, future, submitter))
+    return job_id, PENDING
+
+
+def status(report, job_id):
+    """
+    Status of the job of report, None when the report has no such job: it
+    was never submitted for it, or was forgotten after JOB_TIMEOUT.
+    """
+    job = (
+        PdfJob.objects.filter(job_id=job_id, report=report)
+        .values_list("status", "updated_at")
+        .first()
+    )
+    if job is None:
+        return None
+    if get_pdf_cache().path_for(job_id).exists():
+        return READY
+    job_status, updated_at = job
+    if job_status == PENDING and updated_at < timezone.now() - JOB_TIMEOUT:
+        return FAILED
+    # a READY job whose file is gone was evicted and has to be submitted again
+    return UNKNOWN if job_status == READY else job_status
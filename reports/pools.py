@@ -0,0 +1,30 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+
+# The spawned workers import this module to unpickle init_worker before
+# django.setup() has run, so it must not import the models, directly or not.
+
+
+def init_worker(database_names):
+    django.setup()
+    # the databases of the parent process, the test runner's ones under tests
+    for alias, name in database_names.items():
+        settings.DATABASES[alias]["NAME"] = name
+
+
+def new_pool(max_workers):
+    """
+    Process pool whose workers have Django set up and use the same databases
+    as the process starting it. The workers are spawned rather than forked:
+    forked children would share the parent's database connections.
+    """
+    database_names = {alias: db["NAME"] for alias, db in settings.DATABASES.items()}
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(database_names,),
+    )
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .email import queue_mass_mail
+from .models import Report, ReportSubmission, SubmissionStatusEvent
+
+# Rows changed per UPDATE, keeps the pk__in lists under the database limits
+CHUNK_SIZE = 500
+
+SUBJECTS = {
+    ReportSubmission.ReportStatus.APPROVED: "[PROCINT] Relatório aprovado",
+    ReportSubmission.ReportStatus.REJECTED: "[PROCINT] Relatório rejeitado",
+}
+
+
+def _notification(status, ref_month, reason):
+    message = f"Seu relatório de {ref_month.strftime('%m-%Y')} foi {status.lower()}."
+    if reason:
+        message += f"\nMotivo: {reason}"
+    return SUBJECTS.get(status, "[PROCINT] Situação do relatório"), message
+
+
+def change_status(submissions, status, reviewer, reason=""):
+    """
+    Moves every submission of the queryset to status with a handful of
+    set-based queries per CHUNK_SIZE rows instead of one save() each: the
+    submissions are updated together, their SubmissionStatusEvent rows are
+    bulk created, the aggregates (and cached pages) of their reports refreshed
+    and one e-mail per submission queued with a single INSERT. Everything
+    happens in one transaction. Returns the number of submissions changed.
+    """
+    status = ReportSubmission.ReportStatus(status)
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            submissions.exclude(status=status)
+            .select_for_update(of=("self",))
+            .order_by("pk")
+            .values_list(
+                "pk",
+                "status",
+                "report_id",
+                "report__ref_month",
+                "report__user__email",
+            )
+        )
+        for first in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[first:first + CHUNK_SIZE]
+            ReportSubmission.objects.filter(pk__in=[row[0] for row in chunk]).update(
+                status=status,
+                reason=reason,
+                reviewer=reviewer,
+                last_status_change=now,
+            )
+            SubmissionStatusEvent.objects.bulk_create(
+                SubmissionStatusEvent(
+                    submission_id=pk,
+                    old_status=old_status,
+                    new_status=status,
+                    changed_by=reviewer,
+                    changed_at=now,
+                )
+                for pk, old_status, *_ in chunk
+            )
+            Report.objects.filter(pk__in={row[2] for row in chunk}).refresh_aggregates()
+
+        queue_mass_mail(
+            (*_notification(status, ref_month, reason), [email])
+            for _, _, _, ref_month, email in rows
+        )
+    return len(rows)
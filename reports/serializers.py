@@ -1,5 +1,6 @@
 # myapp/serializers.py
 from rest_framework import serializers
+from .intervals import is_valid_interval
 from .models import Report, ReportEntry, ReportSubmission
 
 
@@ -9,6 +10,33 @@ class ReportEntrySerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class ReportEntryBulkSerializer(serializers.ModelSerializer):
+    """
+    One item of a bulk upsert: entries with an id are updated, the others
+    created. The report comes from the "report" context.
+    """
+
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = ReportEntry
+        fields = ["id", "description", "date", "init_hour", "end_hour"]
+
+    def validate(self, attrs):
+        report = self.context["report"]
+        errors = {}
+        if not is_valid_interval(attrs["init_hour"], attrs["end_hour"]):
+            errors["end_hour"] = "A hora de início deve ser anterior à hora de término."
+        if (attrs["date"].year, attrs["date"].month) != (
+            report.ref_month.year,
+            report.ref_month.month,
+        ):
+            errors["date"] = "A data da atividade deve estar no mesmo mês do relatório."
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
 class ReportSubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReportSubmission
@@ -16,9 +44,23 @@ class ReportSubmissionSerializer(serializers.ModelSerializer):
 
 
 class ReportSerializer(serializers.ModelSerializer):
+    # nested lists only serialized when asked for with the "expand" context
+    EXPANDABLE = ("entries", "submissions")
+
     entries = ReportEntrySerializer(many=True, read_only=True)
     submissions = ReportSubmissionSerializer(many=True, read_only=True)
 
     class Meta:
         model = Report
         fields = "__all__"
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get("expand", set())
+        only = self.context.get("fields")
+        for name in list(fields):
+            if name in self.EXPANDABLE and name not in expand:
+                del fields[name]
+            elif only and name not in only and name not in expand:
+                del fields[name]
+        return fields
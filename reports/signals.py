@@ -1,8 +1,20 @@
-from django.db.models.signals import post_save
+from django.db.models.query import QuerySet
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from reports.email import send_mail
+from reports import fragment_cache
+from reports.blob_storage import is_blob
+from reports.email import queue_mail
 from django.conf import settings
-from .models import ReportSubmission  # Replace with your actual model import
+from .models import (  # Replace with your actual model import
+    CustomUser,
+    MonthlyHours,
+    PdfBlob,
+    PendingReportSubmission,
+    Report,
+    ReportEntry,
+    ReportSubmission,
+    SubmissionStatusEvent,
+)
 
 @receiver(post_save, sender=ReportSubmission)
 def send_email_on_report_submission_creation(sender, instance, created, **kwargs):
@@ -11,7 +23,111 @@ def send_email_on_report_submission_creation(sender, instance, created, **kwargs
         subject = 'New Report Submission Created'
         message = 'A new report submission has been created.'
         recipient_list = [recipient]  # Replace with the recipient's email address
-        try:
-            send_mail(subject, message, recipient_list)
-        except Exception as e:
-            print(e)
+        # delivered by the send_queued_emails command, never in the request
+        queue_mail(subject, message, recipient_list)
+
+
+# signals are sent with the proxy class as sender when the admin of the
+# pending submissions saves them, so those receivers listen to both
+@receiver(post_save, sender=ReportSubmission)
+@receiver(post_save, sender=PendingReportSubmission)
+def record_status_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_status = getattr(instance, "_loaded_status", None)
+    if created or instance.status != old_status:
+        SubmissionStatusEvent.objects.create(
+            submission=instance,
+            old_status="" if created else old_status or "",
+            new_status=instance.status,
+            # whoever made the change, set by the code acting on their behalf
+            changed_by=getattr(instance, "_changed_by", None),
+            changed_at=instance.last_status_change,
+        )
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=ReportSubmission)
+@receiver(post_save, sender=PendingReportSubmission)
+def count_pdf_reference(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_name = None if created else getattr(instance, "_loaded_pdf_file", None)
+    new_name = instance.pdf_file.name
+    if old_name != new_name:
+        if is_blob(new_name):
+            PdfBlob.objects.acquire(new_name, instance.pdf_file.size)
+        if is_blob(old_name):
+            PdfBlob.objects.release(old_name)
+    instance._loaded_pdf_file = new_name
+
+
+@receiver(post_delete, sender=ReportSubmission)
+@receiver(post_delete, sender=PendingReportSubmission)
+def release_pdf_reference(sender, instance, **kwargs):
+    # the file itself is left to the gc_pdf_blobs command
+    if is_blob(instance.pdf_file.name):
+        PdfBlob.objects.release(instance.pdf_file.name)
+
+
+def _deleted_directly(instance, origin):
+    # When an entry/submission goes away because its report (or the report's
+    # user) is being deleted there is nothing left to keep in sync.
+    if isinstance(origin, QuerySet):
+        return origin.model is type(instance)
+    return isinstance(origin, type(instance))
+
+
+@receiver(post_save, sender=ReportEntry)
+@receiver(post_save, sender=ReportSubmission)
+@receiver(post_save, sender=PendingReportSubmission)
+def update_report_aggregates_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance.report.update_aggregates()
+    fragment_cache.invalidate([instance.report.user_id], [instance.report_id])
+
+
+@receiver(post_delete, sender=ReportEntry)
+@receiver(post_delete, sender=ReportSubmission)
+@receiver(post_delete, sender=PendingReportSubmission)
+def update_report_aggregates_on_delete(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(instance, origin):
+        instance.report.update_aggregates()
+        fragment_cache.invalidate([instance.report.user_id], [instance.report_id])
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def invalidate_user_reports(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragment_cache.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=Report)
+def add_monthly_hours(sender, instance, created, raw=False, **kwargs):
+    # later changes of the report come through update_aggregates
+    if created and not raw:
+        MonthlyHours.objects.refresh(Report.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Report)
+def remove_monthly_hours(sender, instance, **kwargs):
+    MonthlyHours.objects.filter(
+        ref_month=instance.ref_month, user_id=instance.user_id
+    ).delete()
+
+
+@receiver(post_save, sender=CustomUser)
+def update_monthly_hours_dimensions(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # logging in saves last_login only, nothing to do then
+    if created or raw or (
+        update_fields is not None
+        and not {"eixo", "scholarship", "role"} & set(update_fields)
+    ):
+        return
+    MonthlyHours.objects.filter(user=instance).update(
+        eixo=instance.eixo_id,
+        scholarship=instance.scholarship_id,
+        role=instance.role_id,
+    )
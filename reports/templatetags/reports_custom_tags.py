@@ -14,4 +14,9 @@ def timedelta_hours(value):
     hours, remainder = divmod(total_seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
     hours, minutes, seconds = int(hours), int(minutes), int(seconds)
-    return f"{hours:02}:{minutes:02}:{seconds:02}"
\ No newline at end of file
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+@register.filter
+def seconds_hours(value):
+    return timedelta_hours(datetime.timedelta(seconds=value))
@@ -1,3 +1,2381 @@
-from django.test import TestCase
+import base64
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import time as clock
+import tracemalloc
+import unittest
+import zipfile
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, reset_queries
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework import permissions
+
+from . import compliance, pdf, pdf_cache, pdf_jobs, review
+from .email import deliver_outbox, queue_mail
+from .intervals import DayIntervals
+from .pdf import build_report_data, generate_large_pdf, generate_pdf, get_report_layout
+from .pdf_cache import PDFCache, get_pdf_cache, open_report_pdf
+from .views import ENTRIES_PER_PAGE
+from .models import (
+    CustomUser,
+    Eixo,
+    MonthlyHours,
+    MonthlyReminder,
+    OutboxEmail,
+    PdfBlob,
+    PdfJob,
+    PendingReportSubmission,
+    Report,
+    ReportEntry,
+    ReportSubmission,
+    SubmissionStatusEvent,
+)
 
 # Create your tests here.
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def seed_reports(users=5, months=12, entries_per_report=20):
+    """
+    Creates users with one report per month, each with entries_per_report
+    entries, and a rejected submission on every other report. Returns the
+    list of users.
+    """
+    created_users = []
+    entries = []
+    for u in range(users):
+        user = CustomUser.objects.create_user(
+            f"bolsista{u}@example.com", "senha", name=f"Bolsista {u}"
+        )
+        created_users.append(user)
+        reports = Report.objects.bulk_create(
+            Report(user=user, ref_month=date(2020 + m // 12, m % 12 + 1, 1))
+            for m in range(months)
+        )
+        for report in reports:
+            for e in range(entries_per_report):
+                entries.append(
+                    ReportEntry(
+                        report=report,
+                        description=f"Atividade {e}",
+                        date=report.ref_month.replace(day=e % 28 + 1),
+                        init_hour=time(8),
+                        end_hour=time(12),
+                        duration=4 * 3600,
+                    )
+                )
+        ReportSubmission.objects.bulk_create(
+            ReportSubmission(
+                report=report,
+                status=ReportSubmission.ReportStatus.REJECTED,
+                pdf_file="reports/seed.pdf",
+            )
+            for report in reports[::2]
+        )
+    ReportEntry.objects.bulk_create(entries, batch_size=1000)
+    Report.objects.all().refresh_aggregates()
+    return created_users
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "uses SQLite's EXPLAIN QUERY PLAN")
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, REPORTS_PDF_CACHE_DIR=f"{MEDIA_ROOT}/pdf_cache")
+class QueryPlanTests(TestCase):
+    """
+    Runs the views on a seeded database and fails if any query they issue
+    against the reports tables falls back to a full table scan.
+    """
+
+    tables = ("reports_report", "reports_reportentry", "reports_reportsubmission")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_reports()[0]
+        # an open report of the current month, so every view has work to do
+        cls.report = Report.objects.create(
+            user=cls.user, ref_month=date.today().replace(day=1)
+        )
+        for day in range(1, 6):
+            ReportEntry.objects.create(
+                report=cls.report,
+                description="Atividade",
+                date=cls.report.ref_month.replace(day=day),
+                init_hour=time(8),
+                end_hour=time(12),
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertNoFullScans(self, request):
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = request()
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+
+        scans = []
+        for query in captured.captured_queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plan = [row[-1] for row in cursor.fetchall()]
+            for step in plan:
+                # "SCAN TABLE x" before SQLite 3.36, "SCAN x" after
+                match = re.match(r"SCAN (?:TABLE )?(\w+)", step)
+                if match and match.group(1) in self.tables:
+                    scans.append(f"{step}\n    in {query['sql']}")
+        self.assertFalse(scans, "Full table scans:\n" + "\n".join(scans))
+
+    def test_user_reports(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse("user-reports")))
+
+    def test_report_entries(self):
+        self.assertNoFullScans(
+            lambda: self.client.get(reverse("report-entries", args=[self.report.id]))
+        )
+
+    def test_pdf(self):
+        self.assertNoFullScans(
+            lambda: self.client.get(reverse("generate_pdf", args=[self.report.id]))
+        )
+
+    def test_create_report(self):
+        Report.objects.filter(pk=self.report.pk).delete()
+        self.assertNoFullScans(lambda: self.client.post(reverse("create_report")))
+
+    def test_submit_report(self):
+        url = reverse("submit_report", args=[self.report.id])
+        self.assertNoFullScans(lambda: self.client.get(url))
+        pdf_file = SimpleUploadedFile(
+            "relatorio.pdf", b"%PDF-1.4 relatorio", content_type="application/pdf"
+        )
+        self.assertNoFullScans(lambda: self.client.post(url, {"pdf_file": pdf_file}))
+
+
+# Budgets enforced by ViewBenchmarkTests: maximum number of SQL queries,
+# wall time in seconds and peak traced memory in KiB of a single request.
+# Only the query counts are checked unless REPORTS_BENCHMARK_TIMINGS is set,
+# the other two depend on the machine running the tests
+VIEW_BUDGETS = {
+    "user-reports": {"queries": 4, "seconds": 0.5, "peak_kib": 2048},
+    "report-entries": {"queries": 8, "seconds": 0.5, "peak_kib": 4096},
+    "report-entries-more": {"queries": 4, "seconds": 0.5, "peak_kib": 2048},
+    "create-entry": {"queries": 12, "seconds": 0.5, "peak_kib": 2048},
+    "edit-entry-form": {"queries": 8, "seconds": 0.5, "peak_kib": 4096},
+    "edit-entry": {"queries": 12, "seconds": 0.5, "peak_kib": 2048},
+    "delete-entry": {"queries": 12, "seconds": 0.5, "peak_kib": 2048},
+    "pdf": {"queries": 6, "seconds": 5.0, "peak_kib": 16384},
+    "submit-report-form": {"queries": 5, "seconds": 0.5, "peak_kib": 2048},
+    "submit-report": {"queries": 19, "seconds": 0.5, "peak_kib": 2048},
+    "submission-detail": {"queries": 5, "seconds": 0.5, "peak_kib": 2048},
+    "submission-pdf": {"queries": 3, "seconds": 0.5, "peak_kib": 2048},
+    "admin-report": {"queries": 10, "seconds": 1.0, "peak_kib": 8192},
+    "admin-reportentry": {"queries": 10, "seconds": 1.0, "peak_kib": 8192},
+    "admin-reportsubmission": {"queries": 10, "seconds": 1.0, "peak_kib": 8192},
+    "admin-pendingreportsubmission": {"queries": 10, "seconds": 1.0, "peak_kib": 8192},
+    "admin-customuser": {"queries": 10, "seconds": 1.0, "peak_kib": 8192},
+    "api-reports": {"queries": 5, "seconds": 1.0, "peak_kib": 16384},
+}
+
+# Where ViewBenchmarkTests writes its measurements
+BENCHMARK_OUTPUT = os.environ.get(
+    "REPORTS_BENCHMARK_OUTPUT",
+    os.path.join(tempfile.gettempdir(), "reports_view_benchmark.json"),
+)
+CHECK_TIMINGS = bool(os.environ.get("REPORTS_BENCHMARK_TIMINGS"))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, REPORTS_PDF_CACHE_DIR=f"{MEDIA_ROOT}/pdf_cache")
+class ViewBenchmarkTests(TestCase):
+    """
+    Measures the SQL query count, wall time and peak memory of every view on
+    a seeded database, writes them to BENCHMARK_OUTPUT as JSON and fails when
+    a view exceeds its VIEW_BUDGETS entry (only its query count, without
+    REPORTS_BENCHMARK_TIMINGS in the environment).
+    """
+
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_reports(users=10, months=24, entries_per_report=40)[0]
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+        cls.report = Report.objects.create(
+            user=cls.user, ref_month=date.today().replace(day=1)
+        )
+        ReportEntry.objects.bulk_create(
+            ReportEntry(
+                report=cls.report,
+                description=f"Atividade {e}",
+                date=cls.report.ref_month.replace(day=e % 28 + 1),
+                init_hour=time(8),
+                end_hour=time(9),
+                duration=3600,
+            )
+            for e in range(100)
+        )
+        cls.report.update_aggregates()
+        cls.entry = cls.report.entries.first()
+        rejected = Report.objects.filter(user=cls.user, submissions__isnull=False).first()
+        cls.submission = rejected.submissions.first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with open(BENCHMARK_OUTPUT, "w") as output:
+            json.dump(cls.results, output, indent=2, sort_keys=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def benchmark(self, name, request, setup=None):
+        """
+        Runs request() twice, once to count queries and time it and once
+        under tracemalloc, and checks the results against VIEW_BUDGETS[name].
+        setup() runs before each call, outside of the measurements, and its
+        return value is passed to request().
+        """
+        args = setup() if setup else None
+        # the query log is a bounded deque that seeding alone can fill up
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            start = clock.perf_counter()
+            response = request(args) if setup else request()
+            if response.streaming:
+                b"".join(response.streaming_content)
+            seconds = clock.perf_counter() - start
+        # read now: the next request resets the connection's query log
+        queries = len(captured)
+        self.assertLess(response.status_code, 400)
+
+        args = setup() if setup else None
+        tracemalloc.start()
+        response = request(args) if setup else request()
+        if response.streaming:
+            b"".join(response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        result = {
+            "queries": queries,
+            "seconds": round(seconds, 4),
+            "peak_kib": round(peak / 1024, 1),
+        }
+        self.results[name] = result
+        budget = VIEW_BUDGETS[name]
+        checked = result if CHECK_TIMINGS else {"queries": queries}
+        over = {key: value for key, value in checked.items() if value > budget[key]}
+        self.assertFalse(over, f"{name} over budget {budget}: {result}")
+
+    def entry_data(self, day=1):
+        return {
+            "description": "Nova atividade",
+            "date": self.report.ref_month.replace(day=day).isoformat(),
+            "init_hour": "13:00",
+            "end_hour": "15:00",
+        }
+
+    def test_user_reports(self):
+        self.benchmark("user-reports", lambda: self.client.get(reverse("user-reports")))
+
+    def test_report_entries(self):
+        url = reverse("report-entries", args=[self.report.id])
+        self.benchmark("report-entries", lambda: self.client.get(url))
+
+    def test_report_entries_more(self):
+        entry = self.report.entries.order_by("-date", "-id")[49]
+        url = reverse("report-entries-more", args=[self.report.id]) + f"?antes={entry.date}_{entry.id}"
+        self.benchmark("report-entries-more", lambda: self.client.get(url))
+
+    def test_create_entry(self):
+        url = reverse("create_report_entry", args=[self.report.id])
+        self.benchmark("create-entry", lambda: self.client.post(url, self.entry_data()))
+
+    def test_edit_entry(self):
+        url = reverse("edit_report_entry", args=[self.report.id, self.entry.id])
+        self.benchmark("edit-entry-form", lambda: self.client.get(url))
+        self.benchmark("edit-entry", lambda: self.client.post(url, self.entry_data(2)))
+
+    def test_delete_entry(self):
+        def new_entry():
+            return ReportEntry.objects.create(
+                report=self.report,
+                description="Nova atividade",
+                date=self.report.ref_month.replace(day=3),
+                init_hour=time(13),
+                end_hour=time(15),
+            )
+
+        self.benchmark(
+            "delete-entry",
+            lambda entry: self.client.post(
+                reverse("delete_report_entry", args=[self.report.id, entry.id])
+            ),
+            setup=new_entry,
+        )
+
+    def test_pdf(self):
+        url = reverse("generate_pdf", args=[self.report.id])
+        self.benchmark("pdf", lambda: self.client.get(url))
+
+    def test_submit_report(self):
+        url = reverse("submit_report", args=[self.report.id])
+        self.benchmark("submit-report-form", lambda: self.client.get(url))
+
+        def clear_submissions():
+            ReportSubmission.objects.filter(report=self.report).delete()
+            return SimpleUploadedFile(
+                "relatorio.pdf", b"%PDF-1.4 relatorio", content_type="application/pdf"
+            )
+
+        # the same file every time: stored by the first call, the others
+        # only touch it and its PdfBlob row
+        self.benchmark(
+            "submit-report",
+            lambda pdf_file: self.client.post(url, {"pdf_file": pdf_file}),
+            setup=clear_submissions,
+        )
+
+    def test_submission_detail(self):
+        url = reverse(
+            "report_submission_detail",
+            args=[self.submission.report_id, self.submission.id],
+        )
+        self.benchmark("submission-detail", lambda: self.client.get(url))
+
+    def test_submission_pdf(self):
+        # the seeded file is shared with (and removed by) other test classes
+        submission = ReportSubmission.objects.create(
+            report=self.submission.report,
+            pdf_file=ContentFile(b"%PDF-1.4 relatorio", name="relatorio.pdf"),
+        )
+        url = reverse("report_submission_pdf", args=[submission.report_id, submission.id])
+        self.benchmark("submission-pdf", lambda: self.client.get(url))
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        for model in (
+            "report",
+            "reportentry",
+            "reportsubmission",
+            "pendingreportsubmission",
+            "customuser",
+        ):
+            url = reverse(f"admin:reports_{model}_changelist")
+            self.benchmark(f"admin-{model}", lambda: self.client.get(url))
+
+    def test_api_reports(self):
+        self.benchmark("api-reports", lambda: self.client.get(reverse("api-reports")))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedLoadDataTests(TestCase):
+    def seed(self, domain, seed=0, users=4):
+        call_command(
+            "seed_load_data",
+            users=users,
+            months=3,
+            entries_per_report=6,
+            seed=seed,
+            domain=domain,
+            stdout=StringIO(),
+        )
+        return ReportEntry.objects.filter(
+            report__user__email__endswith=f"@{domain}"
+        ).order_by("pk")
+
+    def test_seed(self):
+        entries = self.seed("a.example.com")
+        self.assertEqual(Report.objects.filter(user__email__endswith="@a.example.com").count(), 12)
+        for report in Report.objects.filter(user__email__endswith="@a.example.com"):
+            aggregates = report.compute_aggregates()
+            self.assertEqual(report.total_seconds, aggregates["total_seconds"])
+            self.assertEqual(report.entry_count, aggregates["entry_count"])
+            self.assertEqual(report.current_state, aggregates["current_state"])
+        # same seed, same data
+        again = self.seed("b.example.com")
+        fields = ("description", "date", "init_hour", "end_hour", "duration")
+        self.assertEqual(
+            list(entries.values_list(*fields)), list(again.values_list(*fields))
+        )
+
+    def test_status_history(self):
+        self.seed("a.example.com", users=20)
+        submissions = ReportSubmission.objects.prefetch_related("status_events")
+        resubmitted = 0
+        for submission in submissions:
+            events = list(submission.status_events.all())
+            self.assertEqual(events[0].old_status, "")
+            self.assertEqual(events[0].changed_at, submission.submitted_at)
+            self.assertEqual(events[-1].new_status, submission.status)
+            self.assertEqual(events[-1].changed_at, submission.last_status_change)
+            pending = submission.status == ReportSubmission.ReportStatus.PENDING
+            self.assertEqual(len(events), 1 if pending else 2)
+            if not pending:
+                self.assertLess(submission.submitted_at, submission.last_status_change)
+                self.assertEqual(events[-1].changed_by, submission.reviewer)
+        for report in Report.objects.annotate(count=Count("submissions")).filter(count=2):
+            rejected, approved = report.submissions.order_by("id")
+            self.assertLess(rejected.last_status_change, approved.submitted_at)
+            self.assertEqual(report.current_state, approved.status)
+            resubmitted += 1
+        self.assertTrue(resubmitted)
+
+    def test_pdf_blob(self):
+        self.seed("a.example.com")
+        self.seed("b.example.com")
+        blob = PdfBlob.objects.get()
+        self.assertTrue(blob.name.startswith("pdfs/"))
+        pdf_file = ReportSubmission.objects.first().pdf_file
+        self.assertTrue(pdf_file.storage.exists(blob.name))
+        self.assertTrue(pdf_file.path.startswith(MEDIA_ROOT))
+        self.assertEqual(
+            set(ReportSubmission.objects.values_list("pdf_file", flat=True)), {blob.name}
+        )
+        self.assertEqual(blob.ref_count, ReportSubmission.objects.count())
+        # the counts match what a recount finds
+        PdfBlob.objects.recount()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, ReportSubmission.objects.count())
+
+    def test_existing_domain(self):
+        self.seed("a.example.com")
+        with self.assertRaises(CommandError):
+            self.seed("a.example.com")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SubmissionStatusEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+        report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+        cls.submission = ReportSubmission.objects.create(
+            report=report, pdf_file="reports/relatorio.pdf"
+        )
+
+    def test_created(self):
+        event = self.submission.status_events.get()
+        self.assertEqual(event.old_status, "")
+        self.assertEqual(event.new_status, ReportSubmission.ReportStatus.PENDING)
+
+    def test_status_change_without_select(self):
+        submission = ReportSubmission.objects.get(pk=self.submission.pk)
+        submission.status = ReportSubmission.ReportStatus.APPROVED
+        submission.reviewer = self.admin
+        submission._changed_by = self.admin
+        with CaptureQueriesContext(connection) as captured:
+            submission.save()
+        # the original status comes from the instance, not from another SELECT
+        self.assertTrue(captured[0]["sql"].startswith("UPDATE"))
+
+        event = submission.status_events.last()
+        self.assertEqual(event.old_status, ReportSubmission.ReportStatus.PENDING)
+        self.assertEqual(event.new_status, ReportSubmission.ReportStatus.APPROVED)
+        self.assertEqual(event.changed_by, self.admin)
+
+        # saving again without a status change appends nothing
+        submission.reason = "Ok"
+        submission.save()
+        self.assertEqual(submission.status_events.count(), 2)
+
+    def test_admin_action(self):
+        self.client.force_login(self.admin)
+        self.client.post(
+            reverse("admin:reports_pendingreportsubmission_changelist"),
+            {
+                "action": "rejeitar",
+                "_selected_action": [self.submission.pk],
+                "reason": "Faltam atividades",
+            },
+        )
+        self.assertEqual(
+            list(self.submission.status_events.values_list("old_status", "new_status")),
+            [
+                ("", ReportSubmission.ReportStatus.PENDING),
+                (ReportSubmission.ReportStatus.PENDING, ReportSubmission.ReportStatus.REJECTED),
+            ],
+        )
+        self.assertEqual(self.submission.status_events.last().changed_by, self.admin)
+        url = reverse("admin:reports_reportsubmission_change", args=[self.submission.pk])
+        self.assertContains(self.client.get(url), "Histórico de situações")
+
+    def test_changed_by(self):
+        other_admin = CustomUser.objects.create_superuser(
+            "outro@example.com", "senha", name="Outro"
+        )
+        ReportSubmission.objects.filter(pk=self.submission.pk).update(reviewer=self.admin)
+        # the change form is saved by another admin than the previous reviewer
+        self.client.force_login(other_admin)
+        url = reverse("admin:reports_pendingreportsubmission_change", args=[self.submission.pk])
+        response = self.client.post(
+            url,
+            {
+                "status": ReportSubmission.ReportStatus.REJECTED,
+                "reason": "Não",
+                "status_events-TOTAL_FORMS": 1,
+                "status_events-INITIAL_FORMS": 1,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.submission.status_events.last().changed_by, other_admin)
+
+        # no acting user known, none recorded
+        submission = ReportSubmission.objects.get(pk=self.submission.pk)
+        submission.status = ReportSubmission.ReportStatus.APPROVED
+        submission.save()
+        self.assertIsNone(submission.status_events.last().changed_by)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkReviewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+        users = CustomUser.objects.bulk_create(
+            CustomUser(email=f"bolsista{n}@example.com", name=f"Bolsista {n}")
+            for n in range(60)
+        )
+        reports = Report.objects.bulk_create(
+            Report(user=user, ref_month=date(2026, month, 1))
+            for user in users
+            for month in range(1, 11)
+        )
+        ReportSubmission.objects.bulk_create(
+            ReportSubmission(report=report, pdf_file="reports/relatorio.pdf")
+            for report in reports
+        )
+        Report.objects.all().refresh_aggregates()
+
+    def test_bulk_approve(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:reports_pendingreportsubmission_changelist")
+        selected = list(ReportSubmission.objects.values_list("pk", flat=True))
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(
+                url,
+                {"action": "aprovar", "_selected_action": selected, "reason": "Ok"},
+            )
+        queries = len(captured)
+        self.assertEqual(response.status_code, 302)
+        # set-based: a few dozen queries for 600 rows, most of them the
+        # multi-row INSERTs SQLite's parameter limit splits bulk_create into
+        self.assertLess(queries, 40)
+
+        approved = ReportSubmission.ReportStatus.APPROVED
+        self.assertFalse(ReportSubmission.objects.exclude(status=approved).exists())
+        self.assertEqual(ReportSubmission.objects.filter(reviewer=self.admin).count(), 600)
+        self.assertEqual(SubmissionStatusEvent.objects.filter(new_status=approved).count(), 600)
+        self.assertFalse(Report.objects.exclude(current_state=approved).exists())
+        self.assertEqual(OutboxEmail.objects.count(), 600)
+        email = OutboxEmail.objects.get(to=["bolsista0@example.com"], body__contains="01-2026")
+        self.assertEqual(email.subject, "[PROCINT] Relatório aprovado")
+
+    def test_already_in_status(self):
+        rejected = ReportSubmission.ReportStatus.REJECTED
+        submissions = ReportSubmission.objects.filter(report__ref_month=date(2026, 1, 1))
+        self.assertEqual(review.change_status(submissions, rejected, self.admin, "Não"), 60)
+        self.assertEqual(review.change_status(submissions, rejected, self.admin, "Não"), 0)
+        self.assertEqual(SubmissionStatusEvent.objects.filter(new_status=rejected).count(), 60)
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_DELAY=60)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.email = queue_mail("Assunto", "Mensagem", ["bolsista@example.com"])
+
+    def failing_send(self):
+        return mock.patch(
+            "reports.email.EmailMessage.send", side_effect=ConnectionRefusedError
+        )
+
+    def make_due(self):
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_sent_once(self):
+        queue_mail("Outro", "Mensagem", ["outro@example.com"])
+        self.assertEqual(deliver_outbox(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboxEmail.DeliveryStatus.SENT)
+        self.assertEqual(self.email.attempts, 1)
+        self.assertIsNotNone(self.email.sent_at)
+        # a re-run finds nothing to send, even once the lease is over
+        self.make_due()
+        self.assertEqual(deliver_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_retry_backoff(self):
+        for attempt in (1, 2):
+            with self.failing_send():
+                before = timezone.now()
+                self.assertEqual(deliver_outbox(), (0, 1))
+            self.email.refresh_from_db()
+            self.assertEqual(self.email.status, OutboxEmail.DeliveryStatus.PENDING)
+            self.assertEqual(self.email.attempts, attempt)
+            self.assertIn("ConnectionRefusedError", self.email.last_error)
+            delay = self.email.next_attempt_at - before
+            self.assertAlmostEqual(delay.total_seconds(), 60 * 2 ** (attempt - 1), delta=5)
+            # not due before the delay is over
+            self.assertEqual(deliver_outbox(), (0, 0))
+            self.make_due()
+
+        self.assertEqual(deliver_outbox(), (1, 0))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboxEmail.DeliveryStatus.SENT)
+        self.assertEqual((self.email.attempts, self.email.last_error), (3, ""))
+
+    def test_dead_after_max_attempts(self):
+        for _ in range(3):
+            with self.failing_send():
+                self.assertEqual(deliver_outbox(), (0, 1))
+            self.make_due()
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboxEmail.DeliveryStatus.DEAD)
+        self.assertEqual(self.email.attempts, 3)
+        self.assertEqual(deliver_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_lease(self):
+        # a worker that died after claiming the e-mail, before marking it
+        with mock.patch("reports.email.get_connection", side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                deliver_outbox()
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.attempts, 1)
+        self.assertGreater(self.email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_outbox(), (0, 0))
+
+        # sent by the next run once the lease expires
+        self.make_due()
+        self.assertEqual(deliver_outbox(), (1, 0))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.attempts, 2)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class LastDayOfSeptember(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 9, 30, 18)
+
+
+@mock.patch("reports.management.commands.send_monthly_emails.datetime", LastDayOfSeptember)
+class MonthlyEmailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = CustomUser.objects.bulk_create(
+            CustomUser(email=f"bolsista{n}@example.com", name=f"Bolsista {n}")
+            for n in range(6)
+        )
+        reports = Report.objects.bulk_create(
+            Report(user=user, ref_month=date(2026, 9, 1)) for user in users
+        )
+        # submitted already, nothing to remind
+        ReportSubmission.objects.create(
+            report=reports[-1],
+            pdf_file="reports/relatorio.pdf",
+            status=ReportSubmission.ReportStatus.APPROVED,
+        )
+        # only the reminders are looked at
+        OutboxEmail.objects.all().delete()
+        cls.reminded = [user.email for user in users[:-1]]
+
+    def send(self, *args):
+        out = StringIO()
+        call_command("send_monthly_emails", "--chunk_size", "2", *args, stdout=out)
+        return out.getvalue()
+
+    def test_bcc_chunks(self):
+        self.assertIn("Emails queued successfully for 5 users.", self.send())
+        emails = OutboxEmail.objects.order_by("id")
+        self.assertEqual([len(email.bcc) for email in emails], [2, 2, 1])
+        self.assertEqual([address for email in emails for address in email.bcc], self.reminded)
+        self.assertEqual(
+            MonthlyReminder.objects.filter(ref_month=date(2026, 9, 1)).count(), 5
+        )
+        self.assertEqual(
+            MonthlyReminder.objects.get(user__email=self.reminded[-1]).email, emails[2]
+        )
+
+    def test_idempotent(self):
+        self.send()
+        # a run that stopped after the first chunk is completed by the next one
+        MonthlyReminder.objects.filter(email__in=OutboxEmail.objects.order_by("id")[1:]).delete()
+        OutboxEmail.objects.exclude(pk=OutboxEmail.objects.order_by("id")[0].pk).delete()
+        self.assertIn("for 3 users.", self.send())
+        self.assertIn("for 0 users.", self.send())
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+        self.assertEqual(MonthlyReminder.objects.count(), 5)
+
+    def test_personalised_and_send_now(self):
+        self.send("--personalised", "--send_now")
+        self.assertEqual(
+            sorted(email.to[0] for email in OutboxEmail.objects.all()), self.reminded
+        )
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(
+            OutboxEmail.objects.exclude(status=OutboxEmail.DeliveryStatus.SENT).exists()
+        )
+
+    def test_dry_run(self):
+        printed = StringIO()
+        with redirect_stdout(printed):
+            output = self.send("--dry_run")
+        self.assertIn("[DRY_RUN] 5 users would be reminded.", output)
+        self.assertEqual(printed.getvalue().count("Subject: [PROCINT] Lembrete Mensal"), 3)
+        self.assertFalse(OutboxEmail.objects.exists())
+        self.assertFalse(MonthlyReminder.objects.exists())
+
+
+# Queries allowed per admin changelist page, whatever the size of the tables
+ADMIN_CHANGELIST_BUDGET = 6
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AdminChangelistTests(TestCase):
+    """
+    Renders every admin changelist, with and without its filters, on 100k
+    entries and fails if any of them exceeds ADMIN_CHANGELIST_BUDGET queries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_load_data",
+            users=100,
+            months=10,
+            entries_per_report=100,
+            stdout=StringIO(),
+        )
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def assertWithinBudget(self, model, params=None):
+        url = reverse(f"admin:reports_{model}_changelist")
+        # a first request fills the cached filter choices
+        self.client.get(url, params)
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        queries = len(captured)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            queries,
+            ADMIN_CHANGELIST_BUDGET,
+            f"{model} {params or ''}: "
+            + "\n".join(query["sql"] for query in captured.captured_queries),
+        )
+        return response
+
+    def test_report(self):
+        self.assertWithinBudget("report")
+        response = self.assertWithinBudget("report", {"bolsista": "bolsista1", "year": "2026"})
+        self.assertContains(response, 'name="bolsista" value="bolsista1"')
+
+    def test_reportentry(self):
+        self.assertWithinBudget("reportentry")
+        self.assertWithinBudget("reportentry", {"bolsista": "Bolsista 7"})
+
+    def test_reportsubmission(self):
+        self.assertWithinBudget("reportsubmission")
+        self.assertWithinBudget("reportsubmission", {"status": "Aprovado", "bolsista": "bol"})
+
+    def test_pendingreportsubmission(self):
+        self.assertWithinBudget("pendingreportsubmission")
+        self.assertWithinBudget("pendingreportsubmission", {"o": "2"})
+
+    def test_customuser(self):
+        self.assertWithinBudget("customuser")
+
+
+class ReportAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_reports(users=2, months=30, entries_per_report=5)[0]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_cursor_pagination(self):
+        url = reverse("api-reports") + "?page_size=7"
+        months = []
+        while url:
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                data = self.client.get(url).json()
+            # session, user and the page itself
+            self.assertLessEqual(len(captured), 3)
+            months += [report["ref_month"] for report in data["results"]]
+            url = data["next"]
+        expected = Report.objects.filter(user=self.user).order_by("-ref_month")
+        self.assertEqual(months, [r.ref_month.isoformat() for r in expected])
+
+    def test_permissions(self):
+        api_views = {
+            name: resolve(reverse(name, args=args)).func.view_class
+            for name, args in (("api-reports", []), ("api-report-entries", [1]))
+        }
+        for name, view in api_views.items():
+            self.assertIn(permissions.IsAuthenticated, view.permission_classes, name)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api-reports")).status_code, 403)
+        url = reverse("api-report-entries", args=[Report.objects.first().id])
+        response = self.client.post(url, "[]", content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+        # someone else's report is not found
+        other = Report.objects.exclude(user=self.user).first()
+        self.client.force_login(self.user)
+        url = reverse("api-report-entries", args=[other.id])
+        response = self.client.post(url, "[]", content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_headers_only(self):
+        data = self.client.get(reverse("api-reports")).json()
+        report = data["results"][0]
+        self.assertNotIn("entries", report)
+        self.assertEqual(report["entry_count"], 5)
+        self.assertEqual(report["total_seconds"], 5 * 4 * 3600)
+
+        data = self.client.get(reverse("api-reports"), {"fields": "id,ref_month"}).json()
+        self.assertEqual(set(data["results"][0]), {"id", "ref_month"})
+
+    def test_expand(self):
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(
+                reverse("api-reports"),
+                {"fields": "id", "expand": "entries,submissions"},
+            )
+        # one prefetch per expanded relation, not one per report
+        self.assertLessEqual(len(captured), 5)
+        report = response.json()["results"][0]
+        self.assertEqual(set(report), {"id", "entries", "submissions"})
+        self.assertEqual(len(report["entries"]), 5)
+
+
+class ReportEntryBulkAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = seed_reports(users=2, months=2, entries_per_report=3)
+        cls.report = Report.objects.filter(user=cls.user).first()
+        cls.entry = cls.report.entries.first()
+        cls.url = reverse("api-report-entries", args=[cls.report.id])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def item(self, day, init="19:00", end="21:00", **extra):
+        return {
+            "description": f"Atividade do dia {day}",
+            "date": self.report.ref_month.replace(day=day).isoformat(),
+            "init_hour": init,
+            "end_hour": end,
+            **extra,
+        }
+
+    def post(self, items, url=None):
+        return self.client.post(url or self.url, items, content_type="application/json")
+
+    def test_upsert(self):
+        items = [self.item(day) for day in range(1, 29)]
+        items.append(self.item(2, "13:00", "18:00", id=self.entry.id))
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post(items)
+        queries = len(captured)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["created"], 28)
+        self.assertEqual(response.json()["updated"], 1)
+        # one bulk INSERT and UPDATE, not one round trip per entry
+        self.assertLess(queries, 15)
+
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.duration, 5 * 3600)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.entry_count, 31)
+        self.assertEqual(self.report.total_seconds, self.report.compute_aggregates()["total_seconds"])
+
+    def test_per_item_errors(self):
+        other_entry = ReportEntry.objects.filter(report__user=self.other).first()
+        response = self.post(
+            [
+                self.item(3),
+                self.item(4, "10:00", "09:00"),
+                {**self.item(5), "date": "2019-01-05"},
+                self.item(6, id=other_entry.id),
+                {"description": "Sem data"},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("end_hour", errors[1])
+        self.assertIn("date", errors[2])
+        self.assertIn("id", errors[3])
+        self.assertIn("date", errors[4])
+        # all or nothing
+        self.assertEqual(self.report.entries.count(), 3)
+
+    def test_other_users_report(self):
+        report = Report.objects.filter(user=self.other).first()
+        url = reverse("api-report-entries", args=[report.id])
+        self.assertEqual(self.post([self.item(1)], url).status_code, 404)
+
+    def test_submitted_report(self):
+        ReportSubmission.objects.create(report=self.report, pdf_file="reports/relatorio.pdf")
+        self.assertEqual(self.post([self.item(1)]).status_code, 409)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_reports(users=1, months=3, entries_per_report=5)[0]
+        cls.report = Report.objects.filter(user=cls.user).order_by("ref_month").last()
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get(self, url):
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        return response, [query["sql"] for query in captured.captured_queries]
+
+    def test_user_reports(self):
+        url = reverse("user-reports")
+        response, _ = self.get(url)
+        self.assertContains(response, "20:00:00")
+        # cached: the reports are not queried again
+        response, queries = self.get(url)
+        self.assertContains(response, "20:00:00")
+        self.assertFalse(any("latest_submission" in sql for sql in queries))
+
+        self.client.post(
+            reverse("create_report_entry", args=[self.report.id]),
+            {
+                "description": "Nova atividade",
+                "date": self.report.ref_month.replace(day=20).isoformat(),
+                "init_hour": "08:00",
+                "end_hour": "09:00",
+            },
+        )
+        self.assertContains(self.client.get(url), "21:00:00")
+
+        submission = self.report.submissions.first()
+        review.change_status(
+            ReportSubmission.objects.filter(pk=submission.pk),
+            ReportSubmission.ReportStatus.APPROVED,
+            self.admin,
+        )
+        self.assertContains(self.client.get(url), "Aprovado")
+
+    def test_report_entries(self):
+        url = reverse("report-entries", args=[self.report.id])
+        self.get(url)
+        response, queries = self.get(url)
+        self.assertFalse(any('"date" DESC' in sql for sql in queries))
+
+        entry = self.report.entries.first()
+        self.client.post(reverse("delete_report_entry", args=[self.report.id, entry.id]))
+        response = self.client.get(url)
+        self.assertNotContains(response, f"/atividade/{entry.id}/editar/")
+        self.assertContains(response, "16:00:00")
+
+    def test_rebuild_aggregates(self):
+        url = reverse("user-reports")
+        self.assertContains(self.client.get(url), "20:00:00")
+        # written behind the signals' back, then repaired
+        ReportEntry.objects.filter(report=self.report).update(duration=3600)
+        call_command("rebuild_report_aggregates", stdout=StringIO())
+        self.assertContains(self.client.get(url), "05:00:00")
+
+    @override_settings(REPORTS_FRAGMENT_CACHE_TIMEOUT=0)
+    def test_timeout(self):
+        # expired fragments are rendered again, whatever their version
+        url = reverse("user-reports")
+        self.get(url)
+        _, queries = self.get(url)
+        self.assertTrue(any("latest_submission" in sql for sql in queries))
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": f"{MEDIA_ROOT}/cache",
+            }
+        }
+    )
+    def test_file_based_cache(self):
+        self.test_user_reports()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MonthlyHoursTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eixos = Eixo.objects.bulk_create([Eixo(name="Ensino"), Eixo(name="Pesquisa")])
+        cls.users = seed_reports(users=4, months=3, entries_per_report=5)
+        for n, user in enumerate(cls.users):
+            user.eixo = cls.eixos[n % 2]
+            user.save()
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+
+    def rollup(self):
+        return sorted(
+            MonthlyHours.objects.values_list(
+                "ref_month", "user_id", "eixo_id", "total_seconds", "entry_count", "state"
+            )
+        )
+
+    def assertRebuildMatches(self):
+        incremental = self.rollup()
+        call_command("rebuild_monthly_hours", stdout=StringIO())
+        self.assertEqual(incremental, self.rollup())
+
+    def test_incremental(self):
+        self.assertEqual(MonthlyHours.objects.count(), 12)
+        report = Report.objects.filter(user=self.users[0]).first()
+        ReportEntry.objects.create(
+            report=report,
+            description="Nova atividade",
+            date=report.ref_month,
+            init_hour=time(8),
+            end_hour=time(10),
+        )
+        ReportSubmission.objects.create(report=report, pdf_file="reports/relatorio.pdf")
+        row = MonthlyHours.objects.get(user=self.users[0], ref_month=report.ref_month)
+        self.assertEqual(row.total_seconds, 5 * 4 * 3600 + 2 * 3600)
+        self.assertEqual(row.entry_count, 6)
+        self.assertEqual(row.state, ReportSubmission.ReportStatus.PENDING)
+
+        self.users[0].eixo = self.eixos[1]
+        self.users[0].save()
+        Report.objects.create(user=self.users[1], ref_month=date(2026, 1, 1))
+        Report.objects.filter(user=self.users[2]).first().delete()
+        self.assertEqual(MonthlyHours.objects.filter(eixo=self.eixos[1]).count(), 10)
+        self.assertEqual(MonthlyHours.objects.count(), 12)
+        self.assertRebuildMatches()
+
+    def test_bulk_review(self):
+        review.change_status(
+            ReportSubmission.objects.all(), ReportSubmission.ReportStatus.APPROVED, self.admin
+        )
+        self.assertEqual(
+            MonthlyHours.objects.filter(state=ReportSubmission.ReportStatus.APPROVED).count(),
+            8,
+        )
+        self.assertRebuildMatches()
+
+    def test_dashboard(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:reports_monthlyhours_changelist")
+        self.client.get(url)
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, {"por": "eixo", "ano": "2020"})
+        self.assertLessEqual(len(captured), 3)
+        rows = response.context["rows"]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["name"], "Ensino")
+        self.assertEqual(rows[0]["hours"], 2 * 5 * 4)
+        self.assertEqual(rows[0]["reports"], 2)
+        self.assertContains(self.client.get(url, {"por": "role"}), "Função")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ComplianceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+        cls.users = [
+            CustomUser.objects.create_user(
+                f"bolsista{n}@example.com", "senha", name=f"Bolsista {n}", ch=20
+            )
+            for n in range(5)
+        ]
+        # September 2026 has 22 weekdays: 20h a week means 88h in the month
+        weekdays = [
+            day for day in range(1, 31) if date(2026, 9, day).weekday() < 5
+        ]
+        entries = []
+        for n, user in enumerate(cls.users):
+            report = Report.objects.create(user=user, ref_month=date(2026, 9, 1))
+            hours = 4 if n < 4 else 1
+            entries += [
+                ReportEntry(
+                    report=report,
+                    description="Atividade",
+                    date=date(2026, 9, day),
+                    init_hour=time(8),
+                    end_hour=time(8 + hours),
+                    duration=hours * 3600,
+                )
+                for day in weekdays
+            ]
+        ReportEntry.objects.bulk_create(entries)
+
+    def test_compute(self):
+        results = compliance.compute_compliance(*compliance.period_bounds(2026, 9))
+        self.assertEqual([row["name"] for row in results], [f"Bolsista {n}" for n in range(5)])
+        full, short = results[0], results[4]
+        self.assertEqual(full["required_seconds"], 88 * 3600)
+        self.assertEqual(full["logged_seconds"], 88 * 3600)
+        self.assertEqual(full["shortfall_seconds"], 0)
+        self.assertEqual(full["weekday_seconds"][0], 4 * 4 * 3600)  # 4 Mondays
+        self.assertEqual(full["weekday_seconds"][5:], [0, 0])
+        self.assertEqual(short["shortfall_seconds"], 66 * 3600)
+        self.assertAlmostEqual(short["ratio"], 0.25)
+        self.assertFalse(full["outlier"])
+
+    @override_settings(REPORTS_COMPLIANCE_CH_PERIOD="month")
+    def test_monthly_ch(self):
+        results = compliance.compute_compliance(*compliance.period_bounds(2026))
+        self.assertEqual(results[0]["required_seconds"], 12 * 20 * 3600)
+
+    def test_admin_view_and_csv(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:reports_monthlyhours_compliance")
+        response = self.client.get(url, {"ano": "2026", "mes": "9"})
+        self.assertContains(response, "1 de 5 bolsistas abaixo da carga horária")
+        response = self.client.get(url, {"ano": "2026", "mes": "9", "formato": "csv"})
+        lines = response.content.decode().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertIn("Bolsista 4,bolsista4@example.com,20,22,22.0,88.0,66.0,25.0", lines[5])
+
+    def test_year_of_data_is_fast(self):
+        call_command(
+            "seed_load_data", users=100, months=12, entries_per_report=20, stdout=StringIO()
+        )
+        start = clock.perf_counter()
+        results = compliance.compute_compliance(*compliance.period_bounds(date.today().year))
+        self.assertLess(clock.perf_counter() - start, 1.0)
+        self.assertGreaterEqual(len(results), 100)
+
+
+class IntervalIndexTests(TestCase):
+    def test_day_intervals(self):
+        day = DayIntervals()
+        for start, end in ((8, 10), (14, 16), (9, 12), (20, 21)):
+            day.add(start, end)
+        # merged into the union of what was added
+        self.assertEqual(list(zip(day.starts, day.ends)), [(8, 12), (14, 16), (20, 21)])
+        self.assertTrue(day.overlaps(11, 13))
+        self.assertTrue(day.overlaps(13, 15))
+        self.assertTrue(day.overlaps(7, 22))
+        self.assertTrue(day.overlaps(8, 12))
+        self.assertFalse(day.overlaps(12, 14))
+        self.assertFalse(day.overlaps(16, 20))
+        self.assertFalse(day.overlaps(22, 23))
+        day.add(12, 14)
+        self.assertEqual(list(zip(day.starts, day.ends)), [(8, 16), (20, 21)])
+
+
+class EntryOverlapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+        cls.entry = ReportEntry.objects.create(
+            report=cls.report,
+            description="Atividade",
+            date=date(2026, 9, 1),
+            init_hour=time(8),
+            end_hour=time(12),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def entry_data(self, init, end):
+        return {
+            "description": "Nova atividade",
+            "date": "2026-09-01",
+            "init_hour": init,
+            "end_hour": end,
+        }
+
+    def test_create(self):
+        url = reverse("create_report_entry", args=[self.report.id])
+        self.client.post(url, self.entry_data("11:00", "13:00"))
+        self.assertEqual(self.report.entries.count(), 1)
+        self.client.post(url, self.entry_data("12:00", "13:00"))
+        self.assertEqual(self.report.entries.count(), 2)
+
+    def test_overlap_query(self):
+        url = reverse("create_report_entry", args=[self.report.id])
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            self.client.post(url, self.entry_data("11:00", "13:00"))
+        # one EXISTS query, no entries loaded to build an index
+        entry_reads = [
+            query["sql"] for query in captured
+            if query["sql"].startswith("SELECT") and 'FROM "reports_reportentry"' in query["sql"]
+        ]
+        self.assertEqual(len(entry_reads), 1)
+        self.assertIn("LIMIT 1", entry_reads[0])
+
+    def test_update(self):
+        url = reverse("edit_report_entry", args=[self.report.id, self.entry.id])
+        # overlapping its own old slot is fine
+        self.client.post(url, self.entry_data("09:00", "13:00"))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.end_hour, time(13))
+
+    def test_empty_interval(self):
+        # the form views, the bulk API and the audit agree: init == end is invalid
+        url = reverse("create_report_entry", args=[self.report.id])
+        response = self.client.post(url, self.entry_data("14:00", "14:00"), follow=True)
+        self.assertContains(response, "A hora de início deve ser anterior à hora de término.")
+        url = reverse("edit_report_entry", args=[self.report.id, self.entry.id])
+        self.client.post(url, self.entry_data("14:00", "14:00"))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.init_hour, time(8))
+
+        response = self.client.post(
+            reverse("api-report-entries", args=[self.report.id]),
+            json.dumps([self.entry_data("14:00", "14:00")]),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.report.entries.count(), 1)
+
+        ReportEntry.objects.filter(pk=self.entry.pk).update(end_hour=time(8))
+        out = StringIO()
+        call_command("audit_entries", workers=0, stdout=out)
+        self.assertIn("1 inverted", out.getvalue())
+
+    def test_audit(self):
+        report = Report.objects.create(user=self.user, ref_month=date(2026, 10, 1))
+        ReportEntry.objects.bulk_create(
+            ReportEntry(report=report, description="Atividade", date=day, init_hour=init, end_hour=end)
+            for day, init, end in (
+                (date(2026, 10, 1), time(8), time(12)),
+                (date(2026, 10, 1), time(11), time(13)),
+                (date(2026, 10, 1), time(13), time(14)),
+                (date(2026, 10, 2), time(10), time(9)),
+                (date(2026, 11, 2), time(8), time(9)),
+            )
+        )
+        out = StringIO()
+        call_command("audit_entries", workers=0, chunk_size=1, stdout=out)
+        output = out.getvalue()
+        self.assertEqual(output.count("overlap: "), 1)
+        self.assertEqual(output.count("inverted: "), 1)
+        self.assertEqual(output.count("out of month: "), 1)
+        self.assertIn("1 inverted, 1 out of month, 1 overlap", output)
+
+
+class AuditEntriesPoolTests(TransactionTestCase):
+    """Audits in real, spawned workers, which only see committed rows."""
+
+    def test_audit(self):
+        user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        for month in (9, 10):
+            report = Report.objects.create(user=user, ref_month=date(2026, month, 1))
+            ReportEntry.objects.bulk_create(
+                ReportEntry(
+                    report=report, description="Atividade", date=date(2026, month, 1),
+                    init_hour=init, end_hour=end,
+                )
+                for init, end in ((time(8), time(12)), (time(11), time(13)))
+            )
+        out = StringIO()
+        call_command("audit_entries", workers=2, chunk_size=1, stdout=out)
+        self.assertEqual(out.getvalue().count("overlap: "), 2)
+        self.assertIn("Audit done: 2 overlap.", out.getvalue())
+
+
+class PartialEntryResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+        cls.entry = ReportEntry.objects.create(
+            report=cls.report,
+            description="Atividade",
+            date=date(2026, 9, 1),
+            init_hour=time(8),
+            end_hour=time(12),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, url, data=None):
+        return self.client.post(url, data or {}, HTTP_ACCEPT="application/json")
+
+    def entry_data(self, init, end):
+        return {
+            "description": "Nova atividade",
+            "date": "2026-09-02",
+            "init_hour": init,
+            "end_hour": end,
+        }
+
+    def assertRowStructure(self, row, entry_id, day):
+        # what placeRow() and the delete handler rely on
+        self.assertRegex(
+            row.strip(),
+            rf'(?s)^<tr id="entry-{entry_id}" data-id="{entry_id}" data-date="{day}">.*</tr>$',
+        )
+        self.assertEqual(row.count("<tr"), 1)
+        self.assertEqual(row.count("<td>"), 6)
+        edit_url = reverse("edit_report_entry", args=[self.report.id, entry_id])
+        delete_url = reverse("delete_report_entry", args=[self.report.id, entry_id])
+        self.assertIn(f'href="{edit_url}"', row)
+        self.assertRegex(row, rf'href="{delete_url}"\s+class="[^"]*" data-delete-entry>')
+
+    def test_create(self):
+        response = self.post(
+            reverse("create_report_entry", args=[self.report.id]), self.entry_data("08:00", "10:30")
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        entry = self.report.entries.get(date=date(2026, 9, 2))
+        self.assertEqual(data["id"], entry.id)
+        self.assertEqual(data["total_hours"], "06:30:00")
+        self.assertIn("Nova atividade", data["row"])
+        self.assertRowStructure(data["row"], entry.id, "2026-09-02")
+        # the success message went into the response, not into the next page
+        response = self.client.get(reverse("report-entries", args=[self.report.id]))
+        self.assertEqual(list(response.context["messages"]), [])
+
+    def test_update(self):
+        response = self.post(
+            reverse("edit_report_entry", args=[self.report.id, self.entry.id]),
+            self.entry_data("14:00", "15:00"),
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["id"], self.entry.id)
+        self.assertEqual(data["total_hours"], "01:00:00")
+        self.assertIn("Nova atividade", data["row"])
+        self.assertRowStructure(data["row"], self.entry.id, "2026-09-02")
+
+    def test_edit_page_can_leave_edit_mode(self):
+        response = self.client.get(reverse("edit_report_entry", args=[self.report.id, self.entry.id]))
+        create_url = reverse("create_report_entry", args=[self.report.id])
+        list_url = reverse("report-entries", args=[self.report.id])
+        self.assertContains(response, f'data-create-url="{create_url}"')
+        self.assertContains(response, f'data-list-url="{list_url}"')
+        self.assertContains(response, 'id="cancel-edit"')
+        self.assertContains(response, 'id="entry-form-title"')
+
+    def test_delete(self):
+        response = self.post(reverse("delete_report_entry", args=[self.report.id, self.entry.id]))
+        self.assertEqual(response.json(), {
+            "id": self.entry.id,
+            "total_hours": "00:00:00",
+            "message": "Entrada deletada com sucesso!",
+        })
+        self.assertFalse(self.report.entries.exists())
+
+    def test_errors(self):
+        url = reverse("create_report_entry", args=[self.report.id])
+        response = self.post(url, self.entry_data("10:00", "09:00"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["errors"], ["A hora de início deve ser anterior à hora de término."]
+        )
+        response = self.post(url, {"description": "Sem data"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()["errors"]), 3)
+        self.assertEqual(self.report.entries.count(), 1)
+
+    def test_full_page_fallback(self):
+        url = reverse("create_report_entry", args=[self.report.id])
+        response = self.client.post(url, self.entry_data("08:00", "09:00"))
+        self.assertRedirects(response, reverse("report-entries", args=[self.report.id]))
+        response = self.client.get(reverse("report-entries", args=[self.report.id]))
+        self.assertContains(response, f'id="entry-{self.entry.id}"')
+        self.assertContains(response, '<span id="total-hours">05:00:00</span>')
+
+
+class EntryPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+        # three entries a day, so pages end in the middle of a day
+        ReportEntry.objects.bulk_create(
+            ReportEntry(
+                report=cls.report,
+                description=f"Atividade {e}",
+                date=date(2026, 9, e // 3 + 1),
+                init_hour=time(8 + e % 3),
+                end_hour=time(9 + e % 3),
+                duration=3600,
+            )
+            for e in range(70)
+        )
+        cls.report.update_aggregates()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def row_ids(self, html):
+        return [int(pk) for pk in re.findall(r'<tr id="entry-(\d+)"', html)]
+
+    def test_pages(self):
+        expected = list(
+            self.report.entries.order_by("-date", "-id").values_list("id", flat=True)
+        )
+        response = self.client.get(reverse("report-entries", args=[self.report.id]))
+        seen = self.row_ids(response.content.decode())
+        self.assertEqual(len(seen), ENTRIES_PER_PAGE)
+        # the footer still shows the total of every entry
+        self.assertContains(response, '<span id="total-hours">70:00:00</span>')
+        url = re.search(r'data-url="([^"]+)"', response.content.decode()).group(1)
+        while url:
+            data = self.client.get(url, HTTP_ACCEPT="application/json").json()
+            seen += self.row_ids(data["rows"])
+            url = data["next"]
+        self.assertEqual(seen, expected)
+
+    def test_last_page(self):
+        last = self.report.entries.order_by("date", "id")[1]
+        url = reverse("report-entries-more", args=[self.report.id])
+        data = self.client.get(f"{url}?antes={last.date}_{last.id}").json()
+        self.assertEqual(len(self.row_ids(data["rows"])), 1)
+        self.assertIsNone(data["next"])
+
+    def test_invalid_cursor(self):
+        url = reverse("report-entries-more", args=[self.report.id])
+        self.assertEqual(self.client.get(f"{url}?antes=ontem").status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_other_users_report(self):
+        other = CustomUser.objects.create_user("outro@example.com", "senha", name="Outro")
+        self.client.force_login(other)
+        url = reverse("report-entries-more", args=[self.report.id])
+        self.assertEqual(self.client.get(f"{url}?antes=2026-09-30_1").status_code, 404)
+
+
+class PdfBlobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # files outlive the test transaction, each test gets its own media root
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=self.media_root)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def submit(self, content=b"%PDF-1.4 relatorio"):
+        pdf_file = SimpleUploadedFile("Relatorio.PDF", content, content_type="application/pdf")
+        return self.client.post(reverse("submit_report", args=[self.report.id]), {"pdf_file": pdf_file})
+
+    def reject_all(self):
+        self.report.submissions.update(status=ReportSubmission.ReportStatus.REJECTED)
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command("gc_pdf_blobs", "--grace_hours", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_resubmission_is_stored_once(self):
+        self.submit()
+        self.reject_all()
+        self.submit()
+        first, second = self.report.submissions.order_by("id")
+        digest = hashlib.sha256(b"%PDF-1.4 relatorio").hexdigest()
+        self.assertEqual(first.pdf_file.name, f"pdfs/{digest[:2]}/{digest}.pdf")
+        self.assertEqual(second.pdf_file.name, first.pdf_file.name)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "pdfs", digest[:2])), [f"{digest}.pdf"])
+        blob = PdfBlob.objects.get()
+        self.assertEqual((blob.name, blob.size, blob.ref_count), (first.pdf_file.name, 18, 2))
+
+        first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertIn("0 files (0 bytes) deleted", self.gc())
+        self.assertTrue(second.pdf_file.storage.exists(second.pdf_file.name))
+
+    @override_settings(REPORTS_UPLOAD_MAX_BYTES=1024 * 1024)
+    def test_size_cap(self):
+        # skipped at the chunk going over the cap
+        response = self.submit(b"%PDF-1.4" + b"x" * 1024 * 1024)
+        self.assertContains(response, "O arquivo excede o tamanho máximo de 1 MB.")
+        # skipped before reading anything, the request alone is too large
+        response = self.submit(b"%PDF-1.4" + b"x" * 2 * 1024 * 1024)
+        self.assertContains(response, "O arquivo excede o tamanho máximo de 1 MB.")
+        self.assertFalse(self.report.submissions.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "pdfs")))
+
+    def test_gc(self):
+        self.submit()
+        submission = self.report.submissions.get()
+        name = submission.pdf_file.name
+        storage = submission.pdf_file.storage
+        # an upload whose submission was never saved
+        orphan = storage.save("perdido.pdf", ContentFile(b"%PDF-1.4 perdido"))
+        submission.delete()
+
+        output = self.gc("--dry_run")
+        self.assertIn("[DRY_RUN] 2 files (34 bytes) would be deleted.", output)
+        self.assertTrue(storage.exists(name))
+
+        self.assertIn("2 files (34 bytes) deleted", self.gc())
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(orphan))
+        self.assertFalse(PdfBlob.objects.exists())
+
+    def during(self, target, attribute, action):
+        """
+        Patches target.attribute to run action() the first time it is called,
+        as a request running alongside the GC would.
+        """
+        original = getattr(target, attribute)
+        calls = []
+
+        def interleaved(*args, **kwargs):
+            if not calls:
+                calls.append(action())
+            return original(*args, **kwargs)
+
+        return mock.patch.object(target, attribute, interleaved)
+
+    def unreferenced_blob(self):
+        self.submit()
+        submission = self.report.submissions.get()
+        submission.delete()
+        return submission.pdf_file.name, submission.pdf_file.storage
+
+    def test_gc_racing_upload(self):
+        name, storage = self.unreferenced_blob()
+        # the same file is uploaded after the GC listed its row, and the
+        # submission saved after the GC is done
+        def upload():
+            storage.save("Relatorio.pdf", ContentFile(b"%PDF-1.4 relatorio"))
+
+        with self.during(QuerySet, "delete", upload):
+            self.assertIn("0 files (0 bytes) deleted", self.gc())
+        self.assertTrue(storage.exists(name))
+        ReportSubmission.objects.create(report=self.report, pdf_file=name)
+        self.assertEqual(PdfBlob.objects.get(name=name).ref_count, 1)
+
+    def test_gc_racing_resubmission(self):
+        name, storage = self.unreferenced_blob()
+        # submitted again once the GC deleted the row, before the file
+        with self.during(type(storage), "delete_unless_touched", self.submit):
+            self.assertIn("0 files (0 bytes) deleted", self.gc())
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(self.report.submissions.get().pdf_file.name, name)
+        self.assertEqual(PdfBlob.objects.get(name=name).ref_count, 1)
+        # and nothing is left for a later run to delete
+        self.assertIn("0 files (0 bytes) deleted", self.gc())
+        self.assertTrue(storage.exists(name))
+
+    def test_recount(self):
+        self.submit()
+        name = self.report.submissions.get().pdf_file.name
+        # bulk_create skips the signals that count the references
+        ReportSubmission.objects.bulk_create(
+            [ReportSubmission(report=self.report, pdf_file=name)] * 2
+        )
+        self.gc("--recount")
+        self.assertEqual(PdfBlob.objects.get().ref_count, 3)
+
+
+class SubmissionDownloadTests(TestCase):
+    content = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=self.media_root)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.submission = ReportSubmission.objects.create(
+            report=self.report, pdf_file=ContentFile(self.content, name="relatorio.pdf")
+        )
+        self.url = reverse("report_submission_pdf", args=[self.report.id, self.submission.id])
+        self.etag = '"%s"' % hashlib.sha256(self.content).hexdigest()
+        self.client.force_login(self.user)
+
+    def test_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(
+            response["Content-Disposition"], 'inline; filename="Bolsista - September - 2026.pdf"'
+        )
+
+    def test_if_none_match(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.etag)
+
+    def test_range(self):
+        size = len(self.content)
+        for header, start, end in (
+            ("bytes=0-9", 0, 9),
+            ("bytes=100-", 100, size - 1),
+            ("bytes=-24", size - 24, size - 1),
+            ("bytes=1000-99999", 1000, size - 1),
+        ):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{size}")
+            self.assertEqual(int(response["Content-Length"]), end - start + 1)
+            self.assertEqual(b"".join(response.streaming_content), self.content[start:end + 1])
+
+    def test_range_whole_file(self):
+        # several ranges, invalid ones and a stale If-Range get the whole file
+        for headers in (
+            {"HTTP_RANGE": "bytes=0-9,20-29"},
+            {"HTTP_RANGE": "bytes=9-0"},
+            {"HTTP_RANGE": "bytes=0-9", "HTTP_IF_RANGE": '"outro"'},
+        ):
+            response = self.client.get(self.url, **headers)
+            self.assertEqual(response.status_code, 200, headers)
+            self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    def test_range_not_satisfiable(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=99999-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    @override_settings(REPORTS_SENDFILE="x-accel-redirect")
+    def test_x_accel_redirect(self):
+        # Range is left to the front-end server
+        for headers in ({}, {"HTTP_RANGE": "bytes=0-9"}, {"HTTP_RANGE": "bytes=99999-"}):
+            response = self.client.get(self.url, **headers)
+            self.assertEqual(response.status_code, 200, headers)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(
+                response["X-Accel-Redirect"], f"/protected-media/{self.submission.pdf_file.name}"
+            )
+            self.assertEqual(response["Accept-Ranges"], "bytes")
+            self.assertEqual(response["ETag"], self.etag)
+            self.assertEqual(response["Content-Type"], "application/pdf")
+            self.assertFalse(response.has_header("Content-Range"))
+
+    @override_settings(REPORTS_SENDFILE="x-sendfile")
+    def test_x_sendfile(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["X-Sendfile"], self.submission.pdf_file.path)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(
+            response["Content-Disposition"], 'inline; filename="Bolsista - September - 2026.pdf"'
+        )
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag).status_code, 304
+        )
+
+    def test_permissions(self):
+        other = CustomUser.objects.create_user("outro@example.com", "senha", name="Outro")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        reviewer = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+        self.client.force_login(reviewer)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class ReportAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+
+    def add_entry(self, day, init, end):
+        return ReportEntry.objects.create(
+            report=self.report,
+            description="Atividade",
+            date=date(2026, 9, day),
+            init_hour=time(init),
+            end_hour=time(end),
+        )
+
+    def assertAggregates(self, total_seconds, entry_count, state, latest=None):
+        self.report.refresh_from_db()
+        self.assertEqual(
+            (self.report.total_seconds, self.report.entry_count, self.report.current_state),
+            (total_seconds, entry_count, state),
+        )
+        self.assertEqual(self.report.latest_submission_id, latest)
+        # the stored columns always match a recomputation from scratch
+        aggregates = self.report.compute_aggregates()
+        self.assertEqual(aggregates["total_seconds"], total_seconds)
+        self.assertEqual(aggregates["entry_count"], entry_count)
+
+    def test_entries(self):
+        first = self.add_entry(1, 8, 12)
+        self.add_entry(2, 8, 10)
+        self.assertAggregates(6 * 3600, 2, "Aberto")
+
+        first.end_hour = time(9)
+        first.save()
+        self.assertAggregates(3 * 3600, 2, "Aberto")
+
+        first.delete()
+        self.assertAggregates(2 * 3600, 1, "Aberto")
+
+    def test_submissions(self):
+        Status = ReportSubmission.ReportStatus
+        submission = ReportSubmission.objects.create(report=self.report, pdf_file="reports/a.pdf")
+        self.assertAggregates(0, 0, Status.PENDING, submission.id)
+
+        # the admin of the pending submissions saves through the proxy model
+        pending = PendingReportSubmission.objects.get(pk=submission.pk)
+        pending.status = Status.REJECTED
+        pending.save()
+        self.assertAggregates(0, 0, Status.REJECTED, submission.id)
+
+        resubmission = ReportSubmission.objects.create(report=self.report, pdf_file="reports/b.pdf")
+        self.assertAggregates(0, 0, Status.PENDING, resubmission.id)
+
+        PendingReportSubmission.objects.get(pk=resubmission.pk).delete()
+        self.assertAggregates(0, 0, Status.REJECTED, submission.id)
+        submission.delete()
+        self.assertAggregates(0, 0, "Aberto")
+
+    def test_report_delete(self):
+        self.add_entry(1, 8, 12)
+        ReportSubmission.objects.create(report=self.report, pdf_file="reports/a.pdf")
+        # the cascade must not try to refresh the report being deleted
+        self.report.delete()
+        self.assertFalse(ReportEntry.objects.exists())
+
+    def test_rebuild_command(self):
+        self.add_entry(1, 8, 12)
+        Report.objects.filter(pk=self.report.pk).update(total_seconds=0, entry_count=0)
+        call_command("rebuild_report_aggregates", stdout=StringIO())
+        self.assertAggregates(4 * 3600, 1, "Aberto")
+
+
+class EntryDurationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.report = Report.objects.create(user=cls.user, ref_month=date(2026, 9, 1))
+
+    def test_save(self):
+        entry = ReportEntry.objects.create(
+            report=self.report,
+            description="Atividade",
+            date=date(2026, 9, 1),
+            init_hour=time(8, 15),
+            end_hour=time(12, 45, 30),
+        )
+        self.assertEqual(entry.duration, 4 * 3600 + 30 * 60 + 30)
+        self.assertEqual(str(entry.hours), "4:30:30")
+
+        # saving only the hours still refreshes the stored duration
+        entry.end_hour = time(9)
+        entry.save(update_fields=["end_hour"])
+        entry.refresh_from_db()
+        self.assertEqual(entry.duration, 45 * 60)
+
+    def test_queryset_helpers(self):
+        for day, init, end in (
+            (1, time(8), time(12)),
+            (1, time(13), time(14, 30)),
+            (2, time(9), time(9, 30)),
+        ):
+            ReportEntry.objects.create(
+                report=self.report, description="Atividade", date=date(2026, 9, day),
+                init_hour=init, end_hour=end,
+            )
+        entries = ReportEntry.objects.filter(report=self.report)
+        self.assertEqual(entries.total_duration(), timedelta(hours=6))
+        self.assertEqual(entries.average_duration(), timedelta(hours=2))
+        self.assertEqual(
+            list(entries.per_day()),
+            [
+                {"date": date(2026, 9, 1), "total_seconds": 5 * 3600 + 1800, "entry_count": 2},
+                {"date": date(2026, 9, 2), "total_seconds": 1800, "entry_count": 1},
+            ],
+        )
+        self.assertEqual(entries.none().total_duration(), timedelta(0))
+        self.assertEqual(entries.none().average_duration(), timedelta(0))
+
+        empty = Report.objects.create(user=self.user, ref_month=date(2026, 10, 1))
+        totals = dict(Report.objects.with_total_hours().values_list("pk", "entries_seconds"))
+        self.assertEqual(totals, {self.report.pk: 6 * 3600, empty.pk: 0})
+
+
+class EntryDurationMigrationTests(TransactionTestCase):
+    before = ("reports", "0002_report_aggregates")
+    after = ("reports", "0003_entry_duration")
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.addCleanup(self.migrate_to_latest)
+        self.executor.migrate([self.before])
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill(self):
+        apps = self.executor.loader.project_state([self.before]).apps
+        user = apps.get_model("reports", "CustomUser").objects.create(
+            email="bolsista@example.com", name="Bolsista", password="senha"
+        )
+        report = apps.get_model("reports", "Report").objects.create(
+            user=user, ref_month=date(2026, 9, 1)
+        )
+        Entry = apps.get_model("reports", "ReportEntry")
+        for init, end in ((time(8), time(12, 30)), (time(13, 10, 5), time(14))):
+            Entry.objects.create(
+                report=report, description="Atividade", date=date(2026, 9, 1),
+                init_hour=init, end_hour=end,
+            )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.after])
+        apps = executor.loader.project_state([self.after]).apps
+        durations = apps.get_model("reports", "ReportEntry").objects.order_by("id")
+        self.assertEqual(
+            list(durations.values_list("duration", flat=True)), [16200, 2995]
+        )
+        report = apps.get_model("reports", "Report").objects.get()
+        self.assertEqual((report.total_seconds, report.entry_count), (19195, 2))
+
+
+class RefMonthMigrationTests(EntryDurationMigrationTests):
+    before = ("reports", "0011_pdf_job")
+    after = ("reports", "0012_report_ref_month_first_day")
+
+    def test_backfill(self):
+        apps = self.executor.loader.project_state([self.before]).apps
+        User = apps.get_model("reports", "CustomUser")
+        Report = apps.get_model("reports", "Report")
+        Entry = apps.get_model("reports", "ReportEntry")
+        ana, bruno = (
+            User.objects.create(email=f"{name}@example.com", name=name, password="senha")
+            for name in ("ana", "bruno")
+        )
+        first, mid_month = (
+            Report.objects.create(user=ana, ref_month=date(2026, 9, day)) for day in (1, 15)
+        )
+        for report, hour in ((first, 8), (mid_month, 13)):
+            Entry.objects.create(
+                report=report, description="Atividade", date=date(2026, 9, 2),
+                init_hour=time(hour), end_hour=time(hour + 2), duration=7200,
+            )
+        submission = apps.get_model("reports", "ReportSubmission").objects.create(
+            report=mid_month, pdf_file="reports/relatorio.pdf"
+        )
+        alone = Report.objects.create(user=bruno, ref_month=date(2026, 8, 20))
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.after])
+        apps = executor.loader.project_state([self.after]).apps
+        Report = apps.get_model("reports", "Report")
+        self.assertEqual(
+            list(Report.objects.order_by("id").values_list("id", "ref_month")),
+            [(first.id, date(2026, 9, 1)), (alone.id, date(2026, 8, 1))],
+        )
+        merged = Report.objects.get(id=first.id)
+        self.assertEqual((merged.total_seconds, merged.entry_count), (14400, 2))
+        self.assertEqual(merged.latest_submission_id, submission.id)
+        self.assertEqual(merged.current_state, submission.status)
+        hours = apps.get_model("reports", "MonthlyHours").objects.order_by("ref_month")
+        self.assertEqual(
+            list(hours.values_list("user__name", "ref_month", "total_seconds")),
+            [("bruno", date(2026, 8, 1), 0), ("ana", date(2026, 9, 1), 14400)],
+        )
+
+
+class CreateReportTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        self.client.force_login(self.user)
+
+    def test_one_report_per_month(self):
+        response = self.client.post(reverse("create_report"))
+        self.assertRedirects(response, reverse("user-reports"))
+        report = Report.objects.get()
+        self.assertEqual(report.ref_month, date.today().replace(day=1))
+
+        # a double submit lands on the report created by the first one
+        response = self.client.post(reverse("create_report"))
+        self.assertRedirects(response, reverse("report-entries", args=[report.id]))
+        self.assertEqual(Report.objects.count(), 1)
+
+
+class PDFCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.pdf_cache = PDFCache(self.directory, max_bytes=25)
+        cache.delete_many([pdf_cache.HITS_KEY, pdf_cache.MISSES_KEY])
+
+    def read(self, key):
+        pdf_file = self.pdf_cache.open(key)
+        if pdf_file is None:
+            return None
+        with pdf_file:
+            return pdf_file.read()
+
+    def test_hit_and_miss(self):
+        key = PDFCache.key_for({"bolsista": "A"}, [{"dia": 1}])
+        self.assertIsNone(self.read(key))
+        self.pdf_cache.put(key, b"%PDF-1")
+        self.assertEqual(self.read(key), b"%PDF-1")
+        # rows can be a lazy iterator and give the same key
+        self.assertEqual(PDFCache.key_for({"bolsista": "A"}, iter([{"dia": 1}])), key)
+        self.assertNotEqual(PDFCache.key_for({"bolsista": "A"}, [{"dia": 2}]), key)
+        stats = self.pdf_cache.stats()
+        self.assertEqual(
+            (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]), (1, 1, 1, 6)
+        )
+
+    def test_layout_version(self):
+        key = PDFCache.key_for({"bolsista": "A"}, [])
+        self.pdf_cache.put(key, b"%PDF-1")
+        with mock.patch.object(pdf_cache, "LAYOUT_VERSION", pdf_cache.LAYOUT_VERSION + 1):
+            new_key = PDFCache.key_for({"bolsista": "A"}, [])
+        self.assertNotEqual(new_key, key)
+        self.assertIsNone(self.read(new_key))
+
+    def test_lru_eviction(self):
+        keys = [PDFCache.key_for({"bolsista": name}, []) for name in "abc"]
+        for age, key in zip((300, 200), keys):
+            path = self.pdf_cache.put(key, b"x" * 10)
+            os.utime(path, (clock.time() - age, clock.time() - age))
+        # reading the oldest file makes it the most recently used one
+        self.assertIsNotNone(self.read(keys[0]))
+        self.pdf_cache.put(keys[2], b"x" * 10)
+        self.assertIsNotNone(self.read(keys[0]))
+        self.assertIsNone(self.read(keys[1]))
+        self.assertIsNotNone(self.read(keys[2]))
+        self.assertLessEqual(self.pdf_cache.stats()["bytes"], 25)
+
+    def test_open_report_pdf(self):
+        user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        report = Report.objects.create(user=user, ref_month=date(2026, 9, 1))
+        ReportEntry.objects.create(
+            report=report, description="Atividade", date=date(2026, 9, 1),
+            init_hour=time(8), end_hour=time(12),
+        )
+        report.refresh_from_db()
+        with override_settings(REPORTS_PDF_CACHE_DIR=self.directory):
+            with open_report_pdf(report) as first, open_report_pdf(report) as second:
+                self.assertEqual(first.read(), second.read())
+            stats = get_pdf_cache().stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+def pdf_text(data):
+    """Text drawn on the pages of a PDF made by ReportLab, in drawing order."""
+    text = []
+    for stream in re.findall(rb"stream\r?\n(.*?)endstream", data, re.S):
+        stream = stream.strip()
+        # page content is ASCII85 encoded and compressed, the logo is skipped
+        if stream.endswith(b"~>"):
+            content = zlib.decompress(base64.a85decode(stream[:-2]))
+            text.extend(re.findall(rb"\((.*?)\) Tj", content))
+    return text
+
+
+PDF_HEADER = {"bolsista": "Ana", "periodo": "09-2026"}
+
+
+def pdf_rows(count):
+    return [
+        {
+            "dia": n % 28 + 1,
+            "atividade": f"Atividade {n}",
+            "inicio": time(8),
+            "fim": time(12),
+            "ch": timedelta(hours=4),
+        }
+        for n in range(count)
+    ]
+
+
+class PdfLayoutTests(TestCase):
+    def test_shared_layout(self):
+        layout = get_report_layout()
+        first = generate_pdf(PDF_HEADER, pdf_rows(3))
+        # nothing of the layout is built again for the next render
+        with mock.patch.object(pdf, "ReportLayout", side_effect=AssertionError):
+            second = generate_pdf({**PDF_HEADER, "bolsista": "Outro"}, pdf_rows(3))
+        self.assertIs(get_report_layout(), layout)
+        self.assertTrue(first.startswith(b"%PDF"))
+        self.assertIn(b"Ana", pdf_text(first))
+        self.assertNotIn(b"Ana", pdf_text(second))
+        self.assertEqual(pdf_text(second).count(b"Atividade 2"), 1)
+        self.assertIn(b"Total de horas: 12:00:00", pdf_text(second))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_pdf", "--sizes", "1", "5", "--seconds", "0", stdout=out)
+        header, *rows = out.getvalue().splitlines()
+        self.assertEqual(header.split()[:2], ["entries", "renders/s"])
+        self.assertEqual([row.split()[0] for row in rows], ["1", "5"])
+        self.assertTrue(all(len(row.split()) == 6 for row in rows))
+
+
+class LargePdfTests(TestCase):
+    COLUMN_HEADERS = [b"Dia", b"Atividades desenvolvidas", b"Inicio", b"Fim", b"CH"]
+
+    def test_rows_consumed_per_chunk(self):
+        consumed = []
+
+        def rows():
+            for row in pdf_rows(20):
+                consumed.append(row)
+                yield row
+
+        elements = get_report_layout().iter_elements(PDF_HEADER, rows(), chunk_rows=7)
+        # logo, title, subtitle, the header table and spacers, then one chunk
+        list(itertools.islice(elements, 8))
+        self.assertEqual(len(consumed), 7)
+        list(elements)
+        self.assertEqual(len(consumed), 20)
+
+    @override_settings(REPORTS_PDF_CHUNK_ROWS=7, REPORTS_PDF_SPOOL_MAX_BYTES=1024)
+    def test_matches_small_path(self):
+        rows = pdf_rows(120)
+        small = generate_pdf(PDF_HEADER, rows)
+        with generate_large_pdf(PDF_HEADER, iter(rows)) as large_file:
+            # spooled to disk past REPORTS_PDF_SPOOL_MAX_BYTES
+            self.assertTrue(large_file._rolled)
+            large = large_file.read()
+        self.assertTrue(large.startswith(b"%PDF"))
+        pages = rb"/Type /Page\b"
+        self.assertEqual(len(re.findall(pages, large)), len(re.findall(pages, small)))
+        self.assertGreater(len(re.findall(pages, large)), 1)
+
+        small_text, large_text = pdf_text(small), pdf_text(large)
+        # every chunk of the large path repeats the column headers
+        self.assertGreaterEqual(large_text.count(b"Dia"), 120 // 7 + 1)
+        self.assertEqual(
+            [text for text in large_text if text not in self.COLUMN_HEADERS],
+            [text for text in small_text if text not in self.COLUMN_HEADERS],
+        )
+        self.assertIn(b"Total de horas: 480:00:00", large_text)
+
+    def peak_memory(self, count):
+        rows = pdf_rows(count)
+        tracemalloc.start()
+        try:
+            with generate_large_pdf(PDF_HEADER, iter(rows)) as large_file:
+                pages = len(re.findall(rb"/Type /Page\b", large_file.read()))
+            return tracemalloc.get_traced_memory()[1], pages
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory(self):
+        # not flat: ReportLab keeps every page until the document is saved,
+        # but no flowable or row outlives its page
+        generate_large_pdf(PDF_HEADER, pdf_rows(10)).close()
+        small_peak, small_pages = self.peak_memory(400)
+        large_peak, large_pages = self.peak_memory(1600)
+        self.assertGreater(large_pages, small_pages * 3)
+        per_page = (large_peak - small_peak) / (large_pages - small_pages)
+        self.assertLess(per_page, 12 * 1024)
+
+
+class DeferredExecutor:
+    """Stands in for the process pool: runs the submitted calls on run()."""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.calls.append((future, fn, args))
+        return future
+
+    def run(self):
+        calls, self.calls = self.calls, []
+        for future, fn, args in calls:
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+
+@override_settings(REPORTS_PDF_ASYNC=True, REPORTS_PDF_QUEUE_LIMIT=1)
+class PdfJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        cls.reports = [
+            Report.objects.create(user=cls.user, ref_month=date(2026, month, 1))
+            for month in (8, 9)
+        ]
+        for report in cls.reports:
+            ReportEntry.objects.create(
+                report=report, description="Atividade", date=report.ref_month,
+                init_hour=time(8), end_hour=time(12),
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_dir_setting = override_settings(REPORTS_PDF_CACHE_DIR=cache_dir)
+        cache_dir_setting.enable()
+        self.addCleanup(cache_dir_setting.disable)
+        self.executor = DeferredExecutor()
+        patcher = mock.patch.object(pdf_jobs, "get_executor", return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request_pdf(self, report):
+        return self.client.get(
+            reverse("generate_pdf", args=[report.id]), HTTP_ACCEPT="application/json"
+        )
+
+    def poll(self, report, job_id):
+        url = reverse("pdf_job_status", args=[report.id, job_id])
+        return self.client.get(url).json()["status"]
+
+    def test_job(self):
+        report = self.reports[0]
+        response = self.request_pdf(report)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(self.poll(report, job_id), "pending")
+        # a second request for the same content joins the job
+        self.assertEqual(self.request_pdf(report).json()["job_id"], job_id)
+        self.assertEqual(len(self.executor.calls), 1)
+
+        self.executor.run()
+        self.assertEqual(PdfJob.objects.get(job_id=job_id).status, "ready")
+        self.assertEqual(self.poll(report, job_id), "ready")
+        # rendered already, served from the PDF cache
+        response = self.request_pdf(report)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        # evicted from the cache since
+        get_pdf_cache().path_for(job_id).unlink()
+        self.assertEqual(self.poll(report, job_id), "unknown")
+
+    def test_not_found_and_failed(self):
+        report = self.reports[0]
+        url = reverse("pdf_job_status", args=[report.id, "0" * 64])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        job_id = self.request_pdf(report).json()["job_id"]
+        # the job of another report of the same bolsista
+        url = reverse("pdf_job_status", args=[self.reports[1].id, job_id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with mock.patch.object(pdf_jobs, "generate_pdf", side_effect=RuntimeError):
+            self.executor.run()
+        self.assertEqual(self.poll(report, job_id), "failed")
+
+        # a job lost with its worker stops counting as pending
+        PdfJob.objects.filter(job_id=job_id).update(
+            status="pending", updated_at=timezone.now() - pdf_jobs.JOB_TIMEOUT
+        )
+        self.assertEqual(self.poll(report, job_id), "failed")
+
+    def test_queue_full(self):
+        self.assertEqual(self.request_pdf(self.reports[0]).status_code, 202)
+        response = self.request_pdf(self.reports[1])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+        with override_settings(REPORTS_PDF_BACKPRESSURE="inline"):
+            response = self.request_pdf(self.reports[1])
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(REPORTS_PDF_LARGE_REPORT_ENTRIES=0)
+    def test_large_report(self):
+        report = self.reports[0]
+        job_id = self.request_pdf(report).json()["job_id"]
+        with mock.patch.object(pdf_jobs, "generate_pdf", side_effect=AssertionError):
+            self.executor.run()
+        self.assertEqual(self.poll(report, job_id), "ready")
+
+
+@override_settings(REPORTS_PDF_ASYNC=True, REPORTS_PDF_POOL_SIZE=1)
+class PdfJobPoolTests(TransactionTestCase):
+    """Runs a job in a real, spawned worker pool."""
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_dir_setting = override_settings(REPORTS_PDF_CACHE_DIR=cache_dir)
+        cache_dir_setting.enable()
+        self.addCleanup(cache_dir_setting.disable)
+        self.addCleanup(setattr, pdf_jobs, "_executor", None)
+
+    def test_job(self):
+        user = CustomUser.objects.create_user("bolsista@example.com", "senha", name="Bolsista")
+        report = Report.objects.create(user=user, ref_month=date(2026, 9, 1))
+        ReportEntry.objects.create(
+            report=report, description="Atividade", date=date(2026, 9, 1),
+            init_hour=time(8), end_hour=time(12),
+        )
+        self.client.force_login(user)
+        url = reverse("generate_pdf", args=[report.id])
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+
+        # waits for the job and its done callback
+        pdf_jobs.get_executor().shutdown(wait=True)
+        self.assertEqual(PdfJob.objects.get(job_id=job_id).status, "ready")
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+
+class PdfExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            "coordenador@example.com", "senha", name="Coordenador"
+        )
+        cls.reports = []
+        # two bolsistas with the same name share a file name
+        for n, name in enumerate(["Ana", "Bruno", "Bruno"]):
+            user = CustomUser.objects.create_user(f"b{n}@example.com", "senha", name=name)
+            report = Report.objects.create(user=user, ref_month=date(2026, 9, 1))
+            ReportEntry.objects.create(
+                report=report, description=f"Atividade {n}", date=date(2026, 9, 1),
+                init_hour=time(8), end_hour=time(9 + n),
+            )
+            cls.reports.append(report)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_dir_setting = override_settings(REPORTS_PDF_CACHE_DIR=cache_dir)
+        cache_dir_setting.enable()
+        self.addCleanup(cache_dir_setting.disable)
+        self.pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.pool.shutdown)
+        patcher = mock.patch.object(pdf_jobs, "get_executor", return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def export(self):
+        response = self.client.post(
+            reverse("admin:reports_report_changelist"),
+            {"action": "exportar_pdfs", "_selected_action": [r.pk for r in self.reports]},
+        )
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(BytesIO(b"".join(response.streaming_content)))
+
+    def test_zip(self):
+        archive = self.export()
+        ana, bruno, other_bruno = self.reports
+        expected = {
+            "Ana - September - 2026.pdf": ana,
+            "Bruno - September - 2026.pdf": bruno,
+            f"{other_bruno.pk} - Bruno - September - 2026.pdf": other_bruno,
+        }
+        self.assertEqual(set(archive.namelist()), set(expected))
+        pdf_cache = get_pdf_cache()
+        for name, report in expected.items():
+            report.refresh_from_db()
+            key = pdf_cache.key_for(*build_report_data(report))
+            with pdf_cache.open(key) as cached:
+                self.assertEqual(archive.read(name), cached.read(), name)
+
+        # exported again, every PDF comes from the cache
+        with mock.patch.object(self.pool, "submit", side_effect=AssertionError):
+            self.assertEqual(len(self.export().namelist()), 3)
+
+    def test_command(self):
+        # rendered by a real, spawned worker pool
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+        output = os.path.join(output_dir, "relatorios.zip")
+        out = StringIO()
+        call_command(
+            "export_monthly_pdfs", month="2026-09", output=output, workers=2, stdout=out
+        )
+        self.assertIn("3 PDFs exported", out.getvalue())
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+            for name in archive.namelist():
+                self.assertTrue(archive.read(name).startswith(b"%PDF"), name)
+
+        # a failed export leaves the previous archive alone
+        with open(output, "wb") as previous:
+            previous.write(b"anterior")
+        with mock.patch("reports.pdf_export.build_report_data", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                call_command(
+                    "export_monthly_pdfs", month="2026-09", output=output, workers=1,
+                    stdout=StringIO(),
+                )
+        self.assertEqual(os.listdir(output_dir), ["relatorios.zip"])
+        with open(output, "rb") as previous:
+            self.assertEqual(previous.read(), b"anterior")
@@ -4,6 +4,9 @@ from django.db.models.query import QuerySet
 from django.forms.forms import BaseForm
 from django.shortcuts import render, get_object_or_404
 from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
 
 # Create your views here.
 # views.py
@@ -14,6 +17,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView
 from django.contrib.messages.views import SuccessMessageMixin
+from . import fragment_cache
+from .intervals import is_valid_interval, overlaps_saved_entry
+from .templatetags.reports_custom_tags import timedelta_hours
 from .models import Report, ReportEntry, CustomUser
 from django.views.generic import (
     ListView,
@@ -24,7 +30,8 @@ from django.views.generic import (
     DetailView,
 )
 from django.urls import reverse_lazy, reverse
-from datetime import datetime, timedelta
+from django.utils.functional import cached_property
+from datetime import date, datetime, timedelta
 
 
 class CustomLoginView(LoginView):
@@ -68,7 +75,68 @@ class UserReportsListView(LoginRequiredMixin, ListView):
         user = self.request.user
 
         # Query all reports related to the user
-        return Report.objects.filter(user=user).order_by("-ref_month")
+        return (
+            Report.objects.filter(user=user)
+            .select_related("latest_submission")
+            .order_by("-ref_month")
+        )
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        data = super().get_context_data(**kwargs)
+        # the table is cached under this version and the reports queryset is
+        # only evaluated when it has to be rendered again
+        data["reports_version"] = fragment_cache.user_version(self.request.user.id)
+        data["latest_ref_month"] = (
+            Report.objects.filter(user=self.request.user)
+            .order_by("-ref_month")
+            .values_list("ref_month", flat=True)
+            .first()
+        )
+        return data
+
+
+ENTRIES_PER_PAGE = 50
+
+
+class EntryPage:
+    """
+    One page of the entries of a report, newest first, starting after the
+    (date, id) cursor. The rows are only queried when first used, so a table
+    served from the fragment cache costs no query at all.
+    """
+
+    def __init__(self, report_id, cursor=None, size=ENTRIES_PER_PAGE):
+        self.report_id = report_id
+        self.cursor = cursor
+        self.size = size
+
+    @staticmethod
+    def parse_cursor(value):
+        try:
+            day, pk = value.split("_")
+            return date.fromisoformat(day), int(pk)
+        except (AttributeError, ValueError):
+            return None
+
+    @cached_property
+    def _rows(self):
+        entries = ReportEntry.objects.filter(report_id=self.report_id)
+        if self.cursor:
+            day, pk = self.cursor
+            entries = entries.filter(Q(date__lt=day) | Q(date=day, id__lt=pk))
+        # one extra row tells whether there is a next page
+        return list(entries.order_by("-date", "-id")[: self.size + 1])
+
+    @property
+    def rows(self):
+        return self._rows[: self.size]
+
+    @property
+    def next_cursor(self):
+        if len(self._rows) <= self.size:
+            return None
+        last = self._rows[self.size - 1]
+        return f"{last.date.isoformat()}_{last.id}"
 
 
 class ReportEntriesListView(LoginRequiredMixin, ListView):
@@ -99,8 +167,8 @@ class ReportEntriesListView(LoginRequiredMixin, ListView):
         user = self.request.user
         # Query all entries related to the report and the user
         # if the report doesn't belong to the user, raise an 404 error
-        report = get_object_or_404(Report, id=report_id, user=user)
-        return report.entries.all().order_by("-date")
+        self.report = get_object_or_404(Report, id=report_id, user=user)
+        return self.report.entries.all().order_by("-date", "-id")
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         data = super().get_context_data(**kwargs)
@@ -117,58 +185,134 @@ class ReportEntriesListView(LoginRequiredMixin, ListView):
 
         data["report_id"] = self.kwargs["report_id"]
         data["edit_mode"] = self.kwargs.get("edit_mode", False)
-        data["total_hours"] = Report.objects.get(
-            id=self.kwargs["report_id"]
-        ).total_hours
+        # only the first page, the rest is fetched by ReportEntriesPageView
+        data["entries"] = EntryPage(self.report.id)
+        data["total_hours"] = self.report.total_hours
+        data["entries_version"] = fragment_cache.report_version(self.report.id)
         return data
 
 
-class ReportEntryCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
+class ReportEntriesPageView(LoginRequiredMixin, View):
+    """Rows of the next page of entries, for the "load more" button."""
+
+    def get(self, request, *args, **kwargs):
+        report = get_object_or_404(Report, id=self.kwargs["report_id"], user=request.user)
+        cursor = EntryPage.parse_cursor(request.GET.get("antes"))
+        if cursor is None:
+            return JsonResponse({"errors": ["Cursor inválido."]}, status=400)
+        page = EntryPage(report.id, cursor)
+        next_url = None
+        if page.next_cursor:
+            next_url = (
+                reverse("report-entries-more", kwargs={"report_id": report.id})
+                + f"?antes={page.next_cursor}"
+            )
+        return JsonResponse(
+            {
+                "rows": render_to_string(
+                    "reports/report_entry_rows.html",
+                    {"entries": page, "report_id": report.id},
+                    request=request,
+                ),
+                "next": next_url,
+            }
+        )
+
+
+class PartialEntryResponseMixin:
+    """
+    Requests made with ``Accept: application/json`` get back only the affected
+    row and the new total of the report, so the entries page can patch itself
+    instead of reloading the whole table.
+    """
+
+    def wants_partial(self):
+        return "application/json" in self.request.headers.get("Accept", "")
+
+    def partial_response(self, entry_id, report, row=None):
+        data = {
+            "id": entry_id,
+            "total_hours": timedelta_hours(report.total_hours),
+            "message": self.success_message,
+        }
+        if row is not None:
+            data["row"] = render_to_string(
+                "reports/report_entry_row.html",
+                {"entry": row, "report_id": report.id},
+                request=self.request,
+            )
+        return JsonResponse(data)
+
+    def reject(self, errors):
+        if self.wants_partial():
+            return JsonResponse({"errors": errors}, status=400)
+        for error in errors:
+            messages.error(self.request, error)
+        return redirect(
+            reverse_lazy(
+                "report-entries", kwargs={"report_id": self.kwargs["report_id"]}
+            )
+        )
+
+    def form_invalid(self, form):
+        if self.wants_partial():
+            return JsonResponse(
+                {"errors": [error for errors in form.errors.values() for error in errors]},
+                status=400,
+            )
+        return super().form_invalid(form)
+
+
+class ReportEntryCreateView(
+    LoginRequiredMixin, PartialEntryResponseMixin, SuccessMessageMixin, CreateView
+):
     model = ReportEntry
     fields = ["description", "date", "init_hour", "end_hour"]
     template_name = "reports/report_entries.html"
     success_message = "Entrada criada com sucesso!"
 
     def form_valid(self, form):
-        form.instance.report_id = self.kwargs["report_id"]
-        validated = True
+        errors = []
 
         # add entry only if report belongs to the user
         report = Report.objects.get(id=self.kwargs["report_id"])
-        if report.user != self.request.user:
-            validated = False
-            messages.error(
-                self.request,
+        form.instance.report = report
+        if report.user_id != self.request.user.id:
+            errors.append(
                 "Não é possível adicionar entrada a um relatório que não pertence ao usuário.",
             )
 
         # init_hour must be before end_hour
-        if form.instance.init_hour > form.instance.end_hour:
-            validated = False
-            messages.error(
-                self.request,
+        if not is_valid_interval(form.instance.init_hour, form.instance.end_hour):
+            errors.append(
                 "A hora de início deve ser anterior à hora de término.",
             )
 
         # date must be in the same month as the report
-        report = Report.objects.get(id=self.kwargs["report_id"])
         if (
             form.instance.date.month != report.ref_month.month
             or form.instance.date.year != report.ref_month.year
         ):
-            validated = False
-            messages.error(
-                self.request,
+            errors.append(
                 "A data da atividade deve estar no mesmo mês do relatório.",
             )
-        if validated:
-            return super().form_valid(form)
-        else:
-            return redirect(
-                reverse_lazy(
-                    "report-entries", kwargs={"report_id": self.kwargs["report_id"]}
-                )
+
+        # no other activity of the same day may overlap it
+        if not errors and overlaps_saved_entry(
+            report.id,
+            form.instance.date,
+            form.instance.init_hour,
+            form.instance.end_hour,
+        ):
+            errors.append(
+                "A atividade se sobrepõe a outra atividade do mesmo dia.",
             )
+        if errors:
+            return self.reject(errors)
+        if self.wants_partial():
+            self.object = form.save()
+            return self.partial_response(self.object.id, report, row=self.object)
+        return super().form_valid(form)
 
     def get_success_url(self):
         # Define the URL where you want to redirect after a successful form submission
@@ -178,7 +322,9 @@ class ReportEntryCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView)
 
 
 # PARECIDA COM A DE CIMA, EDITANDO UMA ENTRY
-class ReportEntryUpdateView(LoginRequiredMixin, SuccessMessageMixin, UpdateView):
+class ReportEntryUpdateView(
+    LoginRequiredMixin, PartialEntryResponseMixin, SuccessMessageMixin, UpdateView
+):
     model = ReportEntry
     fields = ["description", "date", "init_hour", "end_hour"]
     template_name = "reports/report_entries.html"
@@ -190,21 +336,19 @@ class ReportEntryUpdateView(LoginRequiredMixin, SuccessMessageMixin, UpdateView)
         user = self.request.user
         # Query all entries related to the report and the user
         # if the report doesn't belong to the user, raise an 404 error
-        report = get_object_or_404(Report, id=report_id, user=user)
-        return report.entries.all().order_by("-date")
+        self.report = get_object_or_404(Report, id=report_id, user=user)
+        return self.report.entries.all().order_by("-date")
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         data = super().get_context_data(**kwargs)
-        data["display_entry"] = ReportEntry.objects.get(id=self.kwargs["pk"])
+        data["display_entry"] = self.object
         data["report_id"] = self.kwargs["report_id"]
         data["entry_id"] = self.kwargs["pk"]
         data["edit_mode"] = True
-        data["entries"] = ReportEntry.objects.filter(
-            report__id=self.kwargs["report_id"]
-        )
-        data["total_hours"] = Report.objects.get(
-            id=self.kwargs["report_id"]
-        ).total_hours
+        # same page as ReportEntriesListView, both pages share the cached table
+        data["entries"] = EntryPage(self.report.id)
+        data["total_hours"] = self.report.total_hours
+        data["entries_version"] = fragment_cache.report_version(self.kwargs["report_id"])
         return data
 
     def get_success_url(self):
@@ -214,48 +358,52 @@ class ReportEntryUpdateView(LoginRequiredMixin, SuccessMessageMixin, UpdateView)
         )
 
     def form_valid(self, form):
-        form.instance.report_id = self.kwargs["report_id"]
-        validated = True
+        errors = []
 
         # add entry only if report belongs to the user
         report = Report.objects.get(id=self.kwargs["report_id"])
-        if report.user != self.request.user:
-            validated = False
-            messages.error(
-                self.request,
+        form.instance.report = report
+        if report.user_id != self.request.user.id:
+            errors.append(
                 "Não é possível adicionar entrada a um relatório que não pertence ao usuário.",
             )
 
         # init_hour must be before end_hour
-        if form.instance.init_hour > form.instance.end_hour:
-            validated = False
-            messages.error(
-                self.request,
+        if not is_valid_interval(form.instance.init_hour, form.instance.end_hour):
+            errors.append(
                 "A hora de início deve ser anterior à hora de término.",
             )
 
         # date must be in the same month as the report
-        report = Report.objects.get(id=self.kwargs["report_id"])
         if (
             form.instance.date.month != report.ref_month.month
             or form.instance.date.year != report.ref_month.year
         ):
-            validated = False
-            messages.error(
-                self.request,
+            errors.append(
                 "A data da atividade deve estar no mesmo mês do relatório.",
             )
-        if validated:
-            return super().form_valid(form)
-        else:
-            return redirect(
-                reverse_lazy(
-                    "report-entries", kwargs={"report_id": self.kwargs["report_id"]}
-                )
+
+        # no other activity of the same day may overlap it
+        if not errors and overlaps_saved_entry(
+            report.id,
+            form.instance.date,
+            form.instance.init_hour,
+            form.instance.end_hour, exclude=form.instance.pk,
+        ):
+            errors.append(
+                "A atividade se sobrepõe a outra atividade do mesmo dia.",
             )
+        if errors:
+            return self.reject(errors)
+        if self.wants_partial():
+            self.object = form.save()
+            return self.partial_response(self.object.id, report, row=self.object)
+        return super().form_valid(form)
 
 
-class ReportEntryDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
+class ReportEntryDeleteView(
+    LoginRequiredMixin, PartialEntryResponseMixin, SuccessMessageMixin, DeleteView
+):
     model = ReportEntry
     success_message = "Entrada deletada com sucesso!"
 
@@ -265,8 +413,17 @@ class ReportEntryDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView)
         report = get_object_or_404(Report, pk=report_id, user=self.request.user)
         entry_id = self.kwargs["pk"]
         entry = get_object_or_404(ReportEntry, pk=entry_id, report__id=report_id)
+        # the signals refresh the totals of this same instance on delete
+        entry.report = report
         return entry
 
+    def form_valid(self, form):
+        if not self.wants_partial():
+            return super().form_valid(form)
+        entry_id = self.object.id
+        self.object.delete()
+        return self.partial_response(entry_id, self.object.report)
+
     def get_success_url(self):
         # Define the URL where you want to redirect after a successful form submission
         return reverse_lazy(
@@ -274,8 +431,13 @@ class ReportEntryDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView)
         )
 
 
-from .pdf import generate_pdf
-from django.http import HttpRequest, HttpResponse
+from . import pdf_jobs
+from .pdf import report_pdf_filename
+from django.conf import settings
+from .pdf_cache import get_pdf_cache, open_report_pdf
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, JsonResponse
+from .downloads import serve_file
 
 
 class PDFView(View):
@@ -283,7 +445,11 @@ class PDFView(View):
         report_id = self.kwargs.get("report_id")
 
         # check if report belongs to the user
-        report = get_object_or_404(Report, id=report_id, user=request.user)
+        report = get_object_or_404(
+            Report.objects.select_related("user__role"),
+            id=report_id,
+            user=request.user,
+        )
         existing_submissions = report.submissions.filter(
             status__in=[
                 ReportSubmission.ReportStatus.PENDING,
@@ -297,40 +463,65 @@ class PDFView(View):
             )
             return redirect(reverse("user-reports"))
 
-        header_data = {}
-        report_id = self.kwargs["report_id"]
-        report = Report.objects.get(id=report_id)
-
-        header_data["bolsista"] = report.user.name
-        header_data["funcao"] = report.user.role
-        header_data["periodo"] = report.formatted_ref_month()
-        header_data["telefone"] = report.user.phone_number or ""
-        header_data["email"] = report.user.email
-
-        row_data = []
-        entries = ReportEntry.objects.filter(report__id=report_id)
-        for entry in entries:
-            row_data.append(
-                {
-                    "dia": entry.date.day,
-                    "atividade": entry.description,
-                    "inicio": entry.init_hour,
-                    "fim": entry.end_hour,
-                    "ch": entry.hours,
-                }
-            )
+        if getattr(settings, "REPORTS_PDF_ASYNC", False):
+            try:
+                job_id, job_status = pdf_jobs.submit(report)
+            except pdf_jobs.QueueFull:
+                job_id, job_status = None, None
+                if getattr(settings, "REPORTS_PDF_BACKPRESSURE", "reject") != "inline":
+                    response = HttpResponse(
+                        "Muitos relatórios sendo gerados, tente novamente em instantes.",
+                        status=503,
+                    )
+                    response["Retry-After"] = "5"
+                    return response
+
+            if job_status == pdf_jobs.PENDING:
+                status_url = reverse(
+                    "pdf_job_status", kwargs={"report_id": report.id, "job_id": job_id}
+                )
+                if "application/json" in request.headers.get("Accept", ""):
+                    return JsonResponse(
+                        {"job_id": job_id, "status": job_status, "status_url": status_url},
+                        status=202,
+                    )
+                return render(
+                    request,
+                    "reports/pdf_job.html",
+                    {"report": report, "status_url": status_url},
+                    status=202,
+                )
+
+        pdf_file = open_report_pdf(report)
+        return FileResponse(
+            pdf_file,
+            content_type="application/pdf",
+            filename=report_pdf_filename(report),
+        )
 
-        pdf_file = generate_pdf(header_data, row_data)
-        response = HttpResponse(content_type="application/pdf")
-        filename = f"{report.user.name} - {report.ref_month.strftime('%B')} - {report.ref_month.year}.pdf"
-        response["Content-Disposition"] = f'inline; filename="{filename}"'
-        response.write(pdf_file)
-        return response
+
+class PDFJobStatusView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        report = get_object_or_404(Report, id=self.kwargs["report_id"], user=request.user)
+        job_status = pdf_jobs.status(report, self.kwargs["job_id"])
+        if job_status is None:
+            raise Http404
+        return JsonResponse(
+            {
+                "status": job_status,
+                "url": reverse("generate_pdf", kwargs={"report_id": report.id}),
+            }
+        )
+
+
+@staff_member_required
+def pdf_cache_stats(request):
+    return JsonResponse(get_pdf_cache().stats())
 
 
 from django.views.generic.edit import CreateView
 from .models import ReportSubmission
-from .forms import ReportSubmissionForm
+from .forms import ReportSubmissionForm, pdf_too_large_error
 
 
 class ReportSubmissionCreateView(CreateView):
@@ -339,11 +530,14 @@ class ReportSubmissionCreateView(CreateView):
     template_name = "reports/report_submission.html"
     success_url = reverse_lazy("user-reports")
 
+    @transaction.atomic
     def form_valid(self, form):
         # Check if there are any existing pending or approved submissions
         report_id = self.kwargs.get("report_id")
         report = get_object_or_404(Report, id=report_id, user=self.request.user)
         form.instance.report_id = report_id
+        # recorded as the author of the submission's first status event
+        form.instance._changed_by = self.request.user
         existing_submissions = report.submissions.filter(
             status__in=[
                 ReportSubmission.ReportStatus.PENDING,
@@ -363,6 +557,12 @@ class ReportSubmissionCreateView(CreateView):
             )
         return super().form_valid(form)
 
+    def form_invalid(self, form):
+        # the upload handler dropped the file, say why instead of "required"
+        if getattr(self.request, "upload_too_large", False):
+            form.errors["pdf_file"] = form.error_class(pdf_too_large_error().messages)
+        return super().form_invalid(form)
+
     def get(self, request: HttpRequest, *args: str, **kwargs: Any) -> HttpResponse:
         report_id = self.kwargs.get("report_id")
         report = get_object_or_404(Report, id=report_id, user=self.request.user)
@@ -395,23 +595,41 @@ class ReportSubmissionDetailView(LoginRequiredMixin, DetailView):
         return report.submissions.all()
 
 
+class ReportSubmissionPDFView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        submission = get_object_or_404(
+            ReportSubmission.objects.select_related("report__user"),
+            pk=self.kwargs["pk"],
+            report_id=self.kwargs["report_id"],
+        )
+        # the bolsista who sent it or a reviewer
+        if submission.report.user_id != request.user.id and not (
+            request.user.has_perm("reports.view_reportsubmission")
+            or request.user.has_perm("reports.view_pendingreportsubmission")
+        ):
+            raise Http404
+        pdf_file = submission.pdf_file
+        if not pdf_file or not pdf_file.storage.exists(pdf_file.name):
+            raise Http404
+        return serve_file(
+            request, pdf_file.storage, pdf_file.name, report_pdf_filename(submission.report)
+        )
+
+
 def create_report(request):
     if request.method == "POST":
-        # check if a report for current month already exists
-        report = Report.objects.filter(
-            user=request.user,
-            ref_month__year=datetime.now().year,
-            ref_month__month=datetime.now().month,
-        )
-        if not report:
-            # Create a new Report instance with default values
-            now = datetime.now()
-            report = Report.objects.create(
-                ref_month=now, user=request.user
-            )  # Modify this to set default values as needed
-            messages.success(request, "Relatório criado com sucesso!")
-        else:
+        # ref_month is always the first day of the month, so the unique
+        # (user, ref_month) constraint allows one report per month
+        month_start = datetime.now().date().replace(day=1)
+        try:
+            with transaction.atomic():
+                Report.objects.create(ref_month=month_start, user=request.user)
+        except IntegrityError:
+            # created already, possibly by a double submit of this form
+            report = Report.objects.get(user=request.user, ref_month=month_start)
             messages.error(request, "Relatório já existe para o mês selecionado!")
+            return redirect("report-entries", report_id=report.id)
+        messages.success(request, "Relatório criado com sucesso!")
     else:
         messages.error(request, "Método nao permitido!")
 